@@ -0,0 +1,535 @@
+"""
+Benchmarks de ingesta y carga de eventos.
+
+Uso:
+    python benchmarks/bench_eventos.py journal
+    python benchmarks/bench_eventos.py journal --tamanos 100 1000 10000 --yaml
+    python benchmarks/bench_eventos.py grupal --hilos 8 --eventos 5000
+    python benchmarks/bench_eventos.py columnar --eventos 1000000
+    python benchmarks/bench_eventos.py carga --eventos 1000000
+    python benchmarks/bench_eventos.py instante --eventos 1000000
+    python benchmarks/bench_eventos.py flujo --dias 3 30 --eventos 20000
+    python benchmarks/bench_eventos.py sqlite --eventos 1000000
+    python benchmarks/bench_eventos.py sesiones --eventos 1000000
+    python benchmarks/bench_eventos.py orden --archivos 24 --filas 50000
+"""
+import argparse
+import csv
+import json
+import logging
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from collections import defaultdict
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import numpy as np
+
+RAIZ = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(RAIZ))
+sys.path.insert(0, str(RAIZ / "src"))
+
+from almacen_sqlite import AlmacenSQLite
+from gestor_archivos import GestorArchivosEventos
+from columnar import ContadorOrden, EventosColumnares
+from loader import SistemaDistribucion
+from sesiones import reconstruir_sesiones
+from streaming import fusionar, leer_csv, reproducir_rango
+
+CONFIG = RAIZ / "config" / "configuracion.yaml"
+
+
+def _evento_sintetico(i: int) -> dict:
+    ts = datetime(2026, 1, 13, 9, 0, 0) + timedelta(seconds=i % 86400)
+    return {
+        "timestamp": ts.isoformat(),
+        "id_tarjeta": f"T{i % 100 + 1:03d}",
+        "puerta": i % 7 + 1,
+        "tipo": "entrada" if i % 2 == 0 else "salida",
+    }
+
+
+def _precargar_journal(ruta: Path, cantidad: int) -> None:
+    """Escribe `cantidad` eventos directamente al journal (sin pasar por el gestor)"""
+    with open(ruta, "w", encoding="utf-8") as f:
+        bloque = []
+        for i in range(cantidad):
+            bloque.append(json.dumps(_evento_sintetico(i), separators=(",", ":")) + "\n")
+            if len(bloque) >= 10000:
+                f.write("".join(bloque))
+                bloque = []
+        f.write("".join(bloque))
+
+
+def _precargar_yaml(gestor: GestorArchivosEventos, cantidad: int) -> None:
+    gestor.agregar_eventos_lote([_evento_sintetico(i) for i in range(cantidad)])
+
+
+def bench_journal(tamanos, muestras: int, incluir_yaml: bool) -> None:
+    """Latencia de agregar_evento con un historial previo de N eventos"""
+    formatos = ["jsonl"] + (["yaml"] if incluir_yaml else [])
+    print(f"{'formato':<8}{'historial':>12}{'us/evento':>14}")
+    for formato in formatos:
+        for tamano in tamanos:
+            if formato == "yaml" and tamano > 10000:
+                continue
+            with tempfile.TemporaryDirectory() as tmp:
+                if formato == "jsonl":
+                    # El gestor se crea después para que su resumen (.meta) incluya la precarga
+                    _precargar_journal(Path(tmp) / "eventos.jsonl", tamano)
+                    gestor = GestorArchivosEventos(ruta_base=tmp, formato=formato)
+                else:
+                    gestor = GestorArchivosEventos(ruta_base=tmp, formato=formato)
+                    _precargar_yaml(gestor, tamano)
+
+                n = muestras if formato == "jsonl" else max(1, muestras // 100)
+                inicio = time.perf_counter()
+                for i in range(n):
+                    gestor.agregar_evento(_evento_sintetico(tamano + i))
+                transcurrido = time.perf_counter() - inicio
+                gestor.cerrar()
+            print(f"{formato:<8}{tamano:>12}{transcurrido / n * 1e6:>14.1f}")
+
+
+def bench_grupal(formato: str, hilos: int, eventos_por_hilo: int) -> None:
+    """
+    Throughput sostenido con varios productores: escritura directa vs grupal.
+    "directo+fsync" da la misma garantía de durabilidad que el modo grupal.
+    """
+    print(f"{'modo':<15}{'eventos':>10}{'seg':>10}{'eventos/s':>14}")
+    for modo in ("directo", "directo+fsync", "grupal"):
+        with tempfile.TemporaryDirectory() as tmp:
+            gestor = GestorArchivosEventos(ruta_base=tmp, formato=formato)
+            futuros = []
+            if modo == "grupal":
+                gestor.iniciar_escritura_grupal()
+
+            def productor(base: int):
+                for i in range(eventos_por_hilo):
+                    evento = _evento_sintetico(base + i)
+                    if modo == "grupal":
+                        futuros.append(gestor.agregar_evento_async(evento))
+                    else:
+                        gestor.agregar_evento(evento)
+                        if modo == "directo+fsync":
+                            with gestor.lock_escritura:
+                                gestor._sincronizar_disco()
+
+            inicio = time.perf_counter()
+            productores = [threading.Thread(target=productor, args=(h * eventos_por_hilo,))
+                           for h in range(hilos)]
+            for hilo in productores:
+                hilo.start()
+            for hilo in productores:
+                hilo.join()
+            # En modo grupal se mide hasta la confirmación (fsync) del último evento
+            for futuro in futuros:
+                futuro.result()
+            transcurrido = time.perf_counter() - inicio
+            gestor.cerrar()
+        total = hilos * eventos_por_hilo
+        print(f"{modo:<15}{total:>10}{transcurrido:>10.2f}{total / transcurrido:>14.0f}")
+
+
+def _observada_dicts(sistema: SistemaDistribucion, hasta_timestamp: str = None) -> dict:
+    """Implementación original (lista de dicts) de calcular_distribucion_observada"""
+    estado_tarjetas = defaultdict(lambda: "fuera")
+    eventos_filtrados = sistema.eventos
+    if hasta_timestamp:
+        eventos_filtrados = [e for e in sistema.eventos if e['timestamp'] <= hasta_timestamp]
+    for evento in eventos_filtrados:
+        if evento['tipo'] == "entrada":
+            estado_tarjetas[evento['id_tarjeta']] = "dentro"
+        elif evento['tipo'] == "salida":
+            estado_tarjetas[evento['id_tarjeta']] = "fuera"
+    distribucion = {zona: 0 for zona in sistema.zonas.keys()}
+    for zona, tarjetas in sistema.asignaciones.items():
+        for tarjeta in tarjetas:
+            if estado_tarjetas[tarjeta] == "dentro":
+                distribucion[zona] += 1
+    return distribucion
+
+
+def _evolucion_dicts(sistema: SistemaDistribucion):
+    """Implementación original (lista de dicts) de calcular_evolucion_temporal"""
+    entradas_por_hora = defaultdict(int)
+    salidas_por_hora = defaultdict(int)
+    for evento in sistema.eventos:
+        hora = datetime.fromisoformat(evento['timestamp']).hour
+        if evento['tipo'] == "entrada":
+            entradas_por_hora[hora] += 1
+        else:
+            salidas_por_hora[hora] += 1
+    horas = sorted(set(entradas_por_hora) | set(salidas_por_hora))
+    return horas, [entradas_por_hora[h] for h in horas], [salidas_por_hora[h] for h in horas]
+
+
+def _cronometrar(funcion, repeticiones: int = 3) -> float:
+    mejor = float("inf")
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        mejor = min(mejor, time.perf_counter() - inicio)
+    return mejor
+
+
+def bench_columnar(cantidad: int) -> None:
+    """Memoria y velocidad: lista de dicts vs EventosColumnares"""
+    tracemalloc.start()
+    eventos = [_evento_sintetico(i) for i in range(cantidad)]
+    memoria_dicts = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        ruta = Path(tmp) / "eventos.jsonl"
+        _precargar_journal(ruta, 0)
+        sistema = SistemaDistribucion(str(ruta), str(CONFIG))
+    sistema.eventos = eventos
+
+    inicio = time.perf_counter()
+    columnar = sistema.columnar
+    construccion = time.perf_counter() - inicio
+    memoria_columnar = columnar.nbytes + sum(sys.getsizeof(t) for t in columnar.tarjetas)
+
+    print(f"eventos: {cantidad}")
+    print(f"memoria lista de dicts: {memoria_dicts / 1e6:10.1f} MB")
+    print(f"memoria columnar:       {memoria_columnar / 1e6:10.1f} MB "
+          f"(construccion {construccion:.2f} s)")
+
+    # Métodos _calcular_*: se mide el cálculo, no el acceso al resultado memorizado
+    hasta = "2026-01-13T13:30:00"
+    print(f"{'calculo':<28}{'dicts (s)':>12}{'columnar (s)':>14}")
+    for nombre, legado, vectorizado in (
+        ("distribucion_observada", lambda: _observada_dicts(sistema),
+         lambda: sistema._calcular_observada(None)),
+        ("observada hasta 13:30", lambda: _observada_dicts(sistema, hasta),
+         lambda: sistema._calcular_observada(hasta)),
+        ("evolucion_temporal", lambda: _evolucion_dicts(sistema),
+         sistema._calcular_evolucion),
+    ):
+        assert legado() == vectorizado()
+        print(f"{nombre:<28}{_cronometrar(legado):>12.3f}{_cronometrar(vectorizado):>14.4f}")
+
+    for ancho, por in ((60, None), (1, None), (15, "puerta"), (5, "zona")):
+        nombre = f"serie {ancho} min {por or 'total'}"
+        segundos = _cronometrar(lambda: sistema._calcular_serie(ancho, por, None))
+        print(f"{nombre:<28}{'-':>12}{segundos:>14.4f}")
+
+
+def _escribir_dia_sintetico(directorio: Path, cantidad: int) -> None:
+    """24 CSV horarios (HH00.HH00.csv) con `cantidad` eventos en total, ordenados"""
+    directorio.mkdir(parents=True, exist_ok=True)
+    por_hora = max(1, cantidad // 24)
+    base = datetime(2026, 1, 13)
+    for hora in range(24):
+        ruta = directorio / f"{hora:02d}00.{(hora + 1) % 24:02d}00.csv"
+        with open(ruta, "w", encoding="utf-8", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["timestamp", "id_tarjeta", "puerta", "tipo"])
+            for i in range(por_hora):
+                ts = base + timedelta(hours=hora, seconds=i * 3600 // por_hora)
+                writer.writerow([ts.isoformat(), f"T{i % 100 + 1:03d}", i % 7 + 1,
+                                 "entrada" if i % 2 == 0 else "salida"])
+
+
+def _escribir_dia_fecha(base: Path, dia: datetime, cantidad: int) -> None:
+    """Como _escribir_dia_sintetico pero con los timestamps de `dia`"""
+    directorio = base / dia.strftime("%d%m%Y")
+    _escribir_dia_sintetico(directorio, cantidad)
+    origen = datetime(2026, 1, 13).strftime("%Y-%m-%d")
+    for archivo in directorio.glob("*.csv"):
+        archivo.write_text(archivo.read_text(encoding="utf-8").replace(origen, dia.strftime("%Y-%m-%d")),
+                           encoding="utf-8")
+
+
+def _cargar_dir_dicts(directorio: Path) -> list:
+    """Carga original: csv.DictReader secuencial y un dict por fila"""
+    eventos = []
+    for archivo in sorted(directorio.glob("*.csv")):
+        with open(archivo, "r", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                try:
+                    row["puerta"] = int(row["puerta"])
+                except (ValueError, TypeError):
+                    continue
+                eventos.append({
+                    "timestamp": row["timestamp"],
+                    "id_tarjeta": row["id_tarjeta"],
+                    "puerta": row["puerta"],
+                    "tipo": row["tipo"],
+                })
+    return eventos
+
+
+def bench_carga(cantidad: int, workers: int) -> None:
+    """Carga de un día de 24 CSV horarios: DictReader secuencial vs lector columnar en pool"""
+    with tempfile.TemporaryDirectory() as tmp:
+        directorio = Path(tmp) / "13012026"
+        _escribir_dia_sintetico(directorio, cantidad)
+        print(f"eventos: {cantidad} en 24 archivos")
+        print(f"{'modo':<28}{'seg':>10}")
+        print(f"{'dictreader secuencial':<28}{_cronometrar(lambda: _cargar_dir_dicts(directorio), 1):>10.2f}")
+        for nombre, kwargs in (
+            ("columnar 1 worker", {"workers": 1}),
+            (f"columnar {workers} hilos", {"workers": workers}),
+            (f"columnar {workers} procesos", {"workers": workers, "usar_procesos": True}),
+        ):
+            # Sin cache .npz: cada fila mide el parseo, no una lectura del cache
+            segundos = _cronometrar(
+                lambda: SistemaDistribucion(str(directorio), str(CONFIG), usar_cache=False, **kwargs), 1
+            )
+            print(f"{nombre:<28}{segundos:>10.2f}")
+
+
+def bench_instante(cantidad: int, paso_minutos: int) -> None:
+    """Animación minuto a minuto: recorrido completo por consulta vs índice temporal"""
+    base = datetime(2026, 1, 13)
+    eventos = [
+        {
+            "timestamp": (base + timedelta(seconds=i * 86400 // cantidad)).isoformat(),
+            "id_tarjeta": f"T{i % 100 + 1:03d}",
+            "puerta": i % 7 + 1,
+            "tipo": "entrada" if (i // 100) % 2 == 0 else "salida",
+        }
+        for i in range(cantidad)
+    ]
+    with tempfile.TemporaryDirectory() as tmp:
+        ruta = Path(tmp) / "eventos.jsonl"
+        _precargar_journal(ruta, 0)
+        sistema = SistemaDistribucion(str(ruta), str(CONFIG))
+    sistema.eventos = eventos
+    columnar = sistema.columnar
+
+    instantes = [(base + timedelta(minutes=m)).isoformat() for m in range(0, 1440, paso_minutos)]
+    epochs = [int(np.datetime64(t, "s").astype(np.int64)) for t in instantes]
+
+    inicio = time.perf_counter()
+    indice = sistema.indice_temporal
+    construccion = time.perf_counter() - inicio
+
+    recorrido = _cronometrar(lambda: [columnar.estado_dentro(t) for t in epochs], 1)
+    con_indice = _cronometrar(lambda: [indice.estado(t) for t in epochs], 1)
+    for t in epochs[:: max(1, len(epochs) // 20)]:
+        assert (columnar.estado_dentro(t) == indice.estado(t)).all()
+
+    print(f"eventos: {cantidad}, consultas: {len(epochs)} (cada {paso_minutos} min)")
+    print(f"construccion indice: {construccion:.3f} s ({len(indice.posiciones)} checkpoints)")
+    print(f"{'modo':<28}{'total (s)':>12}{'por consulta (ms)':>20}")
+    print(f"{'recorrido completo':<28}{recorrido:>12.3f}{recorrido / len(epochs) * 1e3:>20.3f}")
+    print(f"{'indice + checkpoints':<28}{con_indice:>12.3f}{con_indice / len(epochs) * 1e3:>20.3f}")
+
+
+def bench_flujo(dias_lista, por_dia: int) -> None:
+    """Memoria pico: carga materializada (desde_rango) vs reproducción en streaming"""
+    base_fecha = datetime(2026, 1, 1)
+    with tempfile.TemporaryDirectory() as tmp:
+        base = Path(tmp)
+        for d in range(max(dias_lista)):
+            _escribir_dia_fecha(base, base_fecha + timedelta(days=d), por_dia)
+
+        print(f"eventos por dia: {por_dia}")
+        print(f"{'modo':<16}{'dias':>6}{'eventos':>10}{'seg':>8}{'pico MB':>10}")
+        for dias in dias_lista:
+            fin = base_fecha + timedelta(days=dias - 1)
+            for nombre, funcion in (
+                ("materializado", lambda: len(SistemaDistribucion.desde_rango(
+                    base_fecha.date(), fin.date(), str(base), str(CONFIG), usar_cache=False).columnar)),
+                ("streaming", lambda: reproducir_rango(
+                    base_fecha.date(), fin.date(), str(base), str(CONFIG))["eventos"]),
+            ):
+                tracemalloc.start()
+                inicio = time.perf_counter()
+                total = funcion()
+                segundos = time.perf_counter() - inicio
+                pico = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+                print(f"{nombre:<16}{dias:>6}{total:>10}{segundos:>8.2f}{pico / 1e6:>10.1f}")
+
+
+def bench_sqlite(cantidad: int) -> None:
+    """Importación masiva a AlmacenSQLite y latencia de consultas indexadas"""
+    with tempfile.TemporaryDirectory() as tmp:
+        journal = Path(tmp) / "eventos.jsonl"
+        _precargar_journal(journal, cantidad)
+        almacen = AlmacenSQLite(str(Path(tmp) / "eventos.db"))
+
+        inicio = time.perf_counter()
+        almacen.importar(str(journal))
+        importacion = time.perf_counter() - inicio
+        print(f"eventos: {cantidad}, importacion: {importacion:.2f} s "
+              f"({cantidad / max(importacion, 1e-9):,.0f} eventos/s)")
+
+        print(f"{'consulta':<40}{'filas':>10}{'ms':>10}")
+        for nombre, kwargs in (
+            ("tarjeta T042 (todo el historial)", {"tarjeta": "T042"}),
+            ("puerta 5 entre 13:00 y 14:00", {"puerta": 5, "desde": "2026-01-13T13:00:00",
+                                              "hasta": "2026-01-13T14:00:00"}),
+            ("rango de 1 minuto", {"desde": "2026-01-13T10:00:00", "hasta": "2026-01-13T10:00:59"}),
+        ):
+            filas = len(almacen.consultar(**kwargs))
+            segundos = _cronometrar(lambda: almacen.consultar(**kwargs))
+            print(f"{nombre:<40}{filas:>10}{segundos * 1e3:>10.2f}")
+        almacen.cerrar()
+
+
+def _columnar_jornadas(cantidad: int, tarjetas: int) -> EventosColumnares:
+    """
+    `cantidad` eventos de `tarjetas` tarjetas que alternan entrada/salida
+    durante un día, con algunas entradas intermedias y salidas repetidas
+    """
+    rng = np.random.default_rng(0)
+    base = int(np.datetime64("2026-01-13T00:00:00", "s").astype(np.int64))
+    ts = np.sort(rng.integers(base, base + 86400, cantidad))
+    tarjeta = rng.integers(0, tarjetas, cantidad).astype(np.int32)
+    # Por tarjeta: pares entrada/salida con ~10% de ruido
+    orden = np.lexsort((ts, tarjeta))
+    posicion = np.empty(cantidad, dtype=np.int64)
+    posicion[orden] = np.arange(cantidad)
+    tipo = (posicion % 2).astype(np.uint8)
+    ruido = rng.random(cantidad) < 0.1
+    tipo[ruido] = rng.integers(0, 2, int(ruido.sum()))
+    return EventosColumnares(
+        ts, tarjeta, rng.integers(1, 8, cantidad).astype(np.int16), tipo,
+        [f"T{i:05d}" for i in range(tarjetas)],
+    )
+
+
+def bench_sesiones(cantidad: int, tarjetas: int) -> None:
+    """Reconstrucción de sesiones entrada/salida sobre `cantidad` eventos"""
+    columnar = _columnar_jornadas(cantidad, tarjetas)
+    zona = (np.arange(tarjetas) % 4).astype(np.int32)
+    zonas = ["DEPTO_A", "DEPTO_B", "DEPTO_C", "DEPTO_D"]
+
+    segundos = _cronometrar(lambda: reconstruir_sesiones(columnar, zona, zonas))
+    sesiones = reconstruir_sesiones(columnar, zona, zonas)
+    histograma = _cronometrar(lambda: sesiones.histograma_permanencia(15))
+    print(f"eventos: {cantidad}, tarjetas: {tarjetas}")
+    print(f"sesiones: {len(sesiones)}, entradas sin salida: {len(sesiones.sin_salida)}, "
+          f"salidas sin entrada: {len(sesiones.sin_entrada)}")
+    print(f"reconstruccion: {segundos:.3f} s ({cantidad / segundos:,.0f} eventos/s)")
+    print(f"histograma por departamento (15 min): {histograma * 1e3:.2f} ms")
+
+
+def _partes_horarias(archivos: int, filas: int, desorden: float, solape: int, semilla: int = 0) -> list:
+    """
+    `archivos` partes de `filas` eventos, una por hora y ordenadas. Con
+    `desorden` se corre esa fracción de filas de cada tercer archivo y con
+    `solape` (segundos) cada archivo se extiende sobre la hora siguiente.
+    """
+    rng = np.random.default_rng(semilla)
+    base = int(datetime(2026, 1, 13).timestamp())
+    partes = []
+    for hora in range(archivos):
+        inicio = base + hora * 3600
+        ts = np.sort(rng.integers(inicio, inicio + 3600 + solape, filas)).astype(np.int64)
+        if desorden and hora % 3 == 0:
+            k = rng.random(filas) < desorden
+            ts[k] -= rng.integers(1, 300, int(k.sum()))
+        partes.append(EventosColumnares(
+            ts, rng.integers(0, 1000, filas).astype(np.int32), rng.integers(1, 8, filas).astype(np.int16),
+            rng.integers(0, 2, filas).astype(np.uint8), [f"T{i:04d}" for i in range(1000)],
+        ))
+    return partes
+
+
+def bench_orden(archivos: int, filas: int) -> None:
+    """Unión de archivos horarios: concatenar + sort global vs fusionar (y mezcla k-way en streaming)"""
+    print(f"archivos: {archivos} x {filas} filas")
+    print(f"{'caso':<24}{'sort global ms':>16}{'fusionar ms':>14}{'desordenadas':>14}{'solapadas':>11}")
+    for caso, desorden, solape in (
+        ("en orden", 0.0, 0),
+        ("1% desordenado", 0.01, 0),
+        ("horas solapadas 5 min", 0.0, 300),
+    ):
+        partes = _partes_horarias(archivos, filas, desorden, solape)
+        contador = ContadorOrden()
+        a = EventosColumnares.fusionar(partes, None, contador)
+        b = EventosColumnares.concatenar(partes).ordenar()
+        assert np.array_equal(a.ts, b.ts) and np.array_equal(a.tarjeta, b.tarjeta)
+        global_ = _cronometrar(lambda: EventosColumnares.concatenar(partes).ordenar())
+        fusion = _cronometrar(lambda: EventosColumnares.fusionar(partes))
+        print(f"{caso:<24}{global_ * 1e3:>16.1f}{fusion * 1e3:>14.1f}"
+              f"{contador.desordenadas:>14}{contador.solapadas:>11}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        directorio = Path(tmp) / "13012026"
+        _escribir_dia_sintetico(directorio, archivos * filas)
+        rutas = sorted(directorio.glob("*.csv"))[:archivos]
+        contador = ContadorOrden()
+        inicio = time.perf_counter()
+        total = sum(1 for _ in fusionar((leer_csv(r) for r in rutas), contador))
+        segundos = time.perf_counter() - inicio
+        print(f"streaming heapq.merge: {total} eventos en {segundos:.2f} s "
+              f"({total / segundos:,.0f} eventos/s), desordenadas: {contador.desordenadas}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks de eventos")
+    sub = parser.add_subparsers(dest="bench", required=True)
+
+    p_journal = sub.add_parser("journal", help="Latencia por evento del journal append-only")
+    p_journal.add_argument("--tamanos", type=int, nargs="+",
+                           default=[100, 1000, 10000, 100000, 1000000])
+    p_journal.add_argument("--muestras", type=int, default=2000)
+    p_journal.add_argument("--yaml", action="store_true",
+                           help="Comparar contra el formato YAML (hasta 10k eventos)")
+
+    p_grupal = sub.add_parser("grupal", help="Throughput con escritor grupal (group commit)")
+    p_grupal.add_argument("--formato", choices=GestorArchivosEventos.FORMATOS, default="jsonl")
+    p_grupal.add_argument("--hilos", type=int, default=8)
+    p_grupal.add_argument("--eventos", type=int, default=5000, help="Eventos por hilo")
+
+    p_columnar = sub.add_parser("columnar", help="Memoria/velocidad de EventosColumnares")
+    p_columnar.add_argument("--eventos", type=int, default=1000000)
+
+    p_carga = sub.add_parser("carga", help="Carga de CSV horarios en paralelo")
+    p_carga.add_argument("--eventos", type=int, default=1000000)
+    p_carga.add_argument("--workers", type=int, default=8)
+
+    p_instante = sub.add_parser("instante", help="Consultas de estado en el instante T")
+    p_instante.add_argument("--eventos", type=int, default=1000000)
+    p_instante.add_argument("--paso", type=int, default=1, help="Minutos entre consultas")
+
+    p_flujo = sub.add_parser("flujo", help="Memoria de la reproducción en streaming por rango")
+    p_flujo.add_argument("--dias", type=int, nargs="+", default=[3, 30])
+    p_flujo.add_argument("--eventos", type=int, default=20000, help="Eventos por dia")
+
+    p_sqlite = sub.add_parser("sqlite", help="Importacion y consultas en AlmacenSQLite")
+    p_sqlite.add_argument("--eventos", type=int, default=1000000)
+
+    p_sesiones = sub.add_parser("sesiones", help="Reconstruccion de sesiones entrada/salida")
+    p_sesiones.add_argument("--eventos", type=int, default=1000000)
+    p_sesiones.add_argument("--tarjetas", type=int, default=10000)
+
+    p_orden = sub.add_parser("orden", help="Union ordenada de archivos horarios sin sort global")
+    p_orden.add_argument("--archivos", type=int, default=24)
+    p_orden.add_argument("--filas", type=int, default=50000, help="Filas por archivo")
+
+    args = parser.parse_args()
+    logging.getLogger().setLevel(logging.WARNING)
+
+    if args.bench == "journal":
+        bench_journal(args.tamanos, args.muestras, args.yaml)
+    elif args.bench == "grupal":
+        bench_grupal(args.formato, args.hilos, args.eventos)
+    elif args.bench == "columnar":
+        bench_columnar(args.eventos)
+    elif args.bench == "carga":
+        bench_carga(args.eventos, args.workers)
+    elif args.bench == "instante":
+        bench_instante(args.eventos, args.paso)
+    elif args.bench == "flujo":
+        bench_flujo(args.dias, args.eventos)
+    elif args.bench == "sqlite":
+        bench_sqlite(args.eventos)
+    elif args.bench == "sesiones":
+        bench_sesiones(args.eventos, args.tarjetas)
+    elif args.bench == "orden":
+        bench_orden(args.archivos, args.filas)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,22 @@
 import yaml
+import csv
+import io
+import json
+import os
 import shutil
 import time
+import queue
+import zlib
+from collections import OrderedDict
+from datetime import datetime
 from pathlib import Path
 from typing import List, Dict
-from threading import Lock
+from threading import Lock, Thread
+from concurrent.futures import Future
 import logging
 
+from src.almacen_sqlite import AlmacenSQLite
+
 # Configurar logging
 logging.basicConfig(
     level=logging.INFO,
@@ -20,20 +31,70 @@ class GestorArchivosEventos:
     
     Flujo:
     1. Escritura activa en eventos.yaml
-    2. PAUSA → copia a eventos_procesamiento.yaml
+    2. PAUSA → snapshot (marca de agua) a eventos_procesamiento.yaml
     3. REAPERTURA escritura en eventos.yaml
     4. Manim lee desde eventos_procesamiento.yaml (estático)
+    
+    Formatos:
+    - "yaml": un único documento {"eventos": [...]}; cada escritura
+      relee y reescribe el archivo completo (costo O(N) por evento).
+    - "jsonl": journal append-only, un evento JSON por línea
+      (eventos.jsonl); cada escritura cuesta O(1).
+    
+    Cada archivo tiene un sidecar <archivo>.meta (JSON) con el resumen
+    del contenido: eventos, bytes, primer/último timestamp, crc32 e inode.
+    El del archivo de escritura se actualiza en cada escritura, de modo que
+    contar_eventos y obtener_estado no leen el payload.
+    
+    Con particionar=True cada evento también se enruta a su partición
+    horaria <ruta_base>/DDMMYYYY/HH00.HH00.csv (mismo layout que lee
+    SistemaDistribucion y que genera simulador_eventos.py).
+    
+    Con sqlite="<ruta>.db" cada evento también se inserta (en lotes) en un
+    AlmacenSQLite indexado para consultas ad-hoc.
     """
     
-    def __init__(self, ruta_base: str = "data"):
+    FORMATOS = ("yaml", "jsonl")
+    
+    # Frecuencia máxima de persistencia del sidecar del journal (segundos).
+    # El resumen en memoria siempre está al día; si el sidecar en disco
+    # queda atrás, al reabrir solo se relee la cola del journal.
+    INTERVALO_META = 1.0
+    
+    def __init__(
+        self,
+        ruta_base: str = "data",
+        formato: str = "yaml",
+        particionar: bool = False,
+        sqlite: str = None,
+    ):
+        if formato not in self.FORMATOS:
+            raise ValueError(f"Formato desconocido: {formato}. Use uno de {self.FORMATOS}")
+        
         self.ruta_base = Path(ruta_base)
-        self.archivo_escritura = self.ruta_base / "eventos.yaml"
-        self.archivo_procesamiento = self.ruta_base / "eventos_procesamiento.yaml"
-        self.archivo_backup = self.ruta_base / "eventos_backup.yaml"
+        self.formato = formato
+        self.archivo_escritura = self.ruta_base / f"eventos.{formato}"
+        self.archivo_procesamiento = self.ruta_base / f"eventos_procesamiento.{formato}"
+        self.archivo_backup = self.ruta_base / f"eventos_backup.{formato}"
         
         # Lock para escritura thread-safe
         self.lock_escritura = Lock()
         
+        # Handle abierto en modo append (solo formato jsonl)
+        self._journal = None
+        
+        # Escritor grupal opcional (ver iniciar_escritura_grupal)
+        self._escritor = None
+        
+        # Eventos enviados en el último preparar_para_procesamiento(incremental=True)
+        self.ultimo_envio = None
+        
+        # Escritor de particiones horarias (opcional)
+        self._particiones = EscritorParticionado(ruta_base) if particionar else None
+        
+        # Almacén SQLite indexado (opcional)
+        self.almacen = AlmacenSQLite(sqlite) if sqlite else None
+        
         # Estado del sistema
         self.escritura_activa = True
         
@@ -43,18 +104,321 @@ class GestorArchivosEventos:
         # Inicializar archivo de escritura si no existe
         if not self.archivo_escritura.exists():
             self._inicializar_archivo_vacio(self.archivo_escritura)
+        
+        # Resumen del archivo de escritura (mantenido en cada escritura)
+        self._meta = self._cargar_meta_vigente(self.archivo_escritura)
+        self._meta_guardada = 0.0
+        self._guardar_meta_escritura(forzar=True)
     
     def _inicializar_archivo_vacio(self, archivo: Path):
-        """Crea archivo YAML vacío con estructura base"""
-        estructura_base = {"eventos": []}
-        with open(archivo, 'w', encoding='utf-8') as f:
-            yaml.dump(estructura_base, f, allow_unicode=True, sort_keys=False)
+        """Crea archivo vacío con estructura base según el formato"""
+        if self.formato == "jsonl":
+            self._reemplazar_atomico(archivo, lambda f: None)
+        else:
+            estructura_base = {"eventos": []}
+            self._reemplazar_atomico(
+                archivo,
+                lambda f: yaml.dump(estructura_base, f, allow_unicode=True, sort_keys=False)
+            )
         logger.info(f"Archivo inicializado: {archivo}")
     
+    @staticmethod
+    def _reemplazar_atomico(archivo: Path, escribir):
+        """
+        Escribe a un temporal y lo renombra sobre `archivo` (os.replace).
+        El inode anterior no se modifica, por lo que los snapshots enlazados
+        (hardlinks) siguen viendo su contenido original.
+        """
+        tmp = archivo.with_name(archivo.name + ".tmp")
+        with open(tmp, 'w', encoding='utf-8') as f:
+            escribir(f)
+        os.replace(tmp, archivo)
+    
+    @staticmethod
+    def _ruta_marca(archivo: Path) -> Path:
+        return archivo.with_name(archivo.name + ".meta")
+    
+    def _leer_meta(self, archivo: Path) -> Dict:
+        """Retorna el sidecar <archivo>.meta, o {} si no existe"""
+        ruta = self._ruta_marca(archivo)
+        if not ruta.exists():
+            return {}
+        with open(ruta, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    
+    def _escribir_meta(self, archivo: Path, meta: Dict):
+        self._reemplazar_atomico(self._ruta_marca(archivo), lambda f: json.dump(meta, f))
+    
+    def _guardar_meta_escritura(self, forzar: bool = False):
+        """Persiste el resumen del archivo de escritura (con throttling en jsonl)"""
+        ahora = time.monotonic()
+        if forzar or self.formato == "yaml" or ahora - self._meta_guardada >= self.INTERVALO_META:
+            self._escribir_meta(self.archivo_escritura, self._meta)
+            self._meta_guardada = ahora
+    
+    def _leer_marca(self, archivo: Path):
+        """Retorna la marca de agua (bytes válidos) de un snapshot, o None"""
+        meta = self._leer_meta(archivo)
+        return meta.get("bytes") if meta.get("snapshot") else None
+    
+    @staticmethod
+    def _meta_vacia() -> Dict:
+        return {
+            "eventos": 0,
+            "bytes": 0,
+            "primer_timestamp": None,
+            "ultimo_timestamp": None,
+            "crc32": 0,
+        }
+    
+    @staticmethod
+    def _acumular_meta(meta: Dict, eventos: List[Dict], datos: bytes = b""):
+        """Suma eventos (y los bytes agregados al final del archivo) al resumen"""
+        meta["eventos"] += len(eventos)
+        meta["bytes"] += len(datos)
+        meta["crc32"] = zlib.crc32(datos, meta["crc32"])
+        if eventos:
+            timestamps = [str(evento["timestamp"]) for evento in eventos]
+            primero, ultimo = min(timestamps), max(timestamps)
+            if meta["primer_timestamp"] is None or primero < meta["primer_timestamp"]:
+                meta["primer_timestamp"] = primero
+            if meta["ultimo_timestamp"] is None or ultimo > meta["ultimo_timestamp"]:
+                meta["ultimo_timestamp"] = ultimo
+    
+    @staticmethod
+    def _parsear_lineas(datos: bytes) -> List[Dict]:
+        eventos = []
+        for linea in datos.splitlines():
+            if not linea.strip():
+                continue
+            try:
+                eventos.append(json.loads(linea))
+            except ValueError:
+                continue
+        return eventos
+    
+    def _escanear_meta(self, ruta: Path, desde: Dict = None, limite: int = None) -> Dict:
+        """
+        Reconstruye el resumen leyendo el payload. Solo se usa para recuperar
+        un sidecar ausente o desfasado; en jsonl, si `desde` es un resumen
+        válido de un prefijo del archivo, solo se lee la cola.
+        """
+        if self.formato == "jsonl":
+            meta = dict(desde) if desde else self._meta_vacia()
+            with open(ruta, 'rb') as f:
+                f.seek(meta["bytes"])
+                datos = f.read() if limite is None else f.read(max(0, limite - meta["bytes"]))
+            # Una línea final incompleta no forma parte del resumen
+            datos = datos[:datos.rfind(b"\n") + 1]
+            self._acumular_meta(meta, self._parsear_lineas(datos), datos)
+        else:
+            contenido = ruta.read_bytes()
+            datos = yaml.safe_load(contenido) or {}
+            meta = self._meta_vacia()
+            self._acumular_meta(meta, datos.get("eventos") or [])
+            meta["bytes"] = len(contenido)
+            meta["crc32"] = zlib.crc32(contenido)
+        meta["inode"] = ruta.stat().st_ino
+        return meta
+    
+    def _cargar_meta_vigente(self, ruta: Path) -> Dict:
+        """
+        Lee el sidecar de `ruta` y lo valida contra stat() (inode y tamaño),
+        sin tocar el payload. Si está desfasado se reconstruye y se guarda.
+        """
+        meta = self._leer_meta(ruta)
+        info = ruta.stat()
+        vigente = "eventos" in meta and meta.get("inode") == info.st_ino
+        if self.formato == "jsonl":
+            vigente = vigente and meta["bytes"] <= info.st_size
+            if vigente and ruta == self.archivo_escritura and meta["bytes"] < info.st_size:
+                # Escrituras sin sidecar actualizado (p.ej. corte): leer solo la cola
+                meta = self._escanear_meta(ruta, desde=meta)
+                self._escribir_meta(ruta, meta)
+        else:
+            vigente = vigente and meta["bytes"] == info.st_size
+        
+        if not vigente:
+            meta = self._escanear_meta(ruta)
+            self._escribir_meta(ruta, meta)
+        return meta
+    
+    def _crear_snapshot(self, destino: Path):
+        """
+        Publica un snapshot inmutable de archivo_escritura (yaml) en `destino`.
+        
+        Usa un hardlink (costo constante, sin copiar datos) + os.replace
+        atómico. El YAML siempre se reescribe con _reemplazar_atomico (inode
+        nuevo), así que el inode enlazado no vuelve a cambiar. El journal
+        jsonl, en cambio, crece en el mismo inode: sus snapshots son copias
+        independientes (ver _enviar_delta). Si el sistema de archivos no
+        soporta hardlinks se copia el archivo.
+        """
+        tmp = destino.with_name(destino.name + ".tmp")
+        if tmp.exists():
+            tmp.unlink()
+        try:
+            os.link(self.archivo_escritura, tmp)
+        except OSError:
+            shutil.copy2(self.archivo_escritura, tmp)
+        os.replace(tmp, destino)
+        # La marca se publica después del enlace: un lector que vea la marca
+        # nueva siempre encuentra un archivo con al menos `marca` bytes.
+        meta = dict(self._meta)
+        meta["inode"] = destino.stat().st_ino
+        # Solo el sidecar de un snapshot es marca de agua para los lectores
+        meta["snapshot"] = True
+        self._escribir_meta(destino, meta)
+    
+    def _enviar_delta(self, destino: Path, marca: int) -> int:
+        """
+        Agrega a `destino` (copia física independiente) solo los bytes del
+        journal escritos desde el último envío. El offset enviado y el inode
+        de origen quedan en el sidecar de `destino`.
+        
+        Returns:
+            int: Cantidad de eventos enviados
+        """
+        origen = self.archivo_escritura.stat()
+        meta = self._leer_meta(destino)
+        
+        reconstruir = (
+            not destino.exists()
+            or "offset_origen" not in meta
+            or "eventos" not in meta
+            # Sigue siendo un hardlink del journal (snapshot previo)
+            or os.path.samefile(destino, self.archivo_escritura)
+        )
+        if reconstruir:
+            desde = 0
+        elif meta.get("inode_origen") != origen.st_ino or meta["offset_origen"] > marca:
+            # El journal fue limpiado/reemplazado: todo su contenido es nuevo
+            desde = 0
+        else:
+            desde = meta["offset_origen"]
+        
+        with open(self.archivo_escritura, 'rb') as f:
+            f.seek(desde)
+            delta = f.read(marca - desde)
+        eventos_delta = self._parsear_lineas(delta)
+        enviados = len(eventos_delta)
+        
+        if reconstruir:
+            tmp = destino.with_name(destino.name + ".tmp")
+            with open(tmp, 'wb') as f:
+                f.write(delta)
+            os.replace(tmp, destino)
+        elif delta:
+            with open(destino, 'ab') as f:
+                f.write(delta)
+        
+        nueva_meta = self._meta_vacia() if reconstruir else meta
+        self._acumular_meta(nueva_meta, eventos_delta, delta)
+        nueva_meta.update({
+            "inode": destino.stat().st_ino,
+            "offset_origen": marca,
+            "inode_origen": origen.st_ino,
+            "snapshot": True,
+        })
+        self._escribir_meta(destino, nueva_meta)
+        return enviados
+    
+    def _abrir_journal(self):
+        """Retorna el handle append del journal, abriéndolo si hace falta"""
+        if self._journal is None or self._journal.closed:
+            self._journal = open(self.archivo_escritura, 'ab')
+        return self._journal
+    
+    def _cerrar_journal(self):
+        if self._journal is not None and not self._journal.closed:
+            self._journal.close()
+        self._journal = None
+    
+    def _escribir_journal(self, eventos: List[Dict]):
+        """Agrega eventos al final del journal, una línea JSON por evento"""
+        journal = self._abrir_journal()
+        datos = "".join(
+            json.dumps(evento, ensure_ascii=False, separators=(',', ':')) + "\n"
+            for evento in eventos
+        ).encode('utf-8')
+        journal.write(datos)
+        journal.flush()
+        self._acumular_meta(self._meta, eventos, datos)
+    
+    def _persistir(self, eventos: List[Dict]):
+        """
+        Escribe eventos ya validados en el archivo de escritura.
+        Debe llamarse con lock_escritura tomado.
+        """
+        if self.formato == "jsonl":
+            # Journal: solo se agregan líneas al final
+            self._escribir_journal(eventos)
+            self._guardar_meta_escritura()
+            self._persistir_secundarios(eventos)
+            return
+        
+        # Leer eventos actuales
+        with open(self.archivo_escritura, 'r', encoding='utf-8') as f:
+            datos = yaml.safe_load(f)
+        
+        if datos is None:
+            datos = {"eventos": []}
+        
+        # Agregar nuevos eventos
+        datos['eventos'].extend(eventos)
+        
+        # Escribir de vuelta (nuevo inode, ver _reemplazar_atomico)
+        contenido = yaml.dump(datos, allow_unicode=True, sort_keys=False)
+        self._reemplazar_atomico(self.archivo_escritura, lambda f: f.write(contenido))
+        
+        self._acumular_meta(self._meta, eventos)
+        contenido = contenido.encode('utf-8')
+        self._meta["bytes"] = len(contenido)
+        self._meta["crc32"] = zlib.crc32(contenido)
+        self._meta["inode"] = self.archivo_escritura.stat().st_ino
+        self._guardar_meta_escritura()
+        
+        self._persistir_secundarios(eventos)
+    
+    def _persistir_secundarios(self, eventos: List[Dict]):
+        """Particiones horarias y almacén SQLite, si están activos"""
+        if self._particiones is not None:
+            self._particiones.agregar(eventos)
+        if self.almacen is not None:
+            self.almacen.agregar(eventos)
+    
+    def _sincronizar_disco(self):
+        """fsync del archivo de escritura. Llamar con lock_escritura tomado."""
+        if self._particiones is not None:
+            self._particiones.vaciar(fsync=True)
+        if self.almacen is not None:
+            self.almacen.vaciar()
+        if self._journal is not None and not self._journal.closed:
+            self._journal.flush()
+            os.fsync(self._journal.fileno())
+            return
+        fd = os.open(self.archivo_escritura, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+    
+    def cerrar(self):
+        """Detiene el escritor grupal (si existe) y libera el handle del journal"""
+        self.detener_escritura_grupal()
+        with self.lock_escritura:
+            self._cerrar_journal()
+            self._guardar_meta_escritura(forzar=True)
+            if self._particiones is not None:
+                self._particiones.cerrar()
+            if self.almacen is not None:
+                self.almacen.cerrar()
+    
     def agregar_evento(self, evento: Dict) -> bool:
         """
         Agrega un evento al archivo de escritura activo.
-        Thread-safe mediante lock.
+        Thread-safe mediante lock. Con escritura grupal activa, el evento
+        solo se encola y se persiste en el siguiente commit del escritor.
         
         Args:
             evento: Dict con keys: timestamp, id_tarjeta, puerta, tipo
@@ -72,21 +436,14 @@ class GestorArchivosEventos:
             logger.error(f"Evento inválido. Campos requeridos: {campos_requeridos}")
             return False
         
+        if self._escritor is not None:
+            # Modo grupal: el evento queda encolado para el próximo commit
+            self._escritor.encolar(evento)
+            return True
+        
         with self.lock_escritura:
             try:
-                # Leer eventos actuales
-                with open(self.archivo_escritura, 'r', encoding='utf-8') as f:
-                    datos = yaml.safe_load(f)
-                
-                if datos is None:
-                    datos = {"eventos": []}
-                
-                # Agregar nuevo evento
-                datos['eventos'].append(evento)
-                
-                # Escribir de vuelta
-                with open(self.archivo_escritura, 'w', encoding='utf-8') as f:
-                    yaml.dump(datos, f, allow_unicode=True, sort_keys=False)
+                self._persistir([evento])
                 
                 logger.info(f"Evento agregado: {evento['id_tarjeta']} - {evento['tipo']} - Puerta {evento['puerta']}")
                 return True
@@ -95,6 +452,67 @@ class GestorArchivosEventos:
                 logger.error(f"Error al agregar evento: {e}")
                 return False
     
+    def agregar_evento_async(self, evento: Dict, callback=None) -> Future:
+        """
+        Encola un evento en el escritor grupal.
+        
+        Args:
+            evento: Dict con keys: timestamp, id_tarjeta, puerta, tipo
+            callback: Función opcional que recibe el Future al confirmarse
+        
+        Returns:
+            Future: Se resuelve con True cuando el evento quedó en disco
+                    (después del fsync del grupo) o con False si falló.
+        """
+        if self._escritor is None:
+            raise RuntimeError("Escritura grupal no iniciada. Use iniciar_escritura_grupal()")
+        
+        futuro = Future()
+        if callback is not None:
+            futuro.add_done_callback(callback)
+        
+        campos_requeridos = ['timestamp', 'id_tarjeta', 'puerta', 'tipo']
+        if not self.escritura_activa:
+            logger.warning("Escritura pausada. Evento no agregado.")
+            futuro.set_result(False)
+        elif not all(campo in evento for campo in campos_requeridos):
+            logger.error(f"Evento inválido. Campos requeridos: {campos_requeridos}")
+            futuro.set_result(False)
+        else:
+            self._escritor.encolar(evento, futuro)
+        return futuro
+    
+    def iniciar_escritura_grupal(
+        self,
+        capacidad_cola: int = 10000,
+        fsync_cada_n: int = 500,
+        fsync_cada_ms: float = 50.0,
+    ) -> "EscritorGrupal":
+        """
+        Activa el modo de escritura grupal (group commit).
+        
+        Los eventos se encolan en una cola acotada y un único hilo los
+        escribe en lotes; se hace fsync cada `fsync_cada_n` eventos o cada
+        `fsync_cada_ms` milisegundos, lo que ocurra primero.
+        """
+        if self._escritor is None:
+            self._escritor = EscritorGrupal(
+                self,
+                capacidad_cola=capacidad_cola,
+                fsync_cada_n=fsync_cada_n,
+                fsync_cada_ms=fsync_cada_ms,
+            )
+            self._escritor.iniciar()
+            logger.info(f"Escritura grupal iniciada (fsync cada {fsync_cada_n} eventos / {fsync_cada_ms} ms)")
+        return self._escritor
+    
+    def detener_escritura_grupal(self):
+        """Vacía la cola pendiente, hace fsync final y detiene el hilo escritor"""
+        if self._escritor is not None:
+            self._escritor.detener()
+            self._escritor = None
+            logger.info("Escritura grupal detenida")
+    
     def agregar_eventos_lote(self, eventos: List[Dict]) -> int:
         """
         Agrega múltiples eventos en lote.
@@ -108,26 +526,17 @@ class GestorArchivosEventos:
         
         with self.lock_escritura:
             try:
-                # Leer eventos actuales
-                with open(self.archivo_escritura, 'r', encoding='utf-8') as f:
-                    datos = yaml.safe_load(f)
-                
-                if datos is None:
-                    datos = {"eventos": []}
-                
-                # Agregar nuevos eventos
-                eventos_validos = 0
-                for evento in eventos:
-                    campos_requeridos = ['timestamp', 'id_tarjeta', 'puerta', 'tipo']
-                    if all(campo in evento for campo in campos_requeridos):
-                        datos['eventos'].append(evento)
-                        eventos_validos += 1
-                    else:
-                        logger.warning(f"Evento inválido omitido: {evento}")
+                # Filtrar eventos válidos
+                campos_requeridos = ['timestamp', 'id_tarjeta', 'puerta', 'tipo']
+                nuevos = [e for e in eventos if all(campo in e for campo in campos_requeridos)]
+                eventos_validos = len(nuevos)
+                if eventos_validos < len(eventos):
+                    logger.warning(
+                        f"Eventos inválidos omitidos: {len(eventos) - eventos_validos} "
+                        f"(campos requeridos: {campos_requeridos})"
+                    )
                 
-                # Escribir de vuelta
-                with open(self.archivo_escritura, 'w', encoding='utf-8') as f:
-                    yaml.dump(datos, f, allow_unicode=True, sort_keys=False)
+                self._persistir(nuevos)
                 
                 logger.info(f"Lote agregado: {eventos_validos}/{len(eventos)} eventos")
                 return eventos_validos
@@ -136,11 +545,22 @@ class GestorArchivosEventos:
                 logger.error(f"Error al agregar lote: {e}")
                 return 0
     
-    def preparar_para_procesamiento(self) -> bool:
+    def preparar_para_procesamiento(self, incremental: bool = False) -> bool:
         """
-        PAUSA escritura → COPIA a procesamiento → REAPERTURA escritura.
+        PAUSA escritura → SNAPSHOT a procesamiento → REAPERTURA escritura.
         Este es el método clave para lectura segura.
         
+        Se registra la marca de agua (tamaño en bytes del archivo de
+        escritura). En yaml se publica un hardlink atómico en
+        eventos_procesamiento y eventos_backup, sin copiar datos. En jsonl
+        ambos son copias físicas independientes a las que se agregan solo
+        los bytes escritos desde el envío anterior: la pausa depende de lo
+        nuevo, no del historial acumulado.
+        
+        Args:
+            incremental: (solo jsonl) la cantidad de eventos enviados en
+                esta llamada queda en self.ultimo_envio.
+        
         Returns:
             bool: True si la preparación fue exitosa
         """
@@ -152,25 +572,49 @@ class GestorArchivosEventos:
                 self.escritura_activa = False
                 logger.info("✓ Escritura PAUSADA")
                 
-                # 2. BACKUP del archivo actual (seguridad)
-                if self.archivo_escritura.exists():
-                    shutil.copy2(self.archivo_escritura, self.archivo_backup)
-                    logger.info(f"✓ Backup creado: {self.archivo_backup}")
+                if not self.archivo_escritura.exists():
+                    logger.warning("Archivo de escritura no existe. Creando vacío.")
+                    self._inicializar_archivo_vacio(self.archivo_escritura)
+                
+                # 2. MARCA DE AGUA: todo lo escrito hasta aquí es el snapshot
+                if self._journal is not None and not self._journal.closed:
+                    self._journal.flush()
+                marca = self.archivo_escritura.stat().st_size
+                self._guardar_meta_escritura(forzar=True)
+                if self._particiones is not None:
+                    self._particiones.vaciar()
+                if self.almacen is not None:
+                    self.almacen.vaciar()
                 
-                # 3. COPIAR a archivo de procesamiento
-                if self.archivo_escritura.exists():
-                    shutil.copy2(self.archivo_escritura, self.archivo_procesamiento)
-                    logger.info(f"✓ Copiado a procesamiento: {self.archivo_procesamiento}")
+                # 3. BACKUP del archivo actual (seguridad). En jsonl es una
+                # copia independiente: un hardlink compartiría el inode que
+                # sigue creciendo y no protegería ante un journal dañado
+                if self.formato == "jsonl":
+                    self._enviar_delta(self.archivo_backup, marca)
                 else:
-                    logger.warning("Archivo de escritura no existe. Creando vacío.")
-                    self._inicializar_archivo_vacio(self.archivo_procesamiento)
+                    self._crear_snapshot(self.archivo_backup)
+                logger.info(f"✓ Backup creado: {self.archivo_backup}")
+                
+                # 4. SNAPSHOT (o envío incremental) a archivo de procesamiento
+                if incremental and self.formato != "jsonl":
+                    logger.warning("Modo incremental requiere formato jsonl. Usando snapshot.")
+                    incremental = False
+                
+                if self.formato == "jsonl":
+                    enviados = self._enviar_delta(self.archivo_procesamiento, marca)
+                    self.ultimo_envio = enviados if incremental else None
+                    logger.info(f"✓ Enviados a procesamiento: {enviados} eventos nuevos ({marca} bytes)")
+                else:
+                    self._crear_snapshot(self.archivo_procesamiento)
+                    self.ultimo_envio = None
+                    logger.info(f"✓ Snapshot a procesamiento: {self.archivo_procesamiento} ({marca} bytes)")
                 
-                # 4. REINICIAR archivo de escritura (opcional: mantener o limpiar)
+                # 5. REINICIAR archivo de escritura (opcional: mantener o limpiar)
                 # Opción A: Mantener eventos (acumula histórico)
                 # Opción B: Limpiar (solo eventos nuevos post-procesamiento)
                 # Aquí usamos Opción A por defecto
                 
-                # 5. REABRIR escritura
+                # 6. REABRIR escritura
                 self.escritura_activa = True
                 logger.info("✓ Escritura REABIERTA")
                 
@@ -189,57 +633,260 @@ class GestorArchivosEventos:
         """
         with self.lock_escritura:
             try:
+                self._cerrar_journal()
                 self._inicializar_archivo_vacio(self.archivo_escritura)
+                self._meta = self._escanear_meta(self.archivo_escritura)
+                self._guardar_meta_escritura(forzar=True)
                 logger.info("Archivo de escritura limpiado")
                 return True
             except Exception as e:
                 logger.error(f"Error al limpiar: {e}")
                 return False
     
-    def contar_eventos(self, archivo: str = "escritura") -> int:
+    def obtener_metadatos(self, archivo: str = "escritura") -> Dict:
         """
-        Cuenta eventos en archivo especificado.
+        Resumen de un archivo desde su sidecar, sin leer eventos.
         
         Args:
             archivo: "escritura", "procesamiento" o "backup"
+        
+        Returns:
+            Dict con eventos, bytes, primer_timestamp, ultimo_timestamp y
+            crc32 ({} si el archivo no existe)
         """
         try:
             if archivo == "escritura":
-                ruta = self.archivo_escritura
+                return dict(self._meta)
             elif archivo == "procesamiento":
                 ruta = self.archivo_procesamiento
             elif archivo == "backup":
                 ruta = self.archivo_backup
             else:
                 logger.error(f"Archivo desconocido: {archivo}")
-                return 0
+                return {}
             
             if not ruta.exists():
-                return 0
-            
-            with open(ruta, 'r', encoding='utf-8') as f:
-                datos = yaml.safe_load(f)
-            
-            if datos and 'eventos' in datos:
-                return len(datos['eventos'])
-            return 0
+                return {}
+            return self._cargar_meta_vigente(ruta)
             
         except Exception as e:
-            logger.error(f"Error al contar eventos: {e}")
-            return 0
+            logger.error(f"Error al leer metadatos: {e}")
+            return {}
+    
+    def contar_eventos(self, archivo: str = "escritura") -> int:
+        """
+        Cuenta eventos en archivo especificado (desde el sidecar, O(1)).
+        
+        Args:
+            archivo: "escritura", "procesamiento" o "backup"
+        """
+        return self.obtener_metadatos(archivo).get("eventos", 0)
     
     def obtener_estado(self) -> Dict:
-        """Retorna estado actual del sistema"""
+        """Retorna estado actual del sistema (solo sidecars, sin leer eventos)"""
+        meta_escritura = self.obtener_metadatos("escritura")
+        meta_procesamiento = self.obtener_metadatos("procesamiento")
+        meta_backup = self.obtener_metadatos("backup")
         return {
             "escritura_activa": self.escritura_activa,
-            "eventos_escritura": self.contar_eventos("escritura"),
-            "eventos_procesamiento": self.contar_eventos("procesamiento"),
-            "eventos_backup": self.contar_eventos("backup"),
+            "eventos_escritura": meta_escritura.get("eventos", 0),
+            "eventos_procesamiento": meta_procesamiento.get("eventos", 0),
+            "eventos_backup": meta_backup.get("eventos", 0),
             "archivo_escritura_existe": self.archivo_escritura.exists(),
             "archivo_procesamiento_existe": self.archivo_procesamiento.exists(),
+            "ultimo_envio_incremental": self.ultimo_envio,
+            "rango_escritura": (meta_escritura.get("primer_timestamp"), meta_escritura.get("ultimo_timestamp")),
+            "bytes_escritura": meta_escritura.get("bytes", 0),
+            "crc32_escritura": meta_escritura.get("crc32"),
+            "crc32_procesamiento": meta_procesamiento.get("crc32"),
         }
 
 
+class EscritorParticionado:
+    """
+    Enruta eventos a su partición horaria <ruta_base>/DDMMYYYY/HH00.HH00.csv.
+    
+    Cada lote de escritura agrupa sus líneas CSV por partición y las escribe
+    en bloque (una escritura y un flush por partición) antes de retornar, de
+    modo que las horas ya cerradas quedan completas en disco aunque no lleguen
+    más eventos. Se mantienen abiertos como máximo
+    `max_abiertos` handles (LRU); un evento tardío reabre su partición en
+    modo append.
+    """
+    
+    ENCABEZADO = ["timestamp", "id_tarjeta", "puerta", "tipo"]
+    
+    def __init__(self, ruta_base: str = "data", max_abiertos: int = 8):
+        self.ruta_base = Path(ruta_base)
+        self.max_abiertos = max(1, max_abiertos)
+        self._buffers: Dict[tuple, List[str]] = {}
+        self._handles = OrderedDict()
+    
+    @staticmethod
+    def particion(timestamp) -> tuple:
+        """Retorna (DDMMYYYY, hora) del timestamp ISO"""
+        ts = datetime.fromisoformat(str(timestamp))
+        return ts.strftime("%d%m%Y"), ts.hour
+    
+    def ruta_particion(self, fecha: str, hora: int) -> Path:
+        return self.ruta_base / fecha / f"{hora:02d}00.{(hora + 1) % 24:02d}00.csv"
+    
+    def agregar(self, eventos: List[Dict]):
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, lineterminator="\n")
+        for evento in eventos:
+            try:
+                clave = self.particion(evento["timestamp"])
+            except (ValueError, TypeError):
+                logger.warning(f"Timestamp inválido, evento sin partición: {evento.get('timestamp')}")
+                continue
+            writer.writerow([evento[campo] for campo in self.ENCABEZADO])
+            self._buffers.setdefault(clave, []).append(buffer.getvalue())
+            buffer.seek(0)
+            buffer.truncate()
+        
+        self.vaciar()
+    
+    def _handle(self, clave: tuple):
+        handle = self._handles.get(clave)
+        if handle is not None:
+            self._handles.move_to_end(clave)
+            return handle
+        
+        while len(self._handles) >= self.max_abiertos:
+            _, antiguo = self._handles.popitem(last=False)
+            antiguo.close()
+        
+        ruta = self.ruta_particion(*clave)
+        ruta.parent.mkdir(parents=True, exist_ok=True)
+        handle = open(ruta, 'a', encoding='utf-8', newline='')
+        if handle.tell() == 0:
+            handle.write(",".join(self.ENCABEZADO) + "\n")
+        self._handles[clave] = handle
+        return handle
+    
+    def vaciar(self, fsync: bool = False):
+        """Escribe los buffers pendientes en sus particiones"""
+        for clave, lineas in self._buffers.items():
+            handle = self._handle(clave)
+            handle.write("".join(lineas))
+            handle.flush()
+            if fsync:
+                os.fsync(handle.fileno())
+        self._buffers.clear()
+    
+    def cerrar(self):
+        self.vaciar()
+        for handle in self._handles.values():
+            handle.close()
+        self._handles.clear()
+
+
+class EscritorGrupal:
+    """
+    Hilo escritor único con commits agrupados.
+    
+    Los productores (lectores de puerta) solo encolan; el hilo toma todo lo
+    disponible en la cola, lo escribe en una sola operación bajo
+    lock_escritura y confirma los Futures tras el fsync del grupo.
+    """
+    
+    _FIN = object()
+    
+    def __init__(
+        self,
+        gestor: GestorArchivosEventos,
+        capacidad_cola: int = 10000,
+        fsync_cada_n: int = 500,
+        fsync_cada_ms: float = 50.0,
+    ):
+        self.gestor = gestor
+        self.cola = queue.Queue(maxsize=capacidad_cola)
+        self.fsync_cada_n = max(1, fsync_cada_n)
+        self.fsync_cada_s = max(0.0, fsync_cada_ms) / 1000.0
+        self.max_lote = max(1, capacidad_cola)
+        self.hilo = Thread(target=self._bucle, name="escritor-grupal", daemon=True)
+        
+        # Estadísticas
+        self.commits = 0
+        self.fsyncs = 0
+        self.eventos_escritos = 0
+    
+    def iniciar(self):
+        self.hilo.start()
+    
+    def encolar(self, evento: Dict, futuro: Future = None):
+        """Encola un evento; bloquea si la cola está llena (backpressure)"""
+        self.cola.put((evento, futuro))
+    
+    def detener(self):
+        self.cola.put(self._FIN)
+        self.hilo.join()
+    
+    def _bucle(self):
+        pendientes = []          # Futures escritos pero sin fsync
+        sin_sync = 0
+        ultimo_sync = time.monotonic()
+        terminar = False
+        
+        while not terminar:
+            # Esperar el primer elemento (o el vencimiento del fsync por tiempo)
+            espera = None
+            if sin_sync:
+                espera = max(0.0, ultimo_sync + self.fsync_cada_s - time.monotonic())
+            try:
+                item = self.cola.get(timeout=espera)
+            except queue.Empty:
+                item = None
+            
+            lote = []
+            while item is not None:
+                if item is self._FIN:
+                    terminar = True
+                    break
+                lote.append(item)
+                if len(lote) >= self.max_lote:
+                    break
+                try:
+                    item = self.cola.get_nowait()
+                except queue.Empty:
+                    item = None
+            
+            if lote:
+                eventos = [evento for evento, _ in lote]
+                try:
+                    with self.gestor.lock_escritura:
+                        self.gestor._persistir(eventos)
+                    self.commits += 1
+                    self.eventos_escritos += len(eventos)
+                    if not sin_sync:
+                        # El plazo de fsync corre desde el primer evento sin sincronizar
+                        ultimo_sync = time.monotonic()
+                    sin_sync += len(eventos)
+                    pendientes.extend(futuro for _, futuro in lote if futuro is not None)
+                except Exception as e:
+                    logger.error(f"Error en commit grupal ({len(eventos)} eventos): {e}")
+                    for _, futuro in lote:
+                        if futuro is not None:
+                            futuro.set_result(False)
+            
+            vencido = time.monotonic() - ultimo_sync >= self.fsync_cada_s
+            if sin_sync and (sin_sync >= self.fsync_cada_n or vencido or terminar):
+                ok = True
+                try:
+                    with self.gestor.lock_escritura:
+                        self.gestor._sincronizar_disco()
+                    self.fsyncs += 1
+                except Exception as e:
+                    logger.error(f"Error en fsync grupal: {e}")
+                    ok = False
+                for futuro in pendientes:
+                    futuro.set_result(ok)
+                pendientes = []
+                sin_sync = 0
+                ultimo_sync = time.monotonic()
+
+
 # EJEMPLO DE USO
 if __name__ == "__main__":
     gestor = GestorArchivosEventos()
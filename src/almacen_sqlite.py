@@ -0,0 +1,263 @@
+import csv
+import json
+import logging
+import numbers
+import sqlite3
+import time
+from datetime import datetime
+from pathlib import Path
+from threading import Lock
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import yaml
+
+logger = logging.getLogger(__name__)
+
+EPOCH = datetime(1970, 1, 1)
+
+
+class AlmacenSQLite:
+    """
+    Almacén de eventos en SQLite embebido para consultas ad-hoc
+    ("tarjeta T042 el mes pasado", "puerta 5 entre 13:00 y 14:00") sin
+    recorrer los CSV.
+
+    - modo WAL: lectores (paneles) no bloquean al escritor
+    - inserciones en lotes: agregar() acumula y confirma cada
+      `tamano_lote` eventos o `intervalo_flush` segundos (y en vaciar)
+    - índices por (ts), (id_tarjeta, ts) y (puerta, ts); ts son segundos
+      epoch sin zona, igual que columnar.a_epoch
+    - (ts, id_tarjeta, puerta, tipo) es único: repetir un importar() o
+      reinsertar un evento ya guardado no duplica filas
+
+    Se usa como destino secundario de GestorArchivosEventos (sqlite=...)
+    y como origen de SistemaDistribucion (path_eventos="....db").
+    """
+
+    EXTENSIONES = (".db", ".sqlite", ".sqlite3")
+
+    ESQUEMA = """
+        CREATE TABLE IF NOT EXISTS eventos (
+            id INTEGER PRIMARY KEY,
+            ts INTEGER NOT NULL,
+            timestamp TEXT NOT NULL,
+            id_tarjeta TEXT NOT NULL,
+            puerta INTEGER NOT NULL,
+            tipo TEXT NOT NULL
+        );
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_eventos_unico ON eventos (ts, id_tarjeta, puerta, tipo);
+        CREATE INDEX IF NOT EXISTS idx_eventos_ts ON eventos (ts);
+        CREATE INDEX IF NOT EXISTS idx_eventos_tarjeta_ts ON eventos (id_tarjeta, ts);
+        CREATE INDEX IF NOT EXISTS idx_eventos_puerta_ts ON eventos (puerta, ts);
+    """
+
+    # Bases creadas antes del índice único: se eliminan los duplicados
+    # (se conserva la primera inserción) para poder crearlo
+    DEDUPLICAR = """
+        DELETE FROM eventos WHERE id NOT IN (
+            SELECT MIN(id) FROM eventos GROUP BY ts, id_tarjeta, puerta, tipo
+        )
+    """
+
+    INSERTAR = "INSERT OR IGNORE INTO eventos (ts, timestamp, id_tarjeta, puerta, tipo) VALUES (?, ?, ?, ?, ?)"
+
+    def __init__(self, ruta: str, tamano_lote: int = 1000, intervalo_flush: float = 1.0):
+        self.ruta = Path(ruta)
+        self.ruta.parent.mkdir(parents=True, exist_ok=True)
+        self.tamano_lote = max(1, tamano_lote)
+        self.intervalo_flush = intervalo_flush
+        self._lock = Lock()
+        self._pendientes: List[Tuple] = []
+        self._ultimo_flush = time.monotonic()
+
+        self._conexion = sqlite3.connect(str(self.ruta), check_same_thread=False)
+        self._conexion.execute("PRAGMA journal_mode=WAL")
+        self._conexion.execute("PRAGMA synchronous=NORMAL")
+        self._migrar()
+        self._conexion.executescript(self.ESQUEMA)
+        self._conexion.commit()
+
+    def _migrar(self) -> None:
+        tablas = {n for (n,) in self._conexion.execute("SELECT name FROM sqlite_master")}
+        if "eventos" not in tablas or "idx_eventos_unico" in tablas:
+            return
+        with self._conexion:
+            borrados = self._conexion.execute(self.DEDUPLICAR).rowcount
+        if borrados:
+            logger.warning("Eliminados %d eventos duplicados de %s", borrados, self.ruta)
+
+    @classmethod
+    def es_ruta(cls, ruta) -> bool:
+        return Path(ruta).suffix.lower() in cls.EXTENSIONES
+
+    @staticmethod
+    def a_epoch(timestamp) -> int:
+        instante = datetime.fromisoformat(str(timestamp)).replace(tzinfo=None)
+        return int((instante - EPOCH).total_seconds())
+
+    @classmethod
+    def _fila(cls, evento: Dict) -> Optional[Tuple]:
+        try:
+            return (
+                cls.a_epoch(evento["timestamp"]),
+                str(evento["timestamp"]),
+                str(evento["id_tarjeta"]),
+                int(evento["puerta"]),
+                str(evento["tipo"]),
+            )
+        except (KeyError, ValueError, TypeError):
+            return None
+
+    # ------------------------------------------------------------------
+    # Escritura
+    # ------------------------------------------------------------------
+
+    def agregar(self, eventos: List[Dict]) -> None:
+        """Acumula eventos; se confirman en lote (ver vaciar)"""
+        filas = [f for f in map(self._fila, eventos) if f is not None]
+        if len(filas) < len(eventos):
+            logger.warning("Eventos invalidos omitidos en SQLite: %d", len(eventos) - len(filas))
+        with self._lock:
+            self._pendientes.extend(filas)
+            lleno = len(self._pendientes) >= self.tamano_lote
+        if lleno or time.monotonic() - self._ultimo_flush >= self.intervalo_flush:
+            self.vaciar()
+
+    def _insertar(self, filas: List[Tuple]) -> int:
+        """Inserta filas en una transacción; retorna cuántas eran nuevas"""
+        with self._conexion:
+            return self._conexion.executemany(self.INSERTAR, filas).rowcount
+
+    def vaciar(self) -> int:
+        """Inserta los pendientes en una sola transacción; retorna cuántos eran nuevos"""
+        with self._lock:
+            filas, self._pendientes = self._pendientes, []
+            nuevos = self._insertar(filas) if filas else 0
+            self._ultimo_flush = time.monotonic()
+        return nuevos
+
+    def importar(self, origen: str, lote: int = 50000) -> int:
+        """
+        Carga masiva desde eventos.yaml, un .jsonl, un CSV horario o un
+        directorio (todos sus CSV, p.ej. data/ o data/DDMMYYYY).
+        Retorna la cantidad de eventos nuevos; los ya presentes se omiten.
+        """
+        self.vaciar()
+        total = leidos = 0
+        bloque = []
+        with self._lock:
+            for evento in self._leer_origen(Path(origen)):
+                fila = self._fila(evento)
+                if fila is None:
+                    continue
+                bloque.append(fila)
+                if len(bloque) >= lote:
+                    total += self._insertar(bloque)
+                    leidos += len(bloque)
+                    bloque = []
+            if bloque:
+                total += self._insertar(bloque)
+                leidos += len(bloque)
+            self._conexion.execute("ANALYZE")
+        logger.info("Importados %d eventos desde %s a %s (%d ya presentes)",
+                    total, origen, self.ruta, leidos - total)
+        return total
+
+    @staticmethod
+    def _leer_origen(ruta: Path) -> Iterator[Dict]:
+        if ruta.is_dir():
+            for archivo in sorted(ruta.rglob("*.csv")):
+                yield from AlmacenSQLite._leer_origen(archivo)
+            return
+        sufijo = ruta.suffix.lower()
+        if sufijo in {".yaml", ".yml"}:
+            with open(ruta, "r", encoding="utf-8") as f:
+                datos = yaml.safe_load(f) or {}
+            yield from datos.get("eventos", []) or []
+        elif sufijo == ".jsonl":
+            with open(ruta, "r", encoding="utf-8") as f:
+                for linea in f:
+                    linea = linea.strip()
+                    if not linea:
+                        continue
+                    try:
+                        yield json.loads(linea)
+                    except json.JSONDecodeError:
+                        continue
+        elif sufijo == ".csv":
+            with open(ruta, "r", encoding="utf-8", newline="") as f:
+                yield from csv.DictReader(f)
+        else:
+            raise ValueError(f"No se reconoce el origen a importar: {ruta}")
+
+    # ------------------------------------------------------------------
+    # Consultas
+    # ------------------------------------------------------------------
+
+    @classmethod
+    def _filtros(
+        cls,
+        desde=None,
+        hasta=None,
+        tarjeta: str = None,
+        puerta: int = None,
+        tipo: str = None,
+    ) -> Tuple[str, list]:
+        condiciones, parametros = [], []
+        if desde is not None:
+            condiciones.append("ts >= ?")
+            parametros.append(int(desde) if isinstance(desde, numbers.Integral) else cls.a_epoch(desde))
+        if hasta is not None:
+            condiciones.append("ts <= ?")
+            parametros.append(int(hasta) if isinstance(hasta, numbers.Integral) else cls.a_epoch(hasta))
+        if tarjeta is not None:
+            condiciones.append("id_tarjeta = ?")
+            parametros.append(tarjeta)
+        if puerta is not None:
+            condiciones.append("puerta = ?")
+            parametros.append(int(puerta))
+        if tipo is not None:
+            condiciones.append("tipo = ?")
+            parametros.append(tipo)
+        where = (" WHERE " + " AND ".join(condiciones)) if condiciones else ""
+        return where, parametros
+
+    def consultar(self, desde=None, hasta=None, tarjeta: str = None, puerta: int = None,
+                  tipo: str = None, limite: int = None) -> List[Dict]:
+        """
+        Eventos que cumplen los filtros, en orden de tiempo.
+        desde/hasta: timestamp ISO, datetime o segundos epoch (inclusive).
+        """
+        where, parametros = self._filtros(desde, hasta, tarjeta, puerta, tipo)
+        sql = f"SELECT timestamp, id_tarjeta, puerta, tipo FROM eventos{where} ORDER BY ts, id"
+        if limite is not None:
+            sql += " LIMIT ?"
+            parametros.append(int(limite))
+        with self._lock:
+            filas = self._conexion.execute(sql, parametros).fetchall()
+        return [
+            {"timestamp": t, "id_tarjeta": i, "puerta": p, "tipo": k}
+            for t, i, p, k in filas
+        ]
+
+    def contar(self, desde=None, hasta=None, tarjeta: str = None, puerta: int = None, tipo: str = None) -> int:
+        where, parametros = self._filtros(desde, hasta, tarjeta, puerta, tipo)
+        with self._lock:
+            return self._conexion.execute(f"SELECT COUNT(*) FROM eventos{where}", parametros).fetchone()[0]
+
+    def columnas(self, desde=None, hasta=None) -> Tuple[List, List, List, List]:
+        """(timestamps, ids, puertas, tipos) en orden de tiempo, para EventosColumnares.desde_columnas"""
+        where, parametros = self._filtros(desde, hasta)
+        with self._lock:
+            filas = self._conexion.execute(
+                f"SELECT timestamp, id_tarjeta, puerta, tipo FROM eventos{where} ORDER BY ts, id",
+                parametros,
+            ).fetchall()
+        if not filas:
+            return [], [], [], []
+        return tuple(list(c) for c in zip(*filas))
+
+    def cerrar(self) -> None:
+        self.vaciar()
+        with self._lock:
+            self._conexion.close()
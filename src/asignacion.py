@@ -0,0 +1,127 @@
+import logging
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class MatrizAsignacion:
+    """
+    Índice denso de tarjetas y matriz tarjeta×zona de asignacion_tarjetas.
+
+    - tarjetas: ids asignados sin repetir, en orden de configuración
+    - zonas: zonas_funcionales más las que solo aparecen en asignaciones
+    - (filas, columnas): pares tarjeta→zona en formato disperso (COO)
+    - zona_principal: int32 por tarjeta, la última zona donde aparece
+      (mismo criterio que un dict {tarjeta: zona} armado en orden)
+
+    La ocupación por zona es el producto matriz-vector entre la matriz y
+    un vector de presencia por tarjeta, resuelto con np.bincount sobre los
+    pares, sin recorrer zonas ni tarjetas en Python.
+    """
+
+    def __init__(self, zonas: Iterable[str], asignaciones: Dict[str, List[str]]):
+        self.zonas = list(dict.fromkeys(list(zonas) + list(asignaciones)))
+        self.indice_zonas = {z: i for i, z in enumerate(self.zonas)}
+
+        indice = {}
+        principal = {}
+        filas, columnas = [], []
+        for zona, tarjetas in asignaciones.items():
+            columna = self.indice_zonas[zona]
+            for tarjeta in tarjetas or []:
+                fila = indice.setdefault(tarjeta, len(indice))
+                principal[fila] = columna
+                filas.append(fila)
+                columnas.append(columna)
+        self.tarjetas = list(indice)
+        self.indice_tarjetas = indice
+
+        self.filas = np.asarray(filas, dtype=np.int32)
+        self.columnas = np.asarray(columnas, dtype=np.int32)
+        self.zona_principal = np.fromiter(
+            (principal[i] for i in range(len(indice))), dtype=np.int32, count=len(indice)
+        )
+        if len(self.filas) > len(self.tarjetas):
+            logger.info(
+                "Asignaciones repetidas o en mas de una zona: %d",
+                len(self.filas) - len(self.tarjetas),
+            )
+
+    @classmethod
+    def desde_arrays(
+        cls,
+        zonas: List[str],
+        tarjetas: List[str],
+        filas: np.ndarray,
+        columnas: np.ndarray,
+        zona_principal: np.ndarray,
+    ) -> "MatrizAsignacion":
+        """Reconstruye la matriz ya compilada (ver config_compilada.ConfigCompilada)"""
+        matriz = cls.__new__(cls)
+        matriz.zonas = list(zonas)
+        matriz.indice_zonas = {z: i for i, z in enumerate(matriz.zonas)}
+        matriz.tarjetas = list(tarjetas)
+        matriz.indice_tarjetas = {t: i for i, t in enumerate(matriz.tarjetas)}
+        matriz.filas = np.asarray(filas, dtype=np.int32)
+        matriz.columnas = np.asarray(columnas, dtype=np.int32)
+        matriz.zona_principal = np.asarray(zona_principal, dtype=np.int32)
+        return matriz
+
+    def asignaciones(self, zonas: List[str] = None) -> Dict[str, List[str]]:
+        """Vuelve al formato asignacion_tarjetas {zona: [tarjetas]} (orden original)"""
+        resultado = {z: [] for z in (zonas if zonas is not None else self.zonas)}
+        for fila, columna in zip(self.filas.tolist(), self.columnas.tolist()):
+            resultado.setdefault(self.zonas[columna], []).append(self.tarjetas[fila])
+        return resultado
+
+    @property
+    def n_tarjetas(self) -> int:
+        return len(self.tarjetas)
+
+    @property
+    def n_zonas(self) -> int:
+        return len(self.zonas)
+
+    def matriz_densa(self) -> np.ndarray:
+        """Matriz bool (n_tarjetas × n_zonas)"""
+        matriz = np.zeros((self.n_tarjetas, self.n_zonas), dtype=bool)
+        matriz[self.filas, self.columnas] = True
+        return matriz
+
+    def zona_de(self, tarjeta: str, defecto: Optional[str] = None) -> Optional[str]:
+        """Zona de la tarjeta (la última si está en varias) o `defecto`"""
+        i = self.indice_tarjetas.get(tarjeta)
+        if i is None:
+            return defecto
+        return self.zonas[self.zona_principal[i]]
+
+    def alinear(self, tarjetas: List[str]) -> np.ndarray:
+        """
+        Posición de cada tarjeta asignada dentro de otra tabla de ids (p.ej.
+        EventosColumnares.tarjetas); len(tarjetas) si no aparece.
+        """
+        n = len(self.tarjetas)
+        if tarjetas[:n] == self.tarjetas:
+            return np.arange(n, dtype=np.int64)
+        indice = {t: i for i, t in enumerate(tarjetas)}
+        faltante = len(tarjetas)
+        return np.fromiter((indice.get(t, faltante) for t in self.tarjetas), dtype=np.int64, count=n)
+
+    def zona_en(self, tarjetas: List[str]) -> np.ndarray:
+        """Zona (índice en self.zonas) de cada id de `tarjetas`, -1 si no está asignado"""
+        zona = np.full(len(tarjetas), -1, dtype=np.int32)
+        posiciones = self.alinear(tarjetas)
+        validas = posiciones < len(tarjetas)
+        zona[posiciones[validas]] = self.zona_principal[validas]
+        return zona
+
+    def conteos(self, presentes: np.ndarray) -> np.ndarray:
+        """Ocupación por zona (int64, orden de self.zonas) dado un vector bool por tarjeta"""
+        pesos = np.asarray(presentes, dtype=bool)[self.filas]
+        return np.bincount(self.columnas[pesos], minlength=self.n_zonas)
+
+    def distribucion(self, presentes: np.ndarray) -> Dict[str, int]:
+        """conteos() como dict {zona: personas}"""
+        return dict(zip(self.zonas, self.conteos(presentes).tolist()))
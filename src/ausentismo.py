@@ -0,0 +1,304 @@
+import argparse
+import logging
+import os
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from asignacion import MatrizAsignacion
+from cache_dias import CacheDia
+from columnar import EventosColumnares
+from config_compilada import ConfigCompilada
+from particiones import PATRON_DIA, PATRON_HORA, a_datetime
+from validacion import leer_csv_columnar
+
+logger = logging.getLogger(__name__)
+
+# Cantidad de bits en 1 de cada byte (popcount por tabla)
+BITS_EN_BYTE = np.unpackbits(np.arange(256, dtype=np.uint8)[:, None], axis=1).sum(axis=1)
+
+DIAS_SEMANA = ["lunes", "martes", "miercoles", "jueves", "viernes", "sabado", "domingo"]
+
+UMBRAL_AUSENTISMO = 0.05
+
+# Días por bloque al contar ausentes por zona (acota la matriz desempaquetada)
+DIAS_POR_BLOQUE = 256
+
+
+def _contar_bits(bytes_: np.ndarray, eje: int = -1) -> np.ndarray:
+    return BITS_EN_BYTE[bytes_].sum(axis=eje)
+
+
+def _leer_dia(archivos: List[Path]) -> List[EventosColumnares]:
+    return [leer_csv_columnar(a) for a in archivos]
+
+
+class RegistroPresencia:
+    """
+    Presencia diaria de todas las tarjetas de asignacion_tarjetas como
+    bitsets: una fila por día con un bit por tarjeta (np.packbits), en el
+    orden del índice de MatrizAsignacion. Un año de 10.000 tarjetas ocupa
+    ~450 KB. Se guarda en data/.presencia.npz y solo se recalculan los días
+    cuyos CSV cambiaron (huella: cantidad, tamaño total y mtime máximo).
+
+    Una tarjeta está presente un día si registra al menos un evento. Los
+    días sin ninguna tarjeta presente se consideran no laborables y no
+    cuentan para el ausentismo.
+    """
+
+    NOMBRE = ".presencia.npz"
+    VERSION = 1
+
+    def __init__(
+        self,
+        matriz: MatrizAsignacion,
+        dias: np.ndarray = None,
+        bits: np.ndarray = None,
+        huellas: np.ndarray = None,
+    ):
+        self.matriz = matriz
+        n_bytes = (matriz.n_tarjetas + 7) // 8
+        self.dias = np.empty(0, dtype="datetime64[D]") if dias is None else dias
+        self.bits = np.empty((0, n_bytes), dtype=np.uint8) if bits is None else bits
+        self.huellas = np.empty((0, 3), dtype=np.int64) if huellas is None else huellas
+
+        # Máscara empaquetada de todas las tarjetas; pertenencia tarjeta x zona
+        # en float32 para contar ausentes por zona con un producto de matrices
+        self.mascara = np.packbits(np.ones(matriz.n_tarjetas, dtype=bool))
+        self.zonas_tarjeta = np.zeros((matriz.n_tarjetas, matriz.n_zonas), dtype=np.float32)
+        self.zonas_tarjeta[matriz.filas, matriz.columnas] = 1
+        self.asignados_zona = self.zonas_tarjeta.sum(axis=0).astype(np.int64)
+
+    # ------------------------------------------------------------------
+    # Construcción y persistencia
+    # ------------------------------------------------------------------
+
+    @classmethod
+    def ruta_registro(cls, path_base) -> Path:
+        return Path(path_base) / cls.NOMBRE
+
+    @classmethod
+    def cargar(cls, path_base: str = "data", path_config: str = "config/configuracion.yaml") -> "RegistroPresencia":
+        """Registro desde data/.presencia.npz, actualizado con los días nuevos o modificados"""
+        matriz = ConfigCompilada.cargar(path_config).matriz
+        ruta = cls.ruta_registro(path_base)
+        registro = None
+        if ruta.exists():
+            try:
+                registro = cls._leer(ruta, matriz)
+            except (KeyError, ValueError, OSError) as e:
+                logger.info("Registro de presencia obsoleto o invalido (%s), se reconstruye", e)
+        if registro is None:
+            registro = cls(matriz)
+        if registro.actualizar(path_base):
+            try:
+                registro.guardar(ruta)
+            except OSError as e:
+                logger.warning("No se pudo escribir registro de presencia %s: %s", ruta, e)
+        return registro
+
+    @classmethod
+    def _leer(cls, ruta: Path, matriz: MatrizAsignacion) -> "RegistroPresencia":
+        with np.load(ruta, allow_pickle=False) as datos:
+            if int(datos["version"]) != cls.VERSION:
+                raise ValueError("version distinta")
+            # Los bits siguen el orden de tarjetas: si cambió la asignación se reconstruye
+            if datos["tarjetas"].tolist() != matriz.tarjetas:
+                raise ValueError("tarjetas asignadas distintas")
+            return cls(matriz, datos["dias"], datos["bits"], datos["huellas"])
+
+    def guardar(self, ruta: Path) -> None:
+        tmp = ruta.with_name(ruta.name + ".tmp.npz")
+        np.savez_compressed(
+            tmp,
+            version=np.int64(self.VERSION),
+            tarjetas=np.array(self.matriz.tarjetas, dtype=str),
+            dias=self.dias,
+            bits=self.bits,
+            huellas=self.huellas,
+        )
+        os.replace(tmp, ruta)
+
+    @staticmethod
+    def _huella(archivos: List[Path]) -> Tuple[int, int, int]:
+        estados = [a.stat() for a in archivos]
+        return len(estados), sum(e.st_size for e in estados), max((e.st_mtime_ns for e in estados), default=0)
+
+    def presencia(self, columnar: EventosColumnares) -> np.ndarray:
+        """Fila empaquetada: bit en 1 para cada tarjeta asignada con algún evento"""
+        vistas = np.zeros(columnar.n_tarjetas + 1, dtype=bool)
+        vistas[columnar.tarjeta] = True
+        return np.packbits(vistas[self.matriz.alinear(columnar.tarjetas)])
+
+    def actualizar(self, path_base: str = "data") -> int:
+        """Recalcula los días de data/DDMMYYYY nuevos o con CSV modificados; retorna cuántos"""
+        filas = dict(zip(self.dias.tolist(), zip(self.bits, self.huellas.tolist())))
+        cambiados = 0
+        for directorio in Path(path_base).iterdir():
+            if not directorio.is_dir() or not PATRON_DIA.match(directorio.name):
+                continue
+            try:
+                dia = datetime.strptime(directorio.name, "%d%m%Y").date()
+            except ValueError:
+                continue
+            archivos = sorted(a for a in directorio.glob("*.csv") if PATRON_HORA.match(a.name))
+            if not archivos:
+                continue
+            huella = list(self._huella(archivos))
+            if dia in filas and filas[dia][1] == huella:
+                continue
+            partes = CacheDia(directorio).cargar(archivos, _leer_dia)
+            columnar = EventosColumnares.concatenar(partes, self.matriz.tarjetas)
+            filas[dia] = (self.presencia(columnar), huella)
+            cambiados += 1
+
+        if cambiados:
+            orden = sorted(filas)
+            self.dias = np.array(orden, dtype="datetime64[D]")
+            self.bits = np.array([filas[d][0] for d in orden], dtype=np.uint8).reshape(len(orden), -1)
+            self.huellas = np.array([filas[d][1] for d in orden], dtype=np.int64).reshape(len(orden), 3)
+            logger.info("Registro de presencia: %d dias actualizados (%d en total)", cambiados, len(orden))
+        return cambiados
+
+    # ------------------------------------------------------------------
+    # Consultas
+    # ------------------------------------------------------------------
+
+    def _seleccion(self, desde=None, hasta=None) -> np.ndarray:
+        """Índices de los días laborables dentro de [desde, hasta]"""
+        seleccion = _contar_bits(self.bits) > 0
+        if desde is not None:
+            seleccion &= self.dias >= np.datetime64(a_datetime(desde).date())
+        if hasta is not None:
+            seleccion &= self.dias <= np.datetime64(a_datetime(hasta).date())
+        return np.flatnonzero(seleccion)
+
+    def ausencias(self, desde=None, hasta=None) -> Tuple[np.ndarray, np.ndarray]:
+        """(días laborables, bits de ausencia empaquetados) en el rango"""
+        filas = self._seleccion(desde, hasta)
+        return self.dias[filas], ~self.bits[filas] & self.mascara
+
+    def ausentes_por_zona(self, ausentes: np.ndarray) -> np.ndarray:
+        """
+        Ausentes por (día, zona) a partir de los bits empaquetados: cada
+        bloque de DIAS_POR_BLOQUE días se desempaqueta y se multiplica por
+        zonas_tarjeta, sin materializar días x zonas x tarjetas.
+        """
+        conteos = np.zeros((len(ausentes), self.matriz.n_zonas), dtype=np.int64)
+        for inicio in range(0, len(ausentes), DIAS_POR_BLOQUE):
+            bloque = np.unpackbits(
+                ausentes[inicio:inicio + DIAS_POR_BLOQUE], axis=1, count=self.matriz.n_tarjetas
+            )
+            # Conteos exactos en float32 mientras haya menos de 2**24 tarjetas
+            conteos[inicio:inicio + len(bloque)] = np.rint(bloque.astype(np.float32) @ self.zonas_tarjeta)
+        return conteos
+
+    def por_dia(self, desde=None, hasta=None) -> Dict[str, Dict]:
+        """{fecha ISO: {ausentes, asignados, tasa, por_zona: {zona: tasa}}}"""
+        dias, ausentes = self.ausencias(desde, hasta)
+        total = _contar_bits(ausentes)
+        por_zona = self.ausentes_por_zona(ausentes)
+        asignados_zona = self.asignados_zona
+        n = self.matriz.n_tarjetas
+        resultado = {}
+        for i, dia in enumerate(dias.astype(str).tolist()):
+            resultado[dia] = {
+                "ausentes": int(total[i]),
+                "asignados": n,
+                "tasa": float(total[i] / n) if n else 0.0,
+                "por_zona": {
+                    zona: float(por_zona[i, z] / asignados_zona[z])
+                    for z, zona in enumerate(self.matriz.zonas) if asignados_zona[z]
+                },
+            }
+        return resultado
+
+    def por_departamento(self, desde=None, hasta=None) -> Dict[str, float]:
+        """Tasa de ausentismo por zona en el rango (ausencias / tarjeta-días asignados)"""
+        dias, ausentes = self.ausencias(desde, hasta)
+        por_zona = self.ausentes_por_zona(ausentes).sum(axis=0)
+        asignados = self.asignados_zona * len(dias)
+        return {
+            zona: float(por_zona[z] / asignados[z])
+            for z, zona in enumerate(self.matriz.zonas) if asignados[z]
+        }
+
+    def por_dia_semana(self, desde=None, hasta=None) -> Dict[str, float]:
+        """Tasa de ausentismo por día de la semana (solo los que tienen días laborables)"""
+        dias, ausentes = self.ausencias(desde, hasta)
+        # 1970-01-01 fue jueves: lunes = 0
+        semana = (dias.astype(np.int64) + 3) % 7
+        conteo = np.bincount(semana, weights=_contar_bits(ausentes), minlength=7)
+        cantidad = np.bincount(semana, minlength=7)
+        n = self.matriz.n_tarjetas
+        return {
+            DIAS_SEMANA[d]: float(conteo[d] / (cantidad[d] * n))
+            for d in range(7) if cantidad[d] and n
+        }
+
+    def rachas(self, desde=None, hasta=None, minimo: int = 1) -> Dict[str, Tuple[int, int]]:
+        """
+        {tarjeta: (racha_actual, racha_maxima)} de días laborables
+        consecutivos ausente, para las tarjetas con racha máxima >= minimo.
+        """
+        _, ausentes = self.ausencias(desde, hasta)
+        if len(ausentes) == 0:
+            return {}
+        ausente = np.unpackbits(ausentes, axis=1, count=self.matriz.n_tarjetas).astype(bool)
+        # Largo de racha = fila actual - último día presente
+        filas = np.arange(len(ausente))[:, None]
+        ultimo_presente = np.maximum.accumulate(np.where(ausente, -1, filas), axis=0)
+        racha = filas - ultimo_presente
+        maxima = racha.max(axis=0)
+        actual = racha[-1]
+        return {
+            self.matriz.tarjetas[t]: (int(actual[t]), int(maxima[t]))
+            for t in np.flatnonzero(maxima >= minimo).tolist()
+        }
+
+    def alertas(self, umbral: float = UMBRAL_AUSENTISMO, desde=None, hasta=None) -> List[Dict]:
+        """Días (total y por zona) con ausentismo mayor a `umbral`"""
+        dias, ausentes = self.ausencias(desde, hasta)
+        n = self.matriz.n_tarjetas
+        asignados_zona = self.asignados_zona
+        tasas = np.column_stack([
+            _contar_bits(ausentes) / max(n, 1),
+            self.ausentes_por_zona(ausentes) / np.maximum(asignados_zona, 1),
+        ])
+        etiquetas = ["TOTAL"] + list(self.matriz.zonas)
+        validas = np.concatenate([[n > 0], asignados_zona > 0])
+        filas, columnas = np.nonzero((tasas > umbral) & validas)
+        alertas = [
+            {"fecha": str(dias[f]), "zona": etiquetas[c], "tasa": float(tasas[f, c])}
+            for f, c in zip(filas.tolist(), columnas.tolist())
+        ]
+        if alertas:
+            logger.warning("Ausentismo sobre %.0f%%: %d alertas", umbral * 100, len(alertas))
+        return alertas
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Panel de ausencias diarias")
+    parser.add_argument("--data", default="data", help="Directorio base de eventos")
+    parser.add_argument("--config", default="config/configuracion.yaml")
+    parser.add_argument("--desde", help="Fecha inicial (DDMMYYYY o YYYY-MM-DD)")
+    parser.add_argument("--hasta", help="Fecha final (DDMMYYYY o YYYY-MM-DD)")
+    parser.add_argument("--umbral", type=float, default=None, help="Umbral de alerta (0.05 = 5%%)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(message)s")
+    registro = RegistroPresencia.cargar(args.data, args.config)
+    umbral = args.umbral
+    if umbral is None:
+        umbral = ConfigCompilada.cargar(args.config).umbrales.get("umbral_ausentismo", UMBRAL_AUSENTISMO)
+
+    print(f"{'Fecha':<12}{'Ausentes':>10}{'Tasa':>8}  Alerta")
+    for fecha, fila in registro.por_dia(args.desde, args.hasta).items():
+        alerta = "ALERTA" if fila["tasa"] > umbral else ""
+        print(f"{fecha:<12}{fila['ausentes']:>10}{fila['tasa']:>8.1%}  {alerta}")
+    print("\nPor departamento:", {z: f"{t:.1%}" for z, t in registro.por_departamento(args.desde, args.hasta).items()})
+    print("Por dia de semana:", {d: f"{t:.1%}" for d, t in registro.por_dia_semana(args.desde, args.hasta).items()})
+    for alerta in registro.alertas(umbral, args.desde, args.hasta):
+        print(f"ALERTA {alerta['fecha']} {alerta['zona']}: {alerta['tasa']:.1%}")
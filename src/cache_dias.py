@@ -0,0 +1,155 @@
+import hashlib
+import logging
+import os
+from pathlib import Path
+from typing import Callable, Dict, List
+
+import numpy as np
+
+from columnar import EventosColumnares
+
+logger = logging.getLogger(__name__)
+
+
+class CacheDia:
+    """
+    Cache en disco de un directorio diario data/DDMMYYYY ya parseado.
+
+    Guarda en <directorio>/.cache_eventos.npz un tramo columnar por archivo
+    horario, con su huella (tamaño, mtime_ns, hash blake2b). Al cargar:
+
+    - tamaño y mtime iguales: se usa el tramo sin leer el CSV
+    - tamaño o mtime distintos: se calcula el hash; si coincide solo se
+      actualiza la huella, si no el archivo se vuelve a parsear
+
+    Así, reescribir un archivo horario invalida únicamente su tramo.
+    """
+
+    NOMBRE = ".cache_eventos.npz"
+    VERSION = 2
+
+    def __init__(self, directorio: Path):
+        self.directorio = Path(directorio)
+        self.ruta = self.directorio / self.NOMBRE
+        # Estadísticas de la última carga
+        self.aciertos = 0
+        self.parseados = 0
+
+    @staticmethod
+    def hash_archivo(ruta: Path) -> str:
+        h = hashlib.blake2b(digest_size=16)
+        with open(ruta, "rb") as f:
+            for bloque in iter(lambda: f.read(1 << 20), b""):
+                h.update(bloque)
+        return h.hexdigest()
+
+    def _leer(self) -> Dict[str, dict]:
+        """Retorna {nombre_archivo: {tamano, mtime_ns, hash, parte}} desde el npz"""
+        if not self.ruta.exists():
+            return {}
+        try:
+            with np.load(self.ruta, allow_pickle=False) as datos:
+                if int(datos["version"]) != self.VERSION:
+                    return {}
+                nombres = datos["nombres"].tolist()
+                tamanos = datos["tamanos"]
+                mtimes = datos["mtimes"]
+                hashes = datos["hashes"].tolist()
+                off_filas = datos["off_filas"]
+                off_tarjetas = datos["off_tarjetas"]
+                ts, tarjeta, puerta, tipo = datos["ts"], datos["tarjeta"], datos["puerta"], datos["tipo"]
+                tabla = datos["tarjetas"].tolist()
+        except Exception as e:
+            logger.warning("Cache invalido en %s, se reconstruye: %s", self.ruta, e)
+            return {}
+
+        entradas = {}
+        for i, nombre in enumerate(nombres):
+            a, b = off_filas[i], off_filas[i + 1]
+            c, d = off_tarjetas[i], off_tarjetas[i + 1]
+            entradas[nombre] = {
+                "tamano": int(tamanos[i]),
+                "mtime_ns": int(mtimes[i]),
+                "hash": hashes[i],
+                "parte": EventosColumnares(ts[a:b], tarjeta[a:b], puerta[a:b], tipo[a:b], tabla[c:d]),
+            }
+        return entradas
+
+    def _guardar(self, entradas: Dict[str, dict]) -> None:
+        nombres = list(entradas)
+        partes = [entradas[n]["parte"] for n in nombres]
+        off_filas = np.cumsum([0] + [len(p) for p in partes]).astype(np.int64)
+        off_tarjetas = np.cumsum([0] + [p.n_tarjetas for p in partes]).astype(np.int64)
+
+        def unir(columna, dtype):
+            if not partes:
+                return np.empty(0, dtype=dtype)
+            return np.concatenate([getattr(p, columna) for p in partes]).astype(dtype, copy=False)
+
+        tmp = self.ruta.with_name(self.ruta.name + ".tmp.npz")
+        np.savez(
+            tmp,
+            version=np.int64(self.VERSION),
+            nombres=np.array(nombres, dtype=str),
+            tamanos=np.array([entradas[n]["tamano"] for n in nombres], dtype=np.int64),
+            mtimes=np.array([entradas[n]["mtime_ns"] for n in nombres], dtype=np.int64),
+            hashes=np.array([entradas[n]["hash"] for n in nombres], dtype=str),
+            off_filas=off_filas,
+            off_tarjetas=off_tarjetas,
+            ts=unir("ts", np.int64),
+            tarjeta=unir("tarjeta", np.int32),
+            puerta=unir("puerta", np.int16),
+            tipo=unir("tipo", np.uint8),
+            tarjetas=np.array([t for p in partes for t in p.tarjetas], dtype=str),
+        )
+        os.replace(tmp, self.ruta)
+
+    def cargar(
+        self,
+        archivos: List[Path],
+        lector: Callable[[List[Path]], List[EventosColumnares]],
+    ) -> List[EventosColumnares]:
+        """
+        Retorna un tramo columnar por archivo (en el mismo orden), usando el
+        cache cuando la huella coincide y `lector` para los demás.
+
+        `archivos` puede ser un subconjunto del día (carga por rango): los
+        tramos de otros archivos que siguen existiendo se conservan.
+        """
+        previas = self._leer()
+        pedidos = {a.name for a in archivos}
+        entradas = {
+            nombre: previa for nombre, previa in previas.items()
+            if nombre not in pedidos and (self.directorio / nombre).exists()
+        }
+        pendientes = []
+        # Algún archivo del cache ya no existe
+        cambios = len(entradas) + len(pedidos & set(previas)) != len(previas)
+
+        for archivo in archivos:
+            info = archivo.stat()
+            previa = previas.get(archivo.name)
+            if previa and previa["tamano"] == info.st_size and previa["mtime_ns"] == info.st_mtime_ns:
+                entradas[archivo.name] = previa
+                continue
+            huella = self.hash_archivo(archivo)
+            cambios = True
+            if previa and previa["hash"] == huella:
+                # Mismo contenido (p.ej. touch): solo se actualiza la huella
+                previa.update(tamano=info.st_size, mtime_ns=info.st_mtime_ns)
+                entradas[archivo.name] = previa
+                continue
+            entradas[archivo.name] = {"tamano": info.st_size, "mtime_ns": info.st_mtime_ns, "hash": huella}
+            pendientes.append(archivo)
+
+        for archivo, parte in zip(pendientes, lector(pendientes) if pendientes else []):
+            entradas[archivo.name]["parte"] = parte
+
+        self.parseados = len(pendientes)
+        self.aciertos = len(archivos) - len(pendientes)
+        if cambios:
+            try:
+                self._guardar(entradas)
+            except OSError as e:
+                logger.warning("No se pudo escribir cache %s: %s", self.ruta, e)
+        return [entradas[a.name]["parte"] for a in archivos]
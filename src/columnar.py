@@ -0,0 +1,332 @@
+import logging
+from typing import Dict, Iterable, Iterator, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+TIPO_ENTRADA = 0
+TIPO_SALIDA = 1
+TIPO_OTRO = 2
+TIPOS = {"entrada": TIPO_ENTRADA, "salida": TIPO_SALIDA}
+NOMBRES_TIPO = {TIPO_ENTRADA: "entrada", TIPO_SALIDA: "salida", TIPO_OTRO: "otro"}
+
+
+def a_epoch(timestamps) -> np.ndarray:
+    """Convierte timestamps ISO (str o datetime) a segundos epoch int64 (hora local, sin zona)"""
+    return np.asarray(timestamps, dtype="datetime64[s]").astype(np.int64)
+
+
+def desde_epoch(segundos: int) -> str:
+    """Inverso de a_epoch para un valor: 'YYYY-MM-DDTHH:MM:SS'"""
+    return str(np.datetime64(int(segundos), "s"))
+
+
+class ContadorOrden:
+    """
+    Contadores de orden temporal al unir fuentes (archivos horarios):
+
+    - filas: filas vistas
+    - desordenadas: filas con timestamp menor al de la fila anterior de su
+      misma fuente
+    - fuentes_desordenadas: fuentes con al menos una fila desordenada
+    - solapadas: fuentes cuyo rango de tiempo se solapa con otra (se
+      mezclan entre sí en vez de solo concatenarse)
+    """
+
+    def __init__(self):
+        self.filas = 0
+        self.desordenadas = 0
+        self.fuentes_desordenadas = 0
+        self.solapadas = 0
+
+    def __repr__(self) -> str:
+        return (
+            f"ContadorOrden(filas={self.filas}, desordenadas={self.desordenadas}, "
+            f"fuentes_desordenadas={self.fuentes_desordenadas}, solapadas={self.solapadas})"
+        )
+
+
+class EventosColumnares:
+    """
+    Representación compacta de eventos en arrays NumPy paralelos:
+
+    - ts:      int64  segundos epoch
+    - tarjeta: int32  índice en self.tarjetas (ids internados)
+    - puerta:  int16
+    - tipo:    uint8  (TIPO_ENTRADA / TIPO_SALIDA / TIPO_OTRO)
+
+    Las filas conservan el orden de la lista de origen.
+    """
+
+    def __init__(
+        self,
+        ts: np.ndarray,
+        tarjeta: np.ndarray,
+        puerta: np.ndarray,
+        tipo: np.ndarray,
+        tarjetas: List[str],
+    ):
+        self.ts = ts
+        self.tarjeta = tarjeta
+        self.puerta = puerta
+        self.tipo = tipo
+        self.tarjetas = tarjetas
+        self.indice_tarjetas = {t: i for i, t in enumerate(tarjetas)}
+
+    @classmethod
+    def vacio(cls, tarjetas_conocidas: Optional[Iterable[str]] = None) -> "EventosColumnares":
+        return cls(
+            np.empty(0, dtype=np.int64),
+            np.empty(0, dtype=np.int32),
+            np.empty(0, dtype=np.int16),
+            np.empty(0, dtype=np.uint8),
+            list(dict.fromkeys(tarjetas_conocidas or [])),
+        )
+
+    @classmethod
+    def desde_eventos(
+        cls,
+        eventos: List[Dict],
+        tarjetas_conocidas: Optional[Iterable[str]] = None,
+    ) -> "EventosColumnares":
+        """
+        Construye la representación columnar desde la lista de dicts.
+
+        Args:
+            eventos: Lista de dicts con timestamp, id_tarjeta, puerta, tipo
+            tarjetas_conocidas: Ids que reciben los primeros índices (p.ej.
+                las de asignacion_tarjetas), para que el índice sea estable
+        """
+        if not eventos:
+            return cls.vacio(tarjetas_conocidas)
+        return cls.desde_columnas(
+            [e["timestamp"] for e in eventos],
+            [e["id_tarjeta"] for e in eventos],
+            [e["puerta"] for e in eventos],
+            [e["tipo"] for e in eventos],
+            tarjetas_conocidas,
+        )
+
+    @classmethod
+    def desde_columnas(
+        cls,
+        timestamps: List,
+        ids: List[str],
+        puertas: List[int],
+        tipos: List[str],
+        tarjetas_conocidas: Optional[Iterable[str]] = None,
+    ) -> "EventosColumnares":
+        """Construye la representación desde listas paralelas (sin dicts por fila)"""
+        if len(timestamps) == 0:
+            return cls.vacio(tarjetas_conocidas)
+
+        try:
+            ts = a_epoch(timestamps)
+            validos = None
+        except ValueError:
+            # Al menos un timestamp inválido: convertir de a uno y descartar los malos
+            ts = np.zeros(len(timestamps), dtype=np.int64)
+            validos = np.ones(len(timestamps), dtype=bool)
+            for i, valor in enumerate(timestamps):
+                try:
+                    ts[i] = np.datetime64(valor, "s").astype(np.int64)
+                except ValueError:
+                    validos[i] = False
+            logger.warning("Eventos con timestamp invalido omitidos: %d", int((~validos).sum()))
+
+        tarjeta, tarjetas = cls._internar(ids, tarjetas_conocidas)
+        puerta = np.asarray(puertas, dtype=np.int16)
+        tipos_txt = np.asarray(tipos, dtype=str)
+        tipo = np.full(len(tipos_txt), TIPO_OTRO, dtype=np.uint8)
+        for nombre, codigo in TIPOS.items():
+            tipo[tipos_txt == nombre] = codigo
+
+        if validos is not None:
+            ts, tarjeta, puerta, tipo = ts[validos], tarjeta[validos], puerta[validos], tipo[validos]
+        return cls(ts, tarjeta, puerta, tipo, tarjetas)
+
+    @classmethod
+    def concatenar(
+        cls,
+        partes: List["EventosColumnares"],
+        tarjetas_conocidas: Optional[Iterable[str]] = None,
+    ) -> "EventosColumnares":
+        """
+        Une varias partes (p.ej. una por archivo horario), re-mapeando los
+        índices de tarjeta de cada parte a una tabla común.
+        """
+        tarjetas = list(dict.fromkeys(tarjetas_conocidas or []))
+        indice = {t: i for i, t in enumerate(tarjetas)}
+        codigos = []
+        for parte in partes:
+            mapa = np.empty(parte.n_tarjetas, dtype=np.int32)
+            for i, tarjeta in enumerate(parte.tarjetas):
+                if tarjeta not in indice:
+                    indice[tarjeta] = len(tarjetas)
+                    tarjetas.append(tarjeta)
+                mapa[i] = indice[tarjeta]
+            codigos.append(mapa[parte.tarjeta])
+        if not partes:
+            return cls.vacio(tarjetas)
+        return cls(
+            np.concatenate([p.ts for p in partes]),
+            np.concatenate(codigos).astype(np.int32, copy=False),
+            np.concatenate([p.puerta for p in partes]),
+            np.concatenate([p.tipo for p in partes]),
+            tarjetas,
+        )
+
+    @classmethod
+    def fusionar(
+        cls,
+        partes: List["EventosColumnares"],
+        tarjetas_conocidas: Optional[Iterable[str]] = None,
+        contador: Optional[ContadorOrden] = None,
+    ) -> "EventosColumnares":
+        """
+        Como concatenar(...).ordenar() pero sin ordenar todo: el orden se
+        revisa en una pasada; las partes con rangos de tiempo disjuntos se
+        concatenan en orden de inicio y solo se ordenan las que vienen
+        desordenadas o se solapan con otra (entre sí). Para archivos
+        horarios en orden el costo es lineal. Mismo resultado que
+        ordenar() (estable: en empates gana el orden de `partes`).
+        """
+        contador = contador if contador is not None else ContadorOrden()
+        unida = cls.concatenar(partes, tarjetas_conocidas)
+        ts = unida.ts
+        limites = np.cumsum([0] + [len(p) for p in partes])
+        contador.filas += len(ts)
+
+        descensos = ts[1:] < ts[:-1]
+        # Descensos en el borde entre dos partes no son desorden de una fuente
+        internos = descensos.copy()
+        bordes = limites[1:-1]
+        internos[bordes[(bordes > 0) & (bordes < len(ts))] - 1] = False
+        contador.desordenadas += int(internos.sum())
+        if not descensos.any():
+            return unida
+
+        # Rango [mínimo, máximo] y filas desordenadas de cada parte no vacía
+        no_vacias = [k for k in range(len(partes)) if limites[k + 1] > limites[k]]
+        inicios = limites[no_vacias]
+        minimos = np.minimum.reduceat(ts, inicios)
+        maximos = np.maximum.reduceat(ts, inicios)
+        desorden = np.add.reduceat(np.append(internos, False), inicios)
+        contador.fuentes_desordenadas += int(np.count_nonzero(desorden))
+
+        # Grupos de partes solapadas (un borde compartido también se solapa)
+        grupos, fin_grupo = [], None
+        for i in sorted(range(len(no_vacias)), key=lambda i: (minimos[i], i)):
+            if grupos and minimos[i] <= fin_grupo:
+                grupos[-1].append(i)
+                fin_grupo = max(fin_grupo, maximos[i])
+            else:
+                grupos.append([i])
+                fin_grupo = maximos[i]
+
+        tramos = []
+        for grupo in grupos:
+            # En el orden original de las partes para desempatar igual que ordenar()
+            grupo.sort()
+            if len(grupo) > 1:
+                contador.solapadas += len(grupo)
+            desde, hasta = limites[no_vacias[grupo[0]]], limites[no_vacias[grupo[-1]] + 1]
+            contiguo = hasta - desde == sum(len(partes[no_vacias[i]]) for i in grupo)
+            ordenar = len(grupo) > 1 or bool(desorden[grupo[0]])
+            tramos.append((grupo, int(desde), int(hasta), contiguo, ordenar))
+
+        if all(t[3] for t in tramos) and all(a[2] == b[1] for a, b in zip(tramos, tramos[1:])):
+            # Caso usual (archivos en orden de hora): se ordena cada tramo en su lugar
+            for _, desde, hasta, _, ordenar in tramos:
+                if ordenar:
+                    filas = np.argsort(ts[desde:hasta], kind="stable")
+                    for columna in (unida.ts, unida.tarjeta, unida.puerta, unida.tipo):
+                        columna[desde:hasta] = columna[desde:hasta][filas]
+            return unida
+
+        orden = []
+        for grupo, desde, hasta, contiguo, ordenar in tramos:
+            if contiguo:
+                filas = np.arange(desde, hasta)
+            else:
+                filas = np.concatenate([
+                    np.arange(limites[no_vacias[i]], limites[no_vacias[i] + 1]) for i in grupo
+                ])
+            orden.append(filas[np.argsort(ts[filas], kind="stable")] if ordenar else filas)
+        return unida.filtrar(np.concatenate(orden))
+
+    def ordenar(self) -> "EventosColumnares":
+        """Copia ordenada por timestamp (estable: respeta el orden previo en empates)"""
+        orden = np.argsort(self.ts, kind="stable")
+        return self.filtrar(orden)
+
+    @staticmethod
+    def _internar(ids: List[str], tarjetas_conocidas: Optional[Iterable[str]] = None):
+        """Retorna (códigos int32, lista de ids) con las tarjetas conocidas primero"""
+        indice = {t: i for i, t in enumerate(dict.fromkeys(tarjetas_conocidas or []))}
+        codigos = np.fromiter(
+            (indice.setdefault(t, len(indice)) for t in ids),
+            dtype=np.int32,
+            count=len(ids),
+        )
+        return codigos, list(indice)
+
+    def __len__(self) -> int:
+        return len(self.ts)
+
+    @property
+    def n_tarjetas(self) -> int:
+        return len(self.tarjetas)
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes usados por los arrays (sin contar la tabla de ids)"""
+        return self.ts.nbytes + self.tarjeta.nbytes + self.puerta.nbytes + self.tipo.nbytes
+
+    def codigos(self, ids: Iterable[str]) -> np.ndarray:
+        """Índices de los ids dados (se omiten los que no aparecen)"""
+        return np.fromiter(
+            (self.indice_tarjetas[t] for t in ids if t in self.indice_tarjetas),
+            dtype=np.int32,
+        )
+
+    def filtrar(self, mascara: np.ndarray) -> "EventosColumnares":
+        """Subconjunto de filas por máscara o índices (comparte la tabla de ids)"""
+        return EventosColumnares(
+            self.ts[mascara], self.tarjeta[mascara], self.puerta[mascara], self.tipo[mascara], self.tarjetas
+        )
+
+    def a_eventos(self) -> List[Dict]:
+        """Vuelve a la representación de lista de dicts"""
+        return list(self.iterar_eventos())
+
+    def iterar_eventos(self) -> Iterator[Dict]:
+        """Como a_eventos, pero crea cada dict recién cuando se pide"""
+        ts_txt = self.ts.astype("datetime64[s]").astype(str)
+        for t, c, p, k in zip(ts_txt.tolist(), self.tarjeta.tolist(), self.puerta.tolist(), self.tipo.tolist()):
+            yield {
+                "timestamp": t,
+                "id_tarjeta": self.tarjetas[c],
+                "puerta": p,
+                "tipo": NOMBRES_TIPO[k],
+            }
+
+    def estado_dentro(self, hasta: Optional[int] = None) -> np.ndarray:
+        """
+        Vector bool por tarjeta: True si su último evento entrada/salida
+        (en orden de filas, con ts <= hasta) es una entrada.
+        """
+        mascara = self.tipo != TIPO_OTRO
+        if hasta is not None:
+            mascara &= self.ts <= hasta
+        filas = np.flatnonzero(mascara)
+        dentro = np.zeros(self.n_tarjetas, dtype=bool)
+        if len(filas) == 0:
+            return dentro
+        # Última fila de cada tarjeta = primera aparición en el orden inverso
+        tarjetas_inv = self.tarjeta[filas[::-1]]
+        unicas, primera = np.unique(tarjetas_inv, return_index=True)
+        ultimas = filas[::-1][primera]
+        dentro[unicas] = self.tipo[ultimas] == TIPO_ENTRADA
+        return dentro
@@ -0,0 +1,147 @@
+import hashlib
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Dict, List
+
+import numpy as np
+import yaml
+
+from asignacion import MatrizAsignacion
+
+logger = logging.getLogger(__name__)
+
+
+class ConfigCompilada:
+    """
+    Forma compilada de config/configuracion.yaml, guardada en
+    config/.configuracion.compilada.npz y asociada al hash del YAML.
+
+    - índice de tarjetas y pares tarjeta→zona (ver MatrizAsignacion)
+    - puertas e incidencia puerta→zona como bitmap (np.packbits)
+    - umbrales numéricos de reglas_recalculo como arrays
+    - el resto de la configuración (pocas claves) como JSON
+
+    Si el hash del YAML coincide se carga el npz sin parsear el YAML, así
+    el arranque no crece con la cantidad de tarjetas asignadas.
+    """
+
+    VERSION = 1
+
+    def __init__(
+        self,
+        config: Dict,
+        matriz: MatrizAsignacion,
+        puertas: np.ndarray,
+        incidencia: np.ndarray,
+        umbrales: Dict[str, float],
+    ):
+        self.config = config
+        self.matriz = matriz
+        self.puertas = puertas
+        self.incidencia = incidencia
+        self.umbrales = umbrales
+        self.indice_puertas = {int(p): i for i, p in enumerate(puertas.tolist())}
+
+    @staticmethod
+    def ruta_cache(path_config) -> Path:
+        ruta = Path(path_config)
+        return ruta.with_name(f".{ruta.stem}.compilada.npz")
+
+    @staticmethod
+    def hash_config(path_config) -> str:
+        with open(path_config, "rb") as f:
+            return hashlib.blake2b(f.read(), digest_size=16).hexdigest()
+
+    @classmethod
+    def cargar(cls, path_config, usar_cache: bool = True) -> "ConfigCompilada":
+        """Retorna la config compilada, desde el cache si el hash coincide"""
+        huella = cls.hash_config(path_config)
+        ruta = cls.ruta_cache(path_config)
+        if usar_cache and ruta.exists():
+            try:
+                return cls._leer(ruta, huella)
+            except (KeyError, ValueError, OSError) as e:
+                logger.info("Config compilada obsoleta o invalida (%s), se recompila", e)
+
+        with open(path_config, "r", encoding="utf-8") as f:
+            compilada = cls.compilar(yaml.safe_load(f))
+        if usar_cache:
+            try:
+                compilada._guardar(ruta, huella)
+            except OSError as e:
+                logger.warning("No se pudo escribir config compilada %s: %s", ruta, e)
+        return compilada
+
+    @classmethod
+    def compilar(cls, config: Dict) -> "ConfigCompilada":
+        zonas = config["zonas_funcionales"]
+        matriz = MatrizAsignacion(zonas.keys(), config["asignacion_tarjetas"])
+        mapeo = config.get("mapeo_puertas") or {}
+        puertas = np.array(sorted(int(p) for p in mapeo), dtype=np.int16)
+        incidencia = np.zeros((len(puertas), matriz.n_zonas), dtype=bool)
+        for i, puerta in enumerate(puertas.tolist()):
+            for zona in (mapeo[puerta] or {}).get("zonas", []):
+                if zona in matriz.indice_zonas:
+                    incidencia[i, matriz.indice_zonas[zona]] = True
+                else:
+                    logger.warning("Puerta %s referencia zona desconocida: %s", puerta, zona)
+        umbrales = {
+            k: float(v) for k, v in (config.get("reglas_recalculo") or {}).items()
+            if isinstance(v, (int, float)) and not isinstance(v, bool)
+        }
+        return cls(config, matriz, puertas, incidencia, umbrales)
+
+    def _guardar(self, ruta: Path, huella: str) -> None:
+        # mapeo_puertas tiene claves int: se guarda como pares para sobrevivir a JSON
+        resto = {k: v for k, v in self.config.items()
+                 if k not in ("asignacion_tarjetas", "mapeo_puertas")}
+        mapeo = [[int(p), datos] for p, datos in (self.config.get("mapeo_puertas") or {}).items()]
+        matriz = self.matriz
+        tmp = ruta.with_name(ruta.name + ".tmp.npz")
+        np.savez(
+            tmp,
+            version=np.int64(self.VERSION),
+            hash=np.array(huella),
+            resto=np.array(json.dumps(resto)),
+            mapeo=np.array(json.dumps(mapeo)),
+            asignaciones_zonas=np.array(list(self.config["asignacion_tarjetas"]), dtype=str),
+            zonas=np.array(matriz.zonas, dtype=str),
+            tarjetas=np.array(matriz.tarjetas, dtype=str),
+            filas=matriz.filas,
+            columnas=matriz.columnas,
+            zona_principal=matriz.zona_principal,
+            puertas=self.puertas,
+            incidencia=np.packbits(self.incidencia, axis=1),
+            umbrales_nombres=np.array(list(self.umbrales), dtype=str),
+            umbrales_valores=np.array(list(self.umbrales.values()), dtype=np.float64),
+        )
+        os.replace(tmp, ruta)
+
+    @classmethod
+    def _leer(cls, ruta: Path, huella: str) -> "ConfigCompilada":
+        with np.load(ruta, allow_pickle=False) as datos:
+            if int(datos["version"]) != cls.VERSION:
+                raise ValueError("version distinta")
+            if str(datos["hash"]) != huella:
+                raise ValueError("hash distinto")
+            zonas = datos["zonas"].tolist()
+            tarjetas = datos["tarjetas"].tolist()
+            matriz = MatrizAsignacion.desde_arrays(
+                zonas, tarjetas, datos["filas"], datos["columnas"], datos["zona_principal"]
+            )
+            puertas = datos["puertas"]
+            incidencia = np.unpackbits(datos["incidencia"], axis=1, count=len(zonas)).astype(bool)
+            umbrales = dict(zip(datos["umbrales_nombres"].tolist(), datos["umbrales_valores"].tolist()))
+            config = json.loads(str(datos["resto"]))
+            config["mapeo_puertas"] = {p: d for p, d in json.loads(str(datos["mapeo"]))}
+            config["asignacion_tarjetas"] = matriz.asignaciones(datos["asignaciones_zonas"].tolist())
+        return cls(config, matriz, puertas, incidencia, umbrales)
+
+    def zonas_de_puerta(self, puerta: int) -> List[str]:
+        """Zonas a las que da acceso la puerta (según mapeo_puertas)"""
+        i = self.indice_puertas.get(int(puerta))
+        if i is None:
+            return []
+        return [self.matriz.zonas[z] for z in np.flatnonzero(self.incidencia[i]).tolist()]
@@ -0,0 +1,140 @@
+import logging
+from typing import Optional
+
+import numpy as np
+
+from columnar import EventosColumnares, TIPO_ENTRADA, TIPO_OTRO
+
+logger = logging.getLogger(__name__)
+
+
+class IndiceTemporal:
+    """
+    Índice de tiempo sobre EventosColumnares para consultar "quién está
+    dentro en el instante T" sin recorrer todos los eventos.
+
+    - ts: int64 ordenado (solo eventos entrada/salida), con la tarjeta y
+      el tipo de cada fila en el mismo orden
+    - checkpoints cada `intervalo` segundos (900 = 15 min) con el estado
+      dentro/fuera de todas las tarjetas, empaquetado en bits
+
+    estado(T) busca por bisección el último checkpoint <= T y aplica solo
+    los eventos entre ese checkpoint y T: O(log N + k).
+
+    El orden es por timestamp (estable en empates), no por posición en la
+    lista de origen.
+    """
+
+    def __init__(self, columnar: EventosColumnares, intervalo: int = 900):
+        self.intervalo = int(intervalo)
+        self.n_tarjetas = columnar.n_tarjetas
+
+        filas = np.flatnonzero(columnar.tipo != TIPO_OTRO)
+        ts = columnar.ts[filas]
+        if len(ts) > 1 and not np.all(ts[1:] >= ts[:-1]):
+            orden = np.argsort(ts, kind="stable")
+            filas, ts = filas[orden], ts[orden]
+        self.ts = ts
+        self.tarjeta = columnar.tarjeta[filas]
+        self.entrada = columnar.tipo[filas] == TIPO_ENTRADA
+
+        self._construir_checkpoints()
+
+    def _construir_checkpoints(self) -> None:
+        """
+        Checkpoint k = estado tras aplicar los eventos con ts < inicio + k*intervalo.
+        posiciones[k] es la primera fila que falta aplicar desde ese checkpoint.
+        """
+        if len(self.ts) == 0:
+            self.inicio = 0
+            self.posiciones = np.zeros(1, dtype=np.int64)
+            self.estados = np.zeros((1, (self.n_tarjetas + 7) // 8), dtype=np.uint8)
+            return
+
+        self.inicio = int(self.ts[0]) // self.intervalo * self.intervalo
+        n = (int(self.ts[-1]) - self.inicio) // self.intervalo + 1
+        cortes = self.inicio + np.arange(n, dtype=np.int64) * self.intervalo
+        self.posiciones = np.searchsorted(self.ts, cortes, side="left")
+
+        self.estados = np.empty((n, (self.n_tarjetas + 7) // 8), dtype=np.uint8)
+        dentro = np.zeros(self.n_tarjetas, dtype=bool)
+        anterior = 0
+        for k, posicion in enumerate(self.posiciones):
+            self._aplicar(dentro, anterior, posicion)
+            self.estados[k] = np.packbits(dentro)
+            anterior = posicion
+
+    def extender(self, columnar: EventosColumnares, desde_fila: int) -> None:
+        """
+        Agrega las filas columnar[desde_fila:] (con timestamps >= al último
+        indexado, y la misma tabla de tarjetas ampliada) sin recalcular los
+        checkpoints existentes.
+        """
+        nuevas = np.arange(desde_fila, len(columnar))
+        nuevas = nuevas[columnar.tipo[nuevas] != TIPO_OTRO]
+        ts = columnar.ts[nuevas]
+        if len(ts) > 1 and not np.all(ts[1:] >= ts[:-1]):
+            orden = np.argsort(ts, kind="stable")
+            nuevas, ts = nuevas[orden], ts[orden]
+        if len(self.ts) and len(ts) and ts[0] < self.ts[-1]:
+            raise ValueError("extender requiere eventos posteriores al último indexado")
+
+        final = self.estado()
+        if columnar.n_tarjetas > self.n_tarjetas:
+            final = np.concatenate([final, np.zeros(columnar.n_tarjetas - self.n_tarjetas, dtype=bool)])
+            ancho = (columnar.n_tarjetas + 7) // 8
+            self.estados = np.pad(self.estados, ((0, 0), (0, ancho - self.estados.shape[1])))
+            self.n_tarjetas = columnar.n_tarjetas
+        if len(ts) == 0:
+            return
+        if len(self.ts) == 0:
+            self.ts = ts
+            self.tarjeta = columnar.tarjeta[nuevas]
+            self.entrada = columnar.tipo[nuevas] == TIPO_ENTRADA
+            self._construir_checkpoints()
+            return
+
+        anterior = len(self.ts)
+        self.ts = np.concatenate([self.ts, ts])
+        self.tarjeta = np.concatenate([self.tarjeta, columnar.tarjeta[nuevas]])
+        self.entrada = np.concatenate([self.entrada, columnar.tipo[nuevas] == TIPO_ENTRADA])
+
+        # Checkpoints nuevos a partir del estado final previo
+        n = (int(self.ts[-1]) - self.inicio) // self.intervalo + 1
+        k0 = len(self.posiciones)
+        if n <= k0:
+            return
+        cortes = self.inicio + np.arange(k0, n, dtype=np.int64) * self.intervalo
+        posiciones = np.searchsorted(self.ts, cortes, side="left")
+        estados = np.empty((n - k0, self.estados.shape[1]), dtype=np.uint8)
+        dentro = final
+        for k, posicion in enumerate(posiciones):
+            self._aplicar(dentro, anterior, posicion)
+            estados[k] = np.packbits(dentro)
+            anterior = max(anterior, posicion)
+        self.posiciones = np.concatenate([self.posiciones, posiciones])
+        self.estados = np.concatenate([self.estados, estados])
+
+    def _aplicar(self, dentro: np.ndarray, desde: int, hasta: int) -> None:
+        """Aplica sobre `dentro` las filas [desde, hasta): gana la última de cada tarjeta"""
+        if hasta <= desde:
+            return
+        tarjetas_inv = self.tarjeta[desde:hasta][::-1]
+        unicas, primera = np.unique(tarjetas_inv, return_index=True)
+        dentro[unicas] = self.entrada[desde:hasta][::-1][primera]
+
+    def estado(self, hasta: Optional[int] = None) -> np.ndarray:
+        """
+        Vector bool por tarjeta: True si su último evento entrada/salida con
+        ts <= hasta (epoch) es una entrada. Sin `hasta`, el estado final.
+        """
+        fin = len(self.ts) if hasta is None else int(np.searchsorted(self.ts, hasta, side="right"))
+        if hasta is None:
+            k = len(self.posiciones) - 1
+        else:
+            # Último checkpoint cuyo corte no supera hasta+1 (incluye ts == hasta)
+            k = min(max((int(hasta) + 1 - self.inicio) // self.intervalo, 0), len(self.posiciones) - 1)
+
+        dentro = np.unpackbits(self.estados[k], count=self.n_tarjetas).astype(bool)
+        self._aplicar(dentro, int(self.posiciones[k]), fin)
+        return dentro
@@ -8,6 +8,7 @@ from pathlib import Path
 sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
 
 from gestor_archivos import GestorArchivosEventos
+from validacion import CAMPOS_EVENTO, Cuarentena, validar_columnar, validar_filas
 import logging
 
 logging.basicConfig(
@@ -124,25 +125,23 @@ class InyectorManual:
                 logger.error(f"Archivo no encontrado: {ruta_csv}")
                 return 0
             
-            eventos = []
+            with open(ruta, 'r', encoding='utf-8', newline='') as f:
+                reader = csv.reader(f)
+                encabezado = next(reader, None) or []
+                if not all(c in encabezado for c in CAMPOS_EVENTO):
+                    logger.error(f"Encabezado CSV inválido: {encabezado}")
+                    return 0
+                filas = [fila for fila in reader if fila]
             
-            with open(ruta, 'r', encoding='utf-8') as f:
-                reader = csv.DictReader(f)
-                
-                for row in reader:
-                    # Validar campos
-                    if not all(k in row for k in ['timestamp', 'id_tarjeta', 'puerta', 'tipo']):
-                        logger.warning(f"Fila inválida omitida: {row}")
-                        continue
-                    
-                    # Convertir puerta a int
-                    try:
-                        row['puerta'] = int(row['puerta'])
-                    except ValueError:
-                        logger.warning(f"Puerta inválida en fila: {row}")
-                        continue
-                    
-                    eventos.append(row)
+            # Validación en bloque; las filas rechazadas van a cuarentena.tsv junto al CSV
+            parte, cuarentena = validar_filas(encabezado, filas, ruta)
+            parte, rechazos = validar_columnar(parte, origen=ruta)
+            cuarentena.agregar(rechazos.origen, rechazos.motivo, rechazos.campos)
+            # Reemplaza lo que hubiera de una importación anterior del mismo CSV
+            cuarentena.escribir(releidos=[ruta], cargados=[ruta])
+            if len(cuarentena):
+                logger.warning(f"{cuarentena.resumen()} -> {ruta.parent / Cuarentena.NOMBRE}")
+            eventos = parte.a_eventos()
             
             # Ingresar en lote
             cantidad = self.gestor.agregar_eventos_lote(eventos)
@@ -0,0 +1,217 @@
+import argparse
+import json
+import logging
+import os
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+from columnar import a_epoch
+from loader import SistemaDistribucion
+from vigilante import VigilanteDia
+
+logger = logging.getLogger(__name__)
+
+
+class LineaTiempoHoraria:
+    """
+    Línea de tiempo de un día con un punto por hora cerrada, persistida en
+    data/<fecha>/linea_tiempo.json (ver backlog.md).
+
+    Cada punto: hora ("09:00"), entradas/salidas de la hora anterior, los
+    acumulados del día y la ocupación por zona en ese instante.
+    """
+
+    NOMBRE = "linea_tiempo.json"
+
+    def __init__(self, directorio: Path, fecha: str):
+        self.fecha = fecha
+        self.ruta = Path(directorio) / self.NOMBRE
+        self.puntos: List[Dict] = []
+        if self.ruta.exists():
+            try:
+                with open(self.ruta, "r", encoding="utf-8") as f:
+                    datos = json.load(f)
+                if datos.get("fecha") == fecha:
+                    self.puntos = datos.get("puntos", [])
+            except (OSError, json.JSONDecodeError) as e:
+                logger.warning("Linea de tiempo invalida en %s (%s), se regenera", self.ruta, e)
+
+    @property
+    def horas(self) -> List[int]:
+        return [p["hora_fin"] for p in self.puntos]
+
+    def agregar(self, sistema: SistemaDistribucion, instante: datetime) -> Dict:
+        """
+        Agrega el punto del instante `instante` (hora en punto) usando el
+        índice temporal: O(log N + eventos de la hora).
+        """
+        indice = sistema.indice_temporal
+        fin = int(a_epoch(instante.isoformat()))
+        dia = int(a_epoch(instante.replace(hour=0).isoformat())) if instante.hour else fin - 86400
+        # Eventos con ts < fin (la hora en punto pertenece a la hora siguiente)
+        a_dia, a_hora, b = np.searchsorted(indice.ts, [dia, fin - 3600, fin], side="left")
+        entradas = int(np.count_nonzero(indice.entrada[a_hora:b]))
+        entradas_acum = int(np.count_nonzero(indice.entrada[a_dia:b]))
+        ocupacion = sistema.calcular_distribucion_observada((instante - timedelta(seconds=1)).isoformat())
+
+        punto = {
+            "hora": instante.strftime("%H:%M") if instante.hour else "24:00",
+            "hora_fin": instante.hour or 24,
+            "timestamp": instante.isoformat(),
+            "entradas": entradas,
+            "salidas": int(b - a_hora) - entradas,
+            "entradas_acum": entradas_acum,
+            "salidas_acum": int(b - a_dia) - entradas_acum,
+            "ocupacion": ocupacion,
+        }
+        self.puntos = [p for p in self.puntos if p["hora_fin"] != punto["hora_fin"]] + [punto]
+        self.puntos.sort(key=lambda p: p["hora_fin"])
+        return punto
+
+    def guardar(self) -> None:
+        tmp = self.ruta.with_name(self.ruta.name + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"fecha": self.fecha, "puntos": self.puntos}, f, ensure_ascii=False, indent=2)
+        os.replace(tmp, self.ruta)
+
+    def picos(self, n: int = 3) -> Dict[str, List[str]]:
+        """Horas con más y con menos movimiento (entradas + salidas)"""
+        orden = sorted(self.puntos, key=lambda p: p["entradas"] + p["salidas"])
+        return {
+            "mayor_movimiento": [p["hora"] for p in reversed(orden[-n:])],
+            "menor_movimiento": [p["hora"] for p in orden[:n]],
+        }
+
+
+class ProgramadorHorario:
+    """
+    Proceso de larga duración que despierta en cada hora en punto (09:00,
+    10:00, ...): incorpora el archivo horario recién cerrado (VigilanteDia),
+    agrega el punto a la LineaTiempoHoraria y llama a los refrescos.
+
+    Entre ticks duerme en un threading.Event con el tiempo exacto hasta la
+    próxima hora: no hay polling ni trabajo entre 08:50 y 08:59. Cada tick
+    solo lee los eventos de la hora nueva. Al arrancar completa las horas
+    ya cerradas del día que falten en la línea de tiempo.
+
+    `gracia` son los segundos tras la hora en punto que se esperan para
+    que el archivo HH00.HH00.csv quede cerrado.
+    """
+
+    def __init__(
+        self,
+        path_base: str = "data",
+        path_config: str = "config/configuracion.yaml",
+        gracia: float = 2.0,
+        al_tick: Optional[List[Callable[[SistemaDistribucion, Dict], None]]] = None,
+        reloj: Callable[[], float] = time.time,
+        **kwargs,
+    ):
+        self.path_base = path_base
+        self.path_config = path_config
+        self.gracia = gracia
+        self.al_tick = list(al_tick or [])
+        self.reloj = reloj
+        self.kwargs = kwargs
+        self.vigilante: Optional[VigilanteDia] = None
+        self.linea: Optional[LineaTiempoHoraria] = None
+        self._detener = threading.Event()
+
+    def _preparar_dia(self, fecha: str) -> None:
+        if self.vigilante is not None and self.vigilante.fecha == fecha:
+            return
+        self.vigilante = VigilanteDia(
+            self.path_base, self.path_config, fecha=fecha, gracia=self.gracia, reloj=self.reloj, **self.kwargs
+        )
+        self.linea = LineaTiempoHoraria(self.vigilante.directorio, fecha)
+
+    def tick(self, instante: datetime) -> Dict:
+        """
+        Procesa la hora que termina en `instante` (hora en punto); la hora
+        00:00 cierra el día anterior. Si faltan horas previas del mismo día
+        en la línea de tiempo (proceso detenido, arranque tardío) también se
+        agregan. Retorna el punto de `instante`.
+        """
+        fecha = (instante - timedelta(seconds=1)).strftime("%d%m%Y")
+        self._preparar_dia(fecha)
+        inicio = time.perf_counter()
+        self.vigilante.revisar(max(self.reloj(), instante.timestamp() + self.gracia))
+
+        dia = self.vigilante.dia
+        hora_fin = instante.hour or 24
+        existentes = set(self.linea.horas)
+        for h in range(1, hora_fin):
+            if h not in existentes:
+                self.linea.agregar(self.vigilante.sistema, dia + timedelta(hours=h))
+        punto = self.linea.agregar(self.vigilante.sistema, instante)
+        self.linea.guardar()
+        logger.info(
+            "Tick %s %s: +%d/-%d en %.1f ms",
+            fecha, punto["hora"], punto["entradas"], punto["salidas"],
+            (time.perf_counter() - inicio) * 1e3,
+        )
+        for refresco in self.al_tick:
+            try:
+                refresco(self.vigilante.sistema, punto)
+            except Exception as e:
+                logger.error("Error en refresco tras tick %s: %s", punto["hora"], e)
+        return punto
+
+    def ponerse_al_dia(self) -> Dict:
+        """Procesa la última hora en punto ya pasada (y las que falten de ese día)"""
+        ahora = datetime.fromtimestamp(self.reloj() - self.gracia)
+        return self.tick(ahora.replace(minute=0, second=0, microsecond=0))
+
+    @staticmethod
+    def proxima_hora(ahora: float) -> datetime:
+        actual = datetime.fromtimestamp(ahora)
+        return actual.replace(minute=0, second=0, microsecond=0) + timedelta(hours=1)
+
+    def ejecutar(self) -> None:
+        """Bucle bloqueante hasta detener()"""
+        self.ponerse_al_dia()
+        while not self._detener.is_set():
+            siguiente = self.proxima_hora(self.reloj() - self.gracia)
+            espera = siguiente.timestamp() + self.gracia - self.reloj()
+            if self._detener.wait(max(espera, 0)):
+                break
+            try:
+                self.tick(siguiente)
+            except Exception as e:
+                logger.error("Error en tick %s: %s", siguiente.isoformat(), e)
+
+    def detener(self) -> None:
+        self._detener.set()
+
+
+def refresco_comando(comando: str) -> Callable[[SistemaDistribucion, Dict], None]:
+    """Refresco que ejecuta un comando externo (p.ej. renderizar un panel) en cada tick"""
+    def refrescar(sistema: SistemaDistribucion, punto: Dict) -> None:
+        entorno = dict(os.environ, R2H2_HORA=punto["hora"])
+        subprocess.run(comando, shell=True, check=False, env=entorno)
+    return refrescar
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Linea de tiempo por hora en punto")
+    parser.add_argument("--data", default="data", help="Directorio base de eventos")
+    parser.add_argument("--config", default="config/configuracion.yaml")
+    parser.add_argument("--gracia", type=float, default=2.0, help="Segundos tras la hora en punto")
+    parser.add_argument("--comando", help="Comando a ejecutar en cada tick (p.ej. render de panel)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    refrescos = [refresco_comando(args.comando)] if args.comando else []
+    programador = ProgramadorHorario(args.data, args.config, gracia=args.gracia, al_tick=refrescos)
+    try:
+        programador.ejecutar()
+    except KeyboardInterrupt:
+        programador.detener()
+        sys.exit(0)
@@ -1,70 +1,425 @@
-import csv
+import copy
+import json
 import logging
-import re
+import os
 import yaml
-from datetime import datetime
-from typing import Dict, List, Tuple
-from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import date, datetime
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple, Union
 from pathlib import Path
 
+import numpy as np
+
+from almacen_sqlite import AlmacenSQLite
+from cache_dias import CacheDia
+from config_compilada import ConfigCompilada
+from columnar import ContadorOrden, EventosColumnares, TIPO_ENTRADA, a_epoch
+from indice_temporal import IndiceTemporal
+from particiones import PATRON_HORA, a_datetime, particiones_en_rango
+from series import SerieTemporal, serie_temporal
+from maquina_puertas import MaquinaPuertas
+from ocupacion import CurvaOcupacion, curva_ocupacion
+from sesiones import Sesiones, reconstruir_sesiones
+from validacion import Cuarentena, leer_csv_validado, validar_columnar
+
+
+def _solo_lectura(valor):
+    """Marca como solo lectura los arrays NumPy de un resultado memorizado"""
+    if hasattr(valor, "__dict__"):
+        for atributo in vars(valor).values():
+            if isinstance(atributo, np.ndarray):
+                atributo.flags.writeable = False
+    return valor
+
+
+def _copia_liviana(valor):
+    """
+    Copia de un resultado memorizado para el llamador: dicts, listas y
+    tuplas se copian (son chicos: una entrada por zona u hora); los objetos
+    con arrays (SerieTemporal, Sesiones, CurvaOcupacion) se copian en forma
+    superficial con sus listas, compartiendo los arrays de solo lectura.
+    """
+    if isinstance(valor, dict):
+        return {k: _copia_liviana(v) for k, v in valor.items()}
+    if isinstance(valor, (list, tuple)):
+        return type(valor)(_copia_liviana(v) for v in valor)
+    if hasattr(valor, "__dict__"):
+        copia = copy.copy(valor)
+        for nombre, atributo in vars(copia).items():
+            if isinstance(atributo, list):
+                setattr(copia, nombre, list(atributo))
+        return copia
+    return valor
+
+
 class SistemaDistribucion:
     """
     Carga eventos y configuración desde YAML.
     Calcula distribuciones: definida, observada, recalculada.
     Alimenta los 6 paneles Manim.
+
+    self.columnar expone los eventos como arrays NumPy (ver
+    columnar.EventosColumnares), que es lo que usan los cálculos
+    vectorizados; self.eventos es la vista como lista de dicts. Cada
+    representación se construye desde la otra solo si se pide.
+
+    Los directorios de CSV horarios se leen en paralelo con `workers`
+    hilos (o procesos si usar_procesos=True) y, con usar_cache=True, se
+    guardan ya parseados en data/DDMMYYYY/.cache_eventos.npz (ver
+    cache_dias.CacheDia).
+
+    Los resultados de los paneles se memorizan en un grafo de dependencias
+    (ver DEPENDENCIAS) con clave (nodo, hasta_timestamp): cada nodo se
+    calcula una vez por instante y solo se invalida cuando cambian los
+    eventos (asignar self.eventos) o la configuración (recargar_config).
+    Si se modifican los eventos en sitio hay que llamar a
+    invalidar("eventos"). Se conservan los MAX_MEMORIZADOS usados más
+    recientemente (LRU), y los arrays de los resultados son de solo lectura.
+
+    Las consultas "estado en el instante T" usan self.indice_temporal
+    (ver indice_temporal.IndiceTemporal): timestamps int64 ordenados y
+    checkpoints cada INTERVALO_CHECKPOINT segundos.
     """
+
+    INTERVALO_CHECKPOINT = 900
+
+    # Resultados memorizados como máximo (una animación minuto a minuto
+    # genera una clave por instante)
+    MAX_MEMORIZADOS = 512
+
+    # Grafo de cálculos: nodo -> orígenes o nodos de los que depende
+    DEPENDENCIAS = {
+        "definida": ("config",),
+        "observada": ("eventos", "config"),
+        "recalculada": ("definida", "observada"),
+        "mapa_calor": ("definida", "observada"),
+        "indicadores": ("definida", "observada"),
+        "evolucion": ("eventos",),
+        "serie": ("eventos", "config"),
+        "sesiones": ("eventos", "config"),
+        "curva": ("eventos", "config"),
+        "ubicaciones": ("eventos", "config"),
+    }
     
-    def __init__(self, path_eventos: str, path_config: str):
+    def __init__(
+        self,
+        path_eventos: str,
+        path_config: str,
+        workers: int = None,
+        usar_procesos: bool = False,
+        usar_cache: bool = True,
+        rango: Tuple[datetime, datetime] = None,
+    ):
         self.path_eventos = path_eventos
         self.path_config = path_config
+        self.workers = workers
+        self.usar_procesos = usar_procesos
+        self.usar_cache = usar_cache
+        self.contador_orden = ContadorOrden()
+        self.rango = rango
         self.logger = logging.getLogger(__name__)
         
-        # Cargar archivos
-        self.config = self._cargar_yaml(path_config)
-        self.eventos = self._cargar_eventos(path_eventos)
+        # Resultados memorizados: (nodo, hasta_timestamp, *parametros) -> valor
+        self._memo: "OrderedDict[tuple, object]" = OrderedDict()
+
+        # Cargar archivos (config compilada en cache, ver ConfigCompilada)
+        self.config_compilada = ConfigCompilada.cargar(path_config, usar_cache)
         
         # Procesar datos
+        self._aplicar_config()
+
+        self._eventos = None
+        self._columnar = None
+        self._indice = None
+        self.almacen = None
+        # Filas rechazadas en la carga y CSV parseados (no tomados del cache)
+        self.cuarentena = Cuarentena()
+        self._releidos: List[Path] = []
+        origen = self._cargar_eventos(path_eventos)
+        if isinstance(origen, EventosColumnares):
+            self._columnar = origen
+        else:
+            self._eventos = origen
+
+    @classmethod
+    def desde_rango(
+        cls,
+        inicio: Union[str, date, datetime],
+        fin: Union[str, date, datetime],
+        path_base: str = "data",
+        path_config: str = "config/configuracion.yaml",
+        **kwargs,
+    ) -> "SistemaDistribucion":
+        """
+        Carga solo los eventos entre inicio y fin (inclusive) desde los
+        directorios data/DDMMYYYY, abriendo únicamente los días y archivos
+        horarios que se solapan con el rango.
+
+        inicio/fin aceptan datetime, date o texto ("2026-01-13T08:00:00",
+        "2026-01-13" o "13012026"); una fecha sin hora como fin incluye el
+        día completo.
+        """
+        rango = (a_datetime(inicio), a_datetime(fin, fin_de_dia=True))
+        if rango[1] < rango[0]:
+            raise ValueError(f"Rango invalido: {inicio} > {fin}")
+        return cls(path_base, path_config, rango=rango, **kwargs)
+
+    def _aplicar_config(self) -> None:
+        self.config = self.config_compilada.config
         self.zonas = self.config['zonas_funcionales']
         self.mapeo_puertas = self.config['mapeo_puertas']
         self.asignaciones = self.config['asignacion_tarjetas']
         self.reglas = self.config['reglas_recalculo']
+        self.matriz_asignacion = self.config_compilada.matriz
+        self.maquina_puertas = MaquinaPuertas(self.mapeo_puertas, self.matriz_asignacion)
+        self._alineacion = None
+
+    def recargar_config(self) -> None:
+        """Vuelve a leer path_config e invalida los cálculos que dependen de ella"""
+        self.config_compilada = ConfigCompilada.cargar(self.path_config, self.usar_cache)
+        self._aplicar_config()
+        self.invalidar("config")
+
+    def invalidar(self, origen: str = None) -> None:
+        """
+        Descarta los resultados memorizados que dependen de `origen`
+        ("eventos", "config" o un nodo de DEPENDENCIAS). Sin argumento
+        descarta todos.
+        """
+        if origen in (None, "eventos"):
+            # Las vistas derivadas de self.eventos se reconstruyen a pedido
+            self._indice = None
+            self._alineacion = None
+            if self._eventos is not None:
+                self._columnar = None
+        self._descartar_memo(origen)
+
+    def _descartar_memo(self, origen: Optional[str]) -> None:
+        if origen is None:
+            self._memo.clear()
+            return
+        afectados = {origen}
+        cambio = True
+        while cambio:
+            cambio = False
+            for nodo, dependencias in self.DEPENDENCIAS.items():
+                if nodo not in afectados and afectados.intersection(dependencias):
+                    afectados.add(nodo)
+                    cambio = True
+        for clave in [c for c in self._memo if c[0] in afectados]:
+            del self._memo[clave]
+
+    def _memorizado(
+        self,
+        nodo: str,
+        hasta_timestamp: Optional[str],
+        calcular: Callable[[], object],
+        parametros: tuple = (),
+    ):
+        """Valor del nodo para ese instante; se calcula solo la primera vez"""
+        clave = (nodo, hasta_timestamp) + tuple(parametros)
+        if clave in self._memo:
+            self._memo.move_to_end(clave)
+        else:
+            self._memo[clave] = _solo_lectura(calcular())
+            while len(self._memo) > self.MAX_MEMORIZADOS:
+                self._memo.popitem(last=False)
+        # Copia liviana para que el llamador no altere el valor memorizado
+        return _copia_liviana(self._memo[clave])
+
+    def _tarjetas_asignadas(self) -> List[str]:
+        return self.matriz_asignacion.tarjetas
+
+    @property
+    def eventos(self) -> List[Dict]:
+        """Eventos como lista de dicts (se materializa en el primer acceso)"""
+        if self._eventos is None:
+            self._eventos = self._columnar.a_eventos()
+        return self._eventos
+
+    @eventos.setter
+    def eventos(self, eventos: List[Dict]):
+        self._eventos = eventos
+        self.invalidar("eventos")
+
+    @property
+    def columnar(self) -> EventosColumnares:
+        """Eventos en formato columnar (se construye en el primer acceso)"""
+        if self._columnar is None:
+            self._columnar = EventosColumnares.desde_eventos(self._eventos, self._tarjetas_asignadas())
+        return self._columnar
+
+    @property
+    def indice_temporal(self) -> IndiceTemporal:
+        """Índice ordenado por tiempo con checkpoints (se construye en el primer acceso)"""
+        if self._indice is None:
+            self._indice = IndiceTemporal(self.columnar, self.INTERVALO_CHECKPOINT)
+        return self._indice
         
+    def incorporar(self, parte: EventosColumnares) -> int:
+        """
+        Agrega eventos nuevos (p.ej. un archivo horario recién cerrado) sin
+        recargar lo anterior. Si llegan después del último evento conocido,
+        el índice temporal se extiende en vez de reconstruirse.
+        Retorna la cantidad de eventos agregados.
+        """
+        if len(parte) == 0:
+            return 0
+        columnar = self.columnar
+        unido = EventosColumnares.concatenar([columnar, parte], columnar.tarjetas)
+        # La base puede no estar ordenada (p.ej. cargada de un jsonl o yaml):
+        # se compara con su máximo, que es el último del índice temporal
+        en_orden = len(columnar) == 0 or int(parte.ts.min()) >= int(columnar.ts.max())
+        if not en_orden:
+            unido = unido.ordenar()
+
+        if self._indice is not None and en_orden:
+            self._indice.extender(unido, len(columnar))
+        else:
+            self._indice = None
+        self._columnar = unido
+        self._eventos = None
+        self._alineacion = None
+        self._descartar_memo("eventos")
+        return len(parte)
+
     def _cargar_yaml(self, path: str) -> dict:
         """Carga archivo YAML"""
         with open(path, 'r', encoding='utf-8') as f:
             return yaml.safe_load(f)
 
-    def _cargar_eventos_csv(self, path: Path) -> List[Dict]:
+    def _cargar_eventos_csv(self, path: Path) -> EventosColumnares:
+        parte = self._leer_csv_en_paralelo([path])
+        columnar = EventosColumnares.concatenar(parte, self._tarjetas_asignadas())
+        return self._validar_carga(columnar, path, [path])
+
+    def _validar_carga(self, columnar: EventosColumnares, origen: Path, archivos: List[Path]) -> EventosColumnares:
+        """
+        Etapa de validación de la carga: a los rechazos de fila de los CSV
+        parseados se suman las puertas fuera de mapeo_puertas y los
+        duplicados (validacion.validar_columnar). Las filas rechazadas van a
+        cuarentena.tsv y se reportan con una sola línea de resumen.
+        """
+        rechazadas_lectura = len(self.cuarentena)
+        columnar, rechazos = validar_columnar(columnar, self.mapeo_puertas, origen)
+        self.cuarentena.agregar(rechazos.origen, rechazos.motivo, rechazos.campos)
+        self.cuarentena.filas = rechazos.filas + rechazadas_lectura
+        try:
+            escritos = self.cuarentena.escribir(self._releidos, archivos)
+        except OSError as e:
+            self.logger.warning("No se pudo escribir la cuarentena: %s", e)
+            escritos = []
+        if len(self.cuarentena):
+            self.logger.warning("%s -> %s", self.cuarentena.resumen(), ", ".join(map(str, escritos)) or "-")
+        return columnar
+
+    def _leer_marca_agua(self, path: Path):
+        """
+        Bytes válidos de un snapshot jsonl (sidecar <archivo>.meta escrito por
+        GestorArchivosEventos con "snapshot": true). None si el archivo no es
+        un snapshot: el sidecar del journal activo es solo un resumen
+        (se persiste con throttling) y no acota la lectura.
+        """
+        ruta_meta = path.with_name(path.name + ".meta")
+        if not ruta_meta.exists():
+            return None
+        with open(ruta_meta, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        return meta.get("bytes") if meta.get("snapshot") else None
+
+    def _cargar_eventos_jsonl(self, path: Path) -> List[Dict]:
+        """Lee un journal append-only (un evento JSON por línea)"""
         eventos = []
-        with open(path, "r", encoding="utf-8") as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                if not row:
+        # Un snapshot comparte inode con el journal activo: lo escrito
+        # después de la marca de agua no pertenece al snapshot
+        marca = self._leer_marca_agua(path)
+        leidos = 0
+        with open(path, "rb") as f:
+            for num_linea, linea in enumerate(f, start=1):
+                leidos += len(linea)
+                if marca is not None and leidos > marca:
+                    break
+                linea = linea.strip()
+                if not linea:
                     continue
                 try:
-                    row["puerta"] = int(row["puerta"])
-                except (ValueError, TypeError):
+                    evento = json.loads(linea)
+                except ValueError:
+                    # Línea truncada (p.ej. corte durante la escritura)
+                    self.logger.warning("Linea invalida en %s:%d, omitida", path, num_linea)
                     continue
-                eventos.append({
-                    "timestamp": row["timestamp"],
-                    "id_tarjeta": row["id_tarjeta"],
-                    "puerta": row["puerta"],
-                    "tipo": row["tipo"],
-                })
+                eventos.append(evento)
         return eventos
 
-    def _cargar_eventos_dir(self, path: Path) -> List[Dict]:
-        eventos = []
+    def _cargar_eventos_dir(self, path: Path) -> EventosColumnares:
         archivos = sorted(path.glob("*.csv"))
         self._alertar_horas_faltantes(path, archivos)
-        for archivo in archivos:
-            eventos.extend(self._cargar_eventos_csv(archivo))
-        return eventos
+        return self._validar_carga(self._fusionar_partes(self._leer_partes(path, archivos)), path, archivos)
 
-    def _cargar_eventos(self, path: str) -> List[Dict]:
+    def _fusionar_partes(self, partes: List[EventosColumnares]) -> EventosColumnares:
+        """Une los archivos horarios (ya en orden) sin reordenar todo; ver EventosColumnares.fusionar"""
+        self.contador_orden = ContadorOrden()
+        columnar = EventosColumnares.fusionar(partes, self._tarjetas_asignadas(), self.contador_orden)
+        if self.contador_orden.desordenadas or self.contador_orden.solapadas:
+            self.logger.warning(
+                "Orden de eventos: %d filas fuera de orden en %d archivos, %d archivos con horas solapadas",
+                self.contador_orden.desordenadas,
+                self.contador_orden.fuentes_desordenadas,
+                self.contador_orden.solapadas,
+            )
+        return columnar
+
+    def _leer_partes(self, path: Path, archivos: List[Path]) -> List[EventosColumnares]:
+        if self.usar_cache:
+            return CacheDia(path).cargar(archivos, self._leer_csv_en_paralelo)
+        return self._leer_csv_en_paralelo(archivos)
+
+    def _cargar_eventos_rango(self, base: Path) -> EventosColumnares:
+        inicio, fin = self.rango
+        particiones = particiones_en_rango(base, inicio, fin)
+        partes = []
+        for directorio, archivos in particiones:
+            partes.extend(self._leer_partes(directorio, archivos))
+        self.logger.info(
+            "Rango %s a %s: %d dias, %d archivos horarios",
+            inicio.isoformat(), fin.isoformat(),
+            len(particiones), sum(len(a) for _, a in particiones),
+        )
+        # Se valida sobre los archivos completos: la cuarentena reemplaza
+        # los rechazos de carga de cada archivo, también los fuera del rango
+        columnar = self._validar_carga(
+            self._fusionar_partes(partes), base, [a for _, archivos in particiones for a in archivos]
+        )
+        # Los archivos de borde traen horas completas: recortar al rango exacto
+        ts_inicio, ts_fin = a_epoch([inicio, fin])
+        return columnar.filtrar((columnar.ts >= ts_inicio) & (columnar.ts <= ts_fin))
+
+    def _leer_csv_en_paralelo(self, archivos: List[Path]) -> List[EventosColumnares]:
+        """
+        Parsea los archivos con un pool de hilos/procesos; conserva el orden
+        de entrada. Las filas rechazadas se acumulan en self.cuarentena.
+        """
+        rutas = [str(a) for a in archivos]
+        workers = self.workers or min(8, os.cpu_count() or 1)
+        workers = max(1, min(workers, len(rutas)))
+        if workers == 1:
+            leidos = [leer_csv_validado(r) for r in rutas]
+        else:
+            pool_cls = ProcessPoolExecutor if self.usar_procesos else ThreadPoolExecutor
+            with pool_cls(max_workers=workers) as pool:
+                leidos = list(pool.map(leer_csv_validado, rutas))
+        for _, rechazos in leidos:
+            self.cuarentena.unir(rechazos)
+        self._releidos.extend(Path(r) for r in rutas)
+        return [parte for parte, _ in leidos]
+
+    def _cargar_eventos(self, path: str) -> Union[List[Dict], EventosColumnares]:
         ruta = Path(path)
         if not ruta.exists():
             raise FileNotFoundError(f"No existe ruta de eventos: {path}")
+        if ruta.is_dir() and self.rango:
+            return self._cargar_eventos_rango(ruta)
         if ruta.is_dir():
             hoy = datetime.now().strftime("%d%m%Y")
             ruta_dia = ruta / hoy
@@ -79,20 +434,33 @@ class SistemaDistribucion:
         if ruta.suffix.lower() == ".csv":
             return self._cargar_eventos_csv(ruta)
 
+        if ruta.suffix.lower() == ".jsonl":
+            return self._cargar_eventos_jsonl(ruta)
+
+        if AlmacenSQLite.es_ruta(ruta):
+            return self._cargar_eventos_sqlite(ruta)
+
         raise FileNotFoundError(f"No se reconoce el origen de eventos: {path}")
 
+    def _cargar_eventos_sqlite(self, path: Path) -> EventosColumnares:
+        """Eventos desde un AlmacenSQLite (solo el rango si se pidió con desde_rango)"""
+        self.almacen = AlmacenSQLite(str(path))
+        desde, hasta = self.rango or (None, None)
+        return EventosColumnares.desde_columnas(
+            *self.almacen.columnas(desde, hasta), self._tarjetas_asignadas()
+        )
+
     def _alertar_horas_faltantes(self, path: Path, archivos: List[Path]) -> None:
         fecha_dir = path.name
         hoy = datetime.now().strftime("%d%m%Y")
         if fecha_dir != hoy:
             return
 
-        patron = re.compile(r"^(?P<h_ini>\d{2})00\.(?P<h_fin>\d{2})00\.csv$")
         horas_presentes = set()
         nombres_invalidos = []
         horas_futuras = []
         for archivo in archivos:
-            match = patron.match(archivo.name)
+            match = PATRON_HORA.match(archivo.name)
             if not match:
                 nombres_invalidos.append(archivo.name)
                 continue
@@ -134,6 +502,9 @@ class SistemaDistribucion:
         Panel A: Distribución planificada según configuración.
         Retorna dict {zona: cantidad_planificada}
         """
+        return self._memorizado("definida", None, self._calcular_definida)
+
+    def _calcular_definida(self) -> Dict[str, int]:
         distribucion = {}
         for zona, datos in self.zonas.items():
             distribucion[zona] = datos['capacidad_planificada']
@@ -144,43 +515,36 @@ class SistemaDistribucion:
         Panel B: Distribución observada calculada desde eventos.
         Procesa entradas/salidas y retorna presencia actual por zona.
         """
-        # Estado actual de cada tarjeta: dentro o fuera
-        estado_tarjetas = defaultdict(lambda: "fuera")
-        
-        # Filtrar eventos hasta timestamp dado
-        eventos_filtrados = self.eventos
-        if hasta_timestamp:
-            eventos_filtrados = [
-                e for e in self.eventos 
-                if e['timestamp'] <= hasta_timestamp
-            ]
-        
-        # Procesar eventos
-        for evento in eventos_filtrados:
-            id_tarjeta = evento['id_tarjeta']
-            tipo = evento['tipo']
-            
-            if tipo == "entrada":
-                estado_tarjetas[id_tarjeta] = "dentro"
-            elif tipo == "salida":
-                estado_tarjetas[id_tarjeta] = "fuera"
-        
-        # Contar presencia por zona (incluir zonas con 0)
-        distribucion = {zona: 0 for zona in self.zonas.keys()}
-        for zona, tarjetas in self.asignaciones.items():
-            for tarjeta in tarjetas:
-                if estado_tarjetas[tarjeta] == "dentro":
-                    distribucion[zona] += 1
-        
-        return distribucion
+        return self._memorizado(
+            "observada", hasta_timestamp, lambda: self._calcular_observada(hasta_timestamp)
+        )
+
+    def _calcular_observada(self, hasta_timestamp: Optional[str]) -> Dict[str, int]:
+        hasta = int(a_epoch(hasta_timestamp)) if hasta_timestamp else None
+
+        # Estado de cada tarjeta según su último evento: dentro o fuera
+        dentro = self.indice_temporal.estado(hasta)
+
+        # Presencia de las tarjetas asignadas (índice denso de la matriz)
+        if self._alineacion is None:
+            self._alineacion = self.matriz_asignacion.alinear(self.columnar.tarjetas)
+        presentes = np.append(dentro, False)[self._alineacion]
+
+        # Contar presencia por zona (incluye zonas con 0)
+        return self.matriz_asignacion.distribucion(presentes)
     
-    def calcular_distribucion_recalculada(self) -> Dict[str, int]:
+    def calcular_distribucion_recalculada(self, hasta_timestamp: str = None) -> Dict[str, int]:
         """
         Panel C: Distribución recalculada (recomendada).
         Compara definida vs observada y propone ajustes.
         """
+        return self._memorizado(
+            "recalculada", hasta_timestamp, lambda: self._calcular_recalculada(hasta_timestamp)
+        )
+
+    def _calcular_recalculada(self, hasta_timestamp: Optional[str]) -> Dict[str, int]:
         definida = self.calcular_distribucion_definida()
-        observada = self.calcular_distribucion_observada()
+        observada = self.calcular_distribucion_observada(hasta_timestamp)
         
         recalculada = {}
         
@@ -204,13 +568,18 @@ class SistemaDistribucion:
         
         return recalculada
     
-    def calcular_mapa_calor(self) -> Dict[str, float]:
+    def calcular_mapa_calor(self, hasta_timestamp: str = None) -> Dict[str, float]:
         """
         Panel D: Proporciones de ocupación por zona.
         Retorna dict {zona: proporcion_ocupacion}
         """
+        return self._memorizado(
+            "mapa_calor", hasta_timestamp, lambda: self._calcular_mapa_calor(hasta_timestamp)
+        )
+
+    def _calcular_mapa_calor(self, hasta_timestamp: Optional[str]) -> Dict[str, float]:
         definida = self.calcular_distribucion_definida()
-        observada = self.calcular_distribucion_observada()
+        observada = self.calcular_distribucion_observada(hasta_timestamp)
         
         mapa_calor = {}
         for zona in self.zonas.keys():
@@ -229,32 +598,126 @@ class SistemaDistribucion:
         Panel E: Series temporales de entradas/salidas.
         Retorna (timestamps, entradas_acum, salidas_acum)
         """
-        # Agrupar por hora
-        entradas_por_hora = defaultdict(int)
-        salidas_por_hora = defaultdict(int)
-        
-        for evento in self.eventos:
-            ts = datetime.fromisoformat(evento['timestamp'])
-            hora = ts.hour
-            
-            if evento['tipo'] == "entrada":
-                entradas_por_hora[hora] += 1
-            else:
-                salidas_por_hora[hora] += 1
-        
-        # Ordenar por hora
-        horas = sorted(set(list(entradas_por_hora.keys()) + list(salidas_por_hora.keys())))
-        entradas = [entradas_por_hora[h] for h in horas]
-        salidas = [salidas_por_hora[h] for h in horas]
-        
-        return horas, entradas, salidas
+        return self._memorizado("evolucion", None, self._calcular_evolucion)
+
+    def _calcular_evolucion(self) -> Tuple[List, List, List]:
+        columnar = self.columnar
+
+        # Agrupar por hora del día
+        horas_evento = (columnar.ts // 3600) % 24
+        es_entrada = columnar.tipo == TIPO_ENTRADA
+        entradas_por_hora = np.bincount(horas_evento[es_entrada], minlength=24)
+        salidas_por_hora = np.bincount(horas_evento[~es_entrada], minlength=24)
+
+        # Solo horas con movimiento, en orden
+        horas = np.flatnonzero(entradas_por_hora + salidas_por_hora)
+        entradas = entradas_por_hora[horas]
+        salidas = salidas_por_hora[horas]
+
+        return horas.tolist(), entradas.tolist(), salidas.tolist()
+    
+    def calcular_serie_temporal(
+        self,
+        ancho_minutos: int = 60,
+        por: str = None,
+        hasta_timestamp: str = None,
+    ) -> SerieTemporal:
+        """
+        Entradas/salidas por intervalos de `ancho_minutos` (1, 5, 15, 60...),
+        sin mezclar días, en total o separadas por "puerta" o "zona".
+        Ver series.serie_temporal.
+        """
+        return self._memorizado(
+            "serie",
+            hasta_timestamp,
+            lambda: self._calcular_serie(ancho_minutos, por, hasta_timestamp),
+            (ancho_minutos, por),
+        )
+
+    def _calcular_serie(self, ancho_minutos: int, por: Optional[str], hasta_timestamp: Optional[str]) -> SerieTemporal:
+        columnar = self.columnar
+        zona_por_codigo = None
+        if por == "zona":
+            zona_por_codigo = self.matriz_asignacion.zona_en(columnar.tarjetas)
+        return serie_temporal(
+            columnar,
+            ancho_minutos,
+            por=por,
+            zona_por_codigo=zona_por_codigo,
+            zonas=self.matriz_asignacion.zonas,
+            hasta=int(a_epoch(hasta_timestamp)) if hasta_timestamp else None,
+        )
     
-    def calcular_indicadores_contexto(self) -> Dict:
+    def calcular_sesiones(self, tolerancia_salida: int = 900, hasta_timestamp: str = None) -> Sesiones:
+        """
+        Intervalos entrada→salida por tarjeta (inicio, fin, puertas y zona
+        asignada), con las entradas sin salida y salidas sin entrada aparte.
+        Ver sesiones.reconstruir_sesiones.
+        """
+        return self._memorizado(
+            "sesiones",
+            hasta_timestamp,
+            lambda: self._calcular_sesiones(tolerancia_salida, hasta_timestamp),
+            (tolerancia_salida,),
+        )
+
+    def _calcular_sesiones(self, tolerancia_salida: int, hasta_timestamp: Optional[str]) -> Sesiones:
+        columnar = self.columnar
+        return reconstruir_sesiones(
+            columnar,
+            zona_por_codigo=self.matriz_asignacion.zona_en(columnar.tarjetas),
+            zonas=self.matriz_asignacion.zonas,
+            tolerancia_salida=tolerancia_salida,
+            hasta=int(a_epoch(hasta_timestamp)) if hasta_timestamp else None,
+        )
+
+    def calcular_curva_ocupacion(self, desde_timestamp: str = None, hasta_timestamp: str = None) -> CurvaOcupacion:
+        """
+        Curva escalonada de personas dentro por zona (y TOTAL) con resolución
+        de 1 segundo, con pico, instante del pico y área en personas-hora.
+        Ver ocupacion.curva_ocupacion.
+        """
+        return self._memorizado(
+            "curva",
+            hasta_timestamp,
+            lambda: self._calcular_curva(desde_timestamp, hasta_timestamp),
+            (desde_timestamp,),
+        )
+
+    def _calcular_curva(self, desde_timestamp: Optional[str], hasta_timestamp: Optional[str]) -> CurvaOcupacion:
+        return curva_ocupacion(
+            self.columnar,
+            self.matriz_asignacion,
+            desde=int(a_epoch(desde_timestamp)) if desde_timestamp else None,
+            hasta=int(a_epoch(hasta_timestamp)) if hasta_timestamp else None,
+        )
+
+    def calcular_ubicaciones(self, hasta_timestamp: str = None) -> Dict[str, int]:
+        """
+        Tarjetas por ubicación (fuera, lobby, casino y cada zona) según la
+        máquina de estados de puertas (ver maquina_puertas.MaquinaPuertas),
+        la misma que anima el Panel G. A diferencia de la observada, la
+        salida de piso (puerta 7) deja a la persona en el lobby.
+        """
+        return self._memorizado(
+            "ubicaciones", hasta_timestamp, lambda: self._calcular_ubicaciones(hasta_timestamp)
+        )
+
+    def _calcular_ubicaciones(self, hasta_timestamp: Optional[str]) -> Dict[str, int]:
+        hasta = int(a_epoch(hasta_timestamp)) if hasta_timestamp else None
+        return self.maquina_puertas.conteos(self.maquina_puertas.ubicaciones_en(self.columnar, hasta))
+
+    def calcular_indicadores_contexto(self, hasta_timestamp: str = None) -> Dict:
         """
         Panel F: Indicadores derivados para soporte a decisiones.
         """
+        return self._memorizado(
+            "indicadores", hasta_timestamp, lambda: self._calcular_indicadores(hasta_timestamp)
+        )
+
+    def _calcular_indicadores(self, hasta_timestamp: Optional[str]) -> Dict:
         definida = self.calcular_distribucion_definida()
-        observada = self.calcular_distribucion_observada()
+        observada = self.calcular_distribucion_observada(hasta_timestamp)
         
         total_plan = sum(definida.values())
         total_obs = sum(observada.values())
@@ -0,0 +1,106 @@
+import logging
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from asignacion import MatrizAsignacion
+from columnar import EventosColumnares, TIPO_ENTRADA, TIPO_SALIDA
+
+logger = logging.getLogger(__name__)
+
+FUERA = "fuera"
+LOBBY = "lobby"
+CASINO = "casino"
+DEPARTAMENTO = "departamento"
+
+UBICACIONES_FIJAS = (FUERA, LOBBY, CASINO)
+
+# Códigos especiales de la tabla de transiciones
+MANTENER = -1
+A_DEPARTAMENTO = -2
+
+
+class MaquinaPuertas:
+    """
+    Máquina de estados puerta/zona compilada a una tabla de transiciones,
+    compartida por SistemaDistribucion y el Panel G.
+
+    Ubicaciones: fuera, lobby, casino y una por zona funcional (código
+    3 + índice de zona). Cada puerta de mapeo_puertas declara su
+    `destino`:
+
+    - "departamento" (o sin destino): con entrada va a la zona asignada de
+      la tarjeta (lobby si no tiene); con salida va fuera
+    - "fuera", "lobby", "casino" o una zona: va ahí con cualquier tipo de
+      evento
+
+    Puertas desconocidas: salida va fuera, entrada no cambia la ubicación.
+
+    Como cada transición fija la ubicación sin depender de la anterior, la
+    ubicación en T es el destino del último evento aplicable de cada
+    tarjeta: se evalúa vectorizado sobre EventosColumnares.
+    """
+
+    def __init__(self, mapeo_puertas: Dict, matriz: MatrizAsignacion):
+        self.matriz = matriz
+        self.ubicaciones: List[str] = list(UBICACIONES_FIJAS) + list(matriz.zonas)
+        self.indice_ubicaciones = {u: i for i, u in enumerate(self.ubicaciones)}
+
+        puertas = sorted(int(p) for p in (mapeo_puertas or {}))
+        self.puertas = np.array(puertas, dtype=np.int16)
+        # tabla[i, tipo]: fila i por puerta (la última = puerta desconocida)
+        self.tabla = np.full((len(puertas) + 1, 3), MANTENER, dtype=np.int16)
+        for i, puerta in enumerate(puertas):
+            destino = (mapeo_puertas[puerta] or {}).get("destino", DEPARTAMENTO)
+            if destino == DEPARTAMENTO:
+                self.tabla[i, TIPO_ENTRADA] = A_DEPARTAMENTO
+                self.tabla[i, TIPO_SALIDA] = self.indice_ubicaciones[FUERA]
+            elif destino in self.indice_ubicaciones:
+                self.tabla[i, :] = self.indice_ubicaciones[destino]
+            else:
+                logger.warning("Puerta %s con destino desconocido: %s", puerta, destino)
+        self.tabla[-1, TIPO_SALIDA] = self.indice_ubicaciones[FUERA]
+
+        # Ubicación de "departamento" por tarjeta asignada (índice denso)
+        self.departamento = np.where(
+            matriz.zona_principal >= 0, len(UBICACIONES_FIJAS) + matriz.zona_principal, self.indice_ubicaciones[LOBBY]
+        ).astype(np.int16)
+
+    def destinos(self, columnar: EventosColumnares) -> np.ndarray:
+        """Ubicación (int16) a la que lleva cada evento, MANTENER si no la cambia"""
+        fila = np.searchsorted(self.puertas, columnar.puerta)
+        conocida = fila < len(self.puertas)
+        conocida[conocida] = self.puertas[fila[conocida]] == columnar.puerta[conocida]
+        fila[~conocida] = len(self.puertas)
+        destino = self.tabla[fila, columnar.tipo]
+
+        a_depto = destino == A_DEPARTAMENTO
+        if a_depto.any():
+            departamento = np.full(columnar.n_tarjetas + 1, self.indice_ubicaciones[LOBBY], dtype=np.int16)
+            posiciones = self.matriz.alinear(columnar.tarjetas)
+            departamento[posiciones] = self.departamento
+            destino[a_depto] = departamento[columnar.tarjeta[a_depto]]
+        return destino
+
+    @staticmethod
+    def aplicar(ubicacion: np.ndarray, tarjeta: np.ndarray, destino: np.ndarray) -> None:
+        """Aplica en orden eventos (tarjeta, destino) sobre `ubicacion`: gana el último de cada tarjeta"""
+        aplicables = destino != MANTENER
+        tarjeta, destino = tarjeta[aplicables], destino[aplicables]
+        if len(tarjeta) == 0:
+            return
+        unicas, ultima = np.unique(tarjeta[::-1], return_index=True)
+        ubicacion[unicas] = destino[::-1][ultima]
+
+    def ubicaciones_en(self, columnar: EventosColumnares, hasta: Optional[int] = None) -> np.ndarray:
+        """Ubicación (int16) de cada código de tarjeta tras los eventos con ts <= hasta"""
+        ubicacion = np.full(columnar.n_tarjetas, self.indice_ubicaciones[FUERA], dtype=np.int16)
+        filas = np.argsort(columnar.ts, kind="stable")
+        if hasta is not None:
+            filas = filas[columnar.ts[filas] <= hasta]
+        self.aplicar(ubicacion, columnar.tarjeta[filas], self.destinos(columnar)[filas])
+        return ubicacion
+
+    def conteos(self, ubicacion: np.ndarray) -> Dict[str, int]:
+        """{ubicación: tarjetas} (incluye ubicaciones con 0)"""
+        return dict(zip(self.ubicaciones, np.bincount(ubicacion, minlength=len(self.ubicaciones)).tolist()))
@@ -0,0 +1,130 @@
+import logging
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from asignacion import MatrizAsignacion
+from columnar import EventosColumnares
+from sesiones import reconstruir_sesiones
+
+logger = logging.getLogger(__name__)
+
+TOTAL = "TOTAL"
+
+
+class CurvaOcupacion:
+    """
+    Función escalonada exacta (resolución de 1 segundo) de personas dentro
+    por zona.
+
+    - tiempos: int64 epoch ordenado de cada cambio, más desde y hasta
+    - grupos: zonas de la matriz de asignación y TOTAL (todas las tarjetas
+      dentro, asignadas o no)
+    - niveles: int64 (n_grupos × n_tiempos); niveles[g, k] rige desde
+      tiempos[k] hasta tiempos[k + 1]
+
+    Cada tarjeta asignada a varias zonas cuenta en cada una, igual que
+    calcular_distribucion_observada.
+    """
+
+    def __init__(self, tiempos: np.ndarray, grupos: List[str], niveles: np.ndarray):
+        self.tiempos = tiempos
+        self.grupos = grupos
+        self.niveles = niveles
+
+    def __len__(self) -> int:
+        return len(self.tiempos)
+
+    @property
+    def desde(self) -> int:
+        return int(self.tiempos[0])
+
+    @property
+    def hasta(self) -> int:
+        return int(self.tiempos[-1])
+
+    def nivel(self, instantes) -> np.ndarray:
+        """Personas por grupo en cada instante epoch (n_grupos × n_instantes)"""
+        instantes = np.atleast_1d(np.asarray(instantes, dtype=np.int64))
+        k = np.searchsorted(self.tiempos, instantes, side="right") - 1
+        valores = self.niveles[:, np.maximum(k, 0)]
+        valores[:, k < 0] = 0
+        return valores
+
+    def muestrear(self, ancho_segundos: int = 60) -> Tuple[np.ndarray, np.ndarray]:
+        """(instantes, niveles) en una grilla regular de ancho_segundos entre desde y hasta"""
+        instantes = np.arange(self.desde, self.hasta + 1, ancho_segundos, dtype=np.int64)
+        return instantes, self.nivel(instantes)
+
+    def grupo(self, clave: str) -> np.ndarray:
+        return self.niveles[self.grupos.index(clave)]
+
+    def pico(self) -> Dict[str, Tuple[int, int]]:
+        """{grupo: (personas, instante epoch en que se alcanza por primera vez)}"""
+        if len(self.tiempos) == 0:
+            return {}
+        k = np.argmax(self.niveles, axis=1)
+        return {
+            g: (int(self.niveles[i, k[i]]), int(self.tiempos[k[i]]))
+            for i, g in enumerate(self.grupos)
+        }
+
+    def area(self) -> Dict[str, float]:
+        """{grupo: personas-hora} entre desde y hasta"""
+        if len(self.tiempos) < 2:
+            return {g: 0.0 for g in self.grupos}
+        segundos = self.niveles[:, :-1] @ np.diff(self.tiempos)
+        return {g: float(s) / 3600 for g, s in zip(self.grupos, segundos.tolist())}
+
+
+def curva_ocupacion(
+    columnar: EventosColumnares,
+    matriz: MatrizAsignacion,
+    desde: Optional[int] = None,
+    hasta: Optional[int] = None,
+) -> CurvaOcupacion:
+    """
+    Barrido (sweep line): +1 en cada entrada estando fuera y −1 en cada
+    salida estando dentro (reconstruir_sesiones sin tolerancia), agrupados
+    por segundo con np.unique y acumulados con np.cumsum por zona.
+
+    desde/hasta (epoch) acotan la curva; quien ya estaba dentro en `desde`
+    cuenta desde ese instante. Sin límites se usa el primer y último evento.
+    """
+    sesiones = reconstruir_sesiones(columnar, tolerancia_salida=0, hasta=hasta)
+    abiertas = sesiones.sin_salida
+    tarjeta = np.concatenate([sesiones.tarjeta, sesiones.tarjeta, columnar.tarjeta[abiertas]])
+    instante = np.concatenate([sesiones.inicio, sesiones.fin, columnar.ts[abiertas]])
+    delta = np.concatenate([
+        np.ones(len(sesiones), dtype=np.int64),
+        -np.ones(len(sesiones), dtype=np.int64),
+        np.ones(len(abiertas), dtype=np.int64),
+    ])
+
+    if desde is None:
+        desde = int(columnar.ts.min()) if len(columnar) else 0
+    if hasta is None:
+        hasta = int(columnar.ts.max()) if len(columnar) else desde
+    # Antes de desde: se acumulan en desde (estado inicial)
+    instante = np.clip(instante, desde, None)
+    # Límites con delta 0 para que la curva (y el área) cubra [desde, hasta]
+    tiempos, posicion = np.unique(np.concatenate([instante, [desde, hasta]]), return_inverse=True)
+    tarjeta = np.append(tarjeta, [0, 0])
+    delta = np.append(delta, [0, 0])
+
+    # Zonas de cada código de tarjeta: matriz densa de pertenencia (zonas × códigos)
+    posiciones = matriz.alinear(columnar.tarjetas)
+    pares = posiciones[matriz.filas] < columnar.n_tarjetas
+    pertenece = np.zeros((matriz.n_zonas, columnar.n_tarjetas), dtype=bool)
+    pertenece[matriz.columnas[pares], posiciones[matriz.filas[pares]]] = True
+
+    niveles = np.empty((matriz.n_zonas + 1, len(tiempos)), dtype=np.int64)
+    for z in range(matriz.n_zonas):
+        en_zona = pertenece[z, tarjeta] if columnar.n_tarjetas else np.zeros_like(delta, dtype=bool)
+        niveles[z] = np.bincount(posicion[en_zona], weights=delta[en_zona], minlength=len(tiempos))
+    niveles[-1] = np.bincount(posicion, weights=delta, minlength=len(tiempos))
+    np.cumsum(niveles, axis=1, out=niveles)
+
+    # Recortar a [desde, hasta]
+    dentro = tiempos <= hasta
+    return CurvaOcupacion(tiempos[dentro], list(matriz.zonas) + [TOTAL], niveles[:, dentro])
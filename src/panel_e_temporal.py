@@ -1,4 +1,5 @@
 from manim import *
+import os
 import sys
 from pathlib import Path
 import shutil
@@ -28,8 +29,12 @@ class PanelE_EvolucionTemporal(Scene):
                 path_config="config/configuracion.yaml"
             )
             
-            # Obtener evolución temporal
-            horas, entradas, salidas = sistema.calcular_evolucion_temporal()
+            # Obtener evolución temporal (R2H2_RESOLUCION = minutos por intervalo)
+            resolucion = int(os.environ.get("R2H2_RESOLUCION", "60"))
+            serie = sistema.calcular_serie_temporal(resolucion).con_movimiento()
+            horas = serie.etiquetas()
+            entradas = serie.entradas[0].tolist()
+            salidas = serie.salidas[0].tolist()
             
         except Exception as e:
             self.mostrar_error(f"Error al cargar datos: {e}")
@@ -117,7 +122,7 @@ class PanelE_EvolucionTemporal(Scene):
             
             # Etiqueta solo para algunas horas (evitar saturación)
             if i % max(1, num_horas // 6) == 0 or i == num_horas - 1:
-                label = Text(f"{int(hora)}:00", font_size=12, color=GRAY)
+                label = Text(hora, font_size=12, color=GRAY)
                 label.next_to(marca, DOWN, buff=0.2)
                 marcas_hora.add(marca, label)
             else:
@@ -215,7 +220,7 @@ class PanelE_EvolucionTemporal(Scene):
         
         # Crear puntos
         puntos_acum = []
-        horas_extendidas = [horas[0] - 1] + list(horas) if horas else [0]
+        horas_extendidas = [None] + list(horas)
         
         for i, hora in enumerate(horas_extendidas):
             if i < len(horas_extendidas):
@@ -293,7 +298,7 @@ class PanelE_EvolucionTemporal(Scene):
         
         # Texto de observación
         observacion = Text(
-            f"Pico entradas: {int(horas[max_entrada_idx])}:00 ({entradas[max_entrada_idx]} eventos)",
+            f"Pico entradas: {horas[max_entrada_idx]} ({entradas[max_entrada_idx]} eventos)",
             font_size=12,
             color=GRAY
         )
@@ -2,7 +2,6 @@ from manim import *
 import os
 import sys
 from pathlib import Path
-from datetime import datetime
 import random
 import numpy as np
 import yaml
@@ -32,7 +31,7 @@ class PanelG_FlowBusyHour(Scene):
             return
 
         eventos = sistema.eventos
-        asignaciones = sistema.asignaciones
+        asignacion = sistema.matriz_asignacion
 
         # ========================================
         # CONFIG VELOCIDADES (desde config/configuracion.yaml)
@@ -74,13 +73,8 @@ class PanelG_FlowBusyHour(Scene):
         # ========================================
         # MAPEO DE PERSONAS Y ZONAS
         # ========================================
-        depto_por_id = {}
-        for depto, ids in asignaciones.items():
-            for tarjeta in ids:
-                depto_por_id[tarjeta] = depto
-
         ids_eventos = {e["id_tarjeta"] for e in eventos}
-        ids_definidos = set(depto_por_id.keys())
+        ids_definidos = set(asignacion.tarjetas)
         ids_totales = sorted(ids_definidos | ids_eventos)
 
         presentes_hoy = {e["id_tarjeta"] for e in eventos if e.get("id_tarjeta") in ids_definidos}
@@ -235,7 +229,7 @@ class PanelG_FlowBusyHour(Scene):
         dot_group = VGroup()
 
         for tarjeta in ids_totales:
-            depto = depto_por_id.get(tarjeta)
+            depto = asignacion.zona_de(tarjeta)
             if depto == "DEPTO_A":
                 color = "#4A90E2"
             elif depto == "DEPTO_B":
@@ -280,13 +274,22 @@ class PanelG_FlowBusyHour(Scene):
         # ========================================
         # PROCESAR EVENTOS POR HORA
         # ========================================
-        eventos_por_hora = {h: [] for h in range(24)}
-        for evento in eventos:
-            try:
-                ts = datetime.fromisoformat(evento["timestamp"])
-            except ValueError:
-                continue
-            eventos_por_hora[ts.hour].append((ts, evento))
+        # Máquina de estados de puertas compartida con el loader (ver maquina_puertas)
+        maquina = sistema.maquina_puertas
+        columnar = sistema.columnar
+        destinos = maquina.destinos(columnar)
+        horas_evento = (columnar.ts // 3600) % 24
+        orden = np.lexsort((columnar.ts, horas_evento))
+        cortes_hora = np.searchsorted(horas_evento[orden], np.arange(25))
+        ubicacion = np.full(columnar.n_tarjetas, maquina.indice_ubicaciones["fuera"], dtype=np.int16)
+        codigos = [columnar.indice_tarjetas.get(t) for t in ids_totales]
+
+        def ubicacion_escena(codigo) -> str:
+            """Ubicación de la máquina como zona de la escena (zonas sin piso van al lobby)"""
+            if codigo is None:
+                return "fuera"
+            nombre = maquina.ubicaciones[ubicacion[codigo]].lower()
+            return nombre if nombre in zonas else "lobby"
 
         estado = {tarjeta: "fuera" for tarjeta in ids_totales}
         zona_actual = {tarjeta: "fuera" for tarjeta in ids_totales}
@@ -333,48 +336,14 @@ class PanelG_FlowBusyHour(Scene):
                 return rng.uniform(micro_pausa_min, micro_pausa_max)
             return 0.0
 
-        def aplicar_evento(evento: dict) -> None:
-            tarjeta = evento["id_tarjeta"]
-            puerta = evento["puerta"]
-            tipo = evento["tipo"]
-
-            if puerta in (1, 2, 3) and tipo == "entrada":
-                depto = depto_por_id.get(tarjeta)
-                if depto == "DEPTO_A":
-                    estado[tarjeta] = "depto_a"
-                elif depto == "DEPTO_B":
-                    estado[tarjeta] = "depto_b"
-                elif depto == "DEPTO_C":
-                    estado[tarjeta] = "depto_c"
-                else:
-                    estado[tarjeta] = "lobby"
-            elif puerta == 6 and tipo == "entrada":
-                depto = depto_por_id.get(tarjeta)
-                if depto == "DEPTO_A":
-                    estado[tarjeta] = "depto_a"
-                elif depto == "DEPTO_B":
-                    estado[tarjeta] = "depto_b"
-                elif depto == "DEPTO_C":
-                    estado[tarjeta] = "depto_c"
-                else:
-                    estado[tarjeta] = "lobby"
-            elif puerta == 5:
-                estado[tarjeta] = "casino"
-            elif puerta == 7:
-                estado[tarjeta] = "lobby"
-            elif puerta == 4:
-                estado[tarjeta] = "fuera"
-            elif tipo == "salida":
-                estado[tarjeta] = "fuera"
-
         # ========================================
         # ANIMAR POR HORA
         # ========================================
         prev_marker_pos = marcador.get_center().copy()
         for hora in range(24):
-            eventos_hora = sorted(eventos_por_hora[hora], key=lambda x: x[0])
-            for _, evento in eventos_hora:
-                aplicar_evento(evento)
+            filas = orden[cortes_hora[hora]:cortes_hora[hora + 1]]
+            maquina.aplicar(ubicacion, columnar.tarjeta[filas], destinos[filas])
+            estado = {t: ubicacion_escena(c) for t, c in zip(ids_totales, codigos)}
 
             # Contar ocupación actual (personas dentro del edificio)
             ocupacion_dentro = sum(1 for t in ids_totales if estado[t] != "fuera")
@@ -394,7 +363,7 @@ class PanelG_FlowBusyHour(Scene):
             # Agrupar entrantes por departamento (campana gaussiana independiente por color)
             entrando_por_depto = {}
             for t, a, o in entrando:
-                depto = depto_por_id.get(t, "OTROS")
+                depto = asignacion.zona_de(t, "OTROS")
                 if depto not in entrando_por_depto:
                     entrando_por_depto[depto] = []
                 entrando_por_depto[depto].append((t, a, o))
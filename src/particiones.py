@@ -0,0 +1,62 @@
+import re
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import List, Tuple, Union
+
+# data/DDMMYYYY/HH00.HH00.csv
+PATRON_DIA = re.compile(r"^\d{8}$")
+PATRON_HORA = re.compile(r"^(?P<h_ini>\d{2})00\.(?P<h_fin>\d{2})00\.csv$")
+
+
+def a_datetime(valor: Union[str, date, datetime], fin_de_dia: bool = False) -> datetime:
+    """
+    Normaliza un límite de rango: datetime, date o texto ("2026-01-13T08:00:00",
+    "2026-01-13" o "13012026"). Una fecha sin hora es el inicio del día, o su
+    último segundo si fin_de_dia=True.
+    """
+    if isinstance(valor, datetime):
+        return valor
+    if isinstance(valor, str):
+        texto = valor.strip()
+        if PATRON_DIA.match(texto):
+            valor = datetime.strptime(texto, "%d%m%Y").date()
+        elif len(texto) == 10:
+            valor = date.fromisoformat(texto)
+        else:
+            return datetime.fromisoformat(texto)
+    # Fecha sin hora
+    inicio_dia = datetime.combine(valor, datetime.min.time())
+    return inicio_dia + timedelta(days=1, seconds=-1) if fin_de_dia else inicio_dia
+
+
+def particiones_en_rango(base: Path, inicio: datetime, fin: datetime) -> List[Tuple[Path, List[Path]]]:
+    """
+    Poda de particiones: [(directorio_dia, archivos)] en orden de fecha, solo
+    con los días DDMMYYYY y los archivos HH00.HH00.csv que se solapan con
+    [inicio, fin]. Los CSV con otro nombre no se pueden podar y se incluyen
+    siempre.
+    """
+    dias = []
+    for directorio in Path(base).iterdir():
+        if not directorio.is_dir() or not PATRON_DIA.match(directorio.name):
+            continue
+        try:
+            dia = datetime.strptime(directorio.name, "%d%m%Y")
+        except ValueError:
+            continue
+        if inicio.date() <= dia.date() <= fin.date():
+            dias.append((dia, directorio))
+
+    particiones = []
+    for dia, directorio in sorted(dias):
+        archivos = []
+        for archivo in sorted(directorio.glob("*.csv")):
+            match = PATRON_HORA.match(archivo.name)
+            if match:
+                desde = dia + timedelta(hours=int(match.group("h_ini")))
+                if desde > fin or desde + timedelta(hours=1) <= inicio:
+                    continue
+            archivos.append(archivo)
+        if archivos:
+            particiones.append((directorio, archivos))
+    return particiones
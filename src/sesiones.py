@@ -0,0 +1,189 @@
+import logging
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from columnar import EventosColumnares, TIPO_ENTRADA, TIPO_OTRO
+from series import SIN_ZONA
+
+logger = logging.getLogger(__name__)
+
+
+class Sesiones:
+    """
+    Intervalos de permanencia por tarjeta (una entrada emparejada con su
+    salida), ordenados por tarjeta y luego por inicio.
+
+    - tarjeta: int32 índice en self.tarjetas
+    - zona: int32 índice en self.zonas, -1 si la tarjeta no está asignada
+    - inicio / fin: int64 epoch
+    - puerta_entrada / puerta_salida: int16
+    - movimientos: int32 entradas intermedias (p.ej. puerta 6 o casino)
+
+    Eventos sin pareja (índices de fila en el EventosColumnares de origen):
+
+    - sin_salida: entradas que abren una sesión que no se cerró
+    - sin_entrada: salidas de una tarjeta que ya estaba fuera
+    """
+
+    def __init__(
+        self,
+        tarjetas: List[str],
+        zonas: List[str],
+        tarjeta: np.ndarray,
+        zona: np.ndarray,
+        inicio: np.ndarray,
+        fin: np.ndarray,
+        puerta_entrada: np.ndarray,
+        puerta_salida: np.ndarray,
+        movimientos: np.ndarray,
+        sin_salida: np.ndarray,
+        sin_entrada: np.ndarray,
+    ):
+        self.tarjetas = tarjetas
+        self.zonas = zonas
+        self.tarjeta = tarjeta
+        self.zona = zona
+        self.inicio = inicio
+        self.fin = fin
+        self.puerta_entrada = puerta_entrada
+        self.puerta_salida = puerta_salida
+        self.movimientos = movimientos
+        self.sin_salida = sin_salida
+        self.sin_entrada = sin_entrada
+
+    def __len__(self) -> int:
+        return len(self.inicio)
+
+    def duraciones(self) -> np.ndarray:
+        """Segundos de cada sesión"""
+        return self.fin - self.inicio
+
+    def histograma_permanencia(
+        self, ancho_minutos: int = 30, maximo_horas: int = 12
+    ) -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
+        """
+        (bordes en minutos, {zona: conteos}) de la duración de las sesiones
+        por departamento. El último intervalo acumula las sesiones más largas
+        que maximo_horas.
+        """
+        n_intervalos = max(1, maximo_horas * 60 // ancho_minutos)
+        bordes = np.arange(n_intervalos + 1, dtype=np.int64) * ancho_minutos
+        intervalo = np.minimum(self.duraciones() // (ancho_minutos * 60), n_intervalos - 1)
+        # Zona -1 (sin asignar) va al final
+        zona = np.where(self.zona >= 0, self.zona, len(self.zonas))
+        conteos = np.bincount(
+            zona * n_intervalos + intervalo, minlength=(len(self.zonas) + 1) * n_intervalos
+        ).reshape(len(self.zonas) + 1, n_intervalos)
+        histograma = {z: conteos[i] for i, z in enumerate(self.zonas)}
+        if conteos[-1].any():
+            histograma[SIN_ZONA] = conteos[-1]
+        return bordes, histograma
+
+    def pausas(self, maximo_minutos: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        (tarjeta, inicio, fin) de los lapsos fuera entre dos sesiones
+        consecutivas de la misma tarjeta el mismo día (salidas cortas,
+        colación fuera), opcionalmente solo los de hasta maximo_minutos.
+        """
+        misma = (self.tarjeta[1:] == self.tarjeta[:-1]) & (
+            self.fin[:-1] // 86400 == self.inicio[1:] // 86400
+        )
+        if maximo_minutos is not None:
+            misma &= self.inicio[1:] - self.fin[:-1] <= maximo_minutos * 60
+        i = np.flatnonzero(misma)
+        return self.tarjeta[i], self.fin[i], self.inicio[i + 1]
+
+
+def reconstruir_sesiones(
+    columnar: EventosColumnares,
+    zona_por_codigo: Optional[np.ndarray] = None,
+    zonas: Optional[List[str]] = None,
+    tolerancia_salida: int = 900,
+    hasta: Optional[int] = None,
+) -> Sesiones:
+    """
+    Empareja en una pasada vectorizada cada entrada (estando fuera) con la
+    siguiente salida de la misma tarjeta. Con la misma regla que
+    calcular_distribucion_observada, las entradas estando dentro son
+    movimientos intermedios.
+
+    Una salida estando ya fuera, a no más de `tolerancia_salida` segundos
+    de la salida anterior (p.ej. puerta 7 "salida piso" y luego puerta 4),
+    extiende el fin de la sesión; si no, queda en sin_entrada.
+
+    zona_por_codigo: zona (índice en `zonas`) por código de tarjeta de
+    `columnar`, -1 sin asignar (ver MatrizAsignacion.zona_en).
+    """
+    zonas = list(zonas or [])
+    filas = np.flatnonzero(columnar.tipo != TIPO_OTRO)
+    if hasta is not None:
+        filas = filas[columnar.ts[filas] <= hasta]
+    # Por tarjeta y luego por tiempo (lexsort es estable en empates)
+    filas = filas[np.lexsort((columnar.ts[filas], columnar.tarjeta[filas]))]
+    tarjeta = columnar.tarjeta[filas]
+    ts = columnar.ts[filas]
+    entrada = columnar.tipo[filas] == TIPO_ENTRADA
+    n = len(filas)
+
+    primero = np.ones(n, dtype=bool)
+    primero[1:] = tarjeta[1:] != tarjeta[:-1]
+    # Dentro antes de este evento: el evento anterior de la tarjeta fue entrada
+    dentro_antes = np.zeros(n, dtype=bool)
+    dentro_antes[1:] = entrada[:-1]
+    dentro_antes &= ~primero
+
+    abre = entrada & ~dentro_antes
+    cierra = ~entrada & dentro_antes
+    salida_fuera = ~entrada & ~dentro_antes
+
+    # Salidas que extienden una sesión: cadena de salidas sin cortes de
+    # tolerancia que empieza en un cierre
+    continua = np.zeros(n, dtype=bool)
+    continua[1:] = ts[1:] - ts[:-1] <= tolerancia_salida
+    encadenable = salida_fuera & ~primero & continua
+    posiciones = np.arange(n)
+    ultimo_corte = np.maximum.accumulate(np.where(encadenable, -1, posiciones))
+    extiende = encadenable & cierra[np.maximum(ultimo_corte, 0)] & (ultimo_corte >= 0)
+
+    # Fin de cada cierre: última salida de su cadena
+    candidatas = np.flatnonzero(cierra | extiende)
+    cadena = np.cumsum(cierra)[candidatas]
+    fin_de_cierre = candidatas[np.append(cadena[1:] != cadena[:-1], True)] if len(candidatas) else candidatas
+
+    # Cada apertura se cierra con la próxima salida de la tarjeta (entre ambas solo hay entradas)
+    proxima_salida = np.minimum.accumulate(np.where(~entrada, posiciones, n)[::-1])[::-1]
+    proxima_salida = np.append(proxima_salida, n)
+    aperturas = np.flatnonzero(abre)
+    cierre = proxima_salida[aperturas + 1]
+    emparejada = cierre < n
+    emparejada[emparejada] = tarjeta[cierre[emparejada]] == tarjeta[aperturas[emparejada]]
+
+    inicio_pos = aperturas[emparejada]
+    cierre_pos = cierre[emparejada]
+    fin_pos = fin_de_cierre[np.cumsum(cierra)[cierre_pos] - 1]
+
+    if zona_por_codigo is None:
+        zona = np.full(len(inicio_pos), -1, dtype=np.int32)
+    else:
+        zona = np.asarray(zona_por_codigo, dtype=np.int32)[tarjeta[inicio_pos]]
+
+    sesiones = Sesiones(
+        columnar.tarjetas,
+        zonas,
+        tarjeta[inicio_pos],
+        zona,
+        ts[inicio_pos],
+        ts[fin_pos],
+        columnar.puerta[filas[inicio_pos]],
+        columnar.puerta[filas[fin_pos]],
+        (cierre_pos - inicio_pos - 1).astype(np.int32),
+        filas[aperturas[~emparejada]],
+        filas[salida_fuera & ~extiende],
+    )
+    if len(sesiones.sin_salida) or len(sesiones.sin_entrada):
+        logger.info(
+            "Sesiones: %d emparejadas, %d entradas sin salida, %d salidas sin entrada",
+            len(sesiones), len(sesiones.sin_salida), len(sesiones.sin_entrada),
+        )
+    return sesiones
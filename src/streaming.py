@@ -0,0 +1,232 @@
+import heapq
+import logging
+from datetime import date, datetime
+from operator import itemgetter
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+import numpy as np
+
+from asignacion import MatrizAsignacion
+from columnar import ContadorOrden, a_epoch
+from config_compilada import ConfigCompilada
+from particiones import a_datetime, particiones_en_rango
+from series import SerieTemporal
+from validacion import Cuarentena, leer_csv_validado, validar_columnar
+
+logger = logging.getLogger(__name__)
+
+Par = Tuple[int, Dict]
+
+
+def _clave(evento: Dict) -> int:
+    """Segundos epoch del timestamp del evento (columnar.a_epoch)"""
+    return int(a_epoch(evento["timestamp"]))
+
+
+def _con_clave(eventos: Iterable[Dict]) -> Iterator[Par]:
+    for evento in eventos:
+        yield _clave(evento), evento
+
+
+def _leer_pares(
+    path: Union[str, Path],
+    puertas_conocidas: Optional[Iterable[int]] = None,
+    cuarentena: Optional[Cuarentena] = None,
+) -> Iterator[Par]:
+    """(epoch, evento) de un CSV horario validado; el epoch sale de la columna ya parseada"""
+    parte, rechazos = leer_csv_validado(path)
+    parte, rechazos_carga = validar_columnar(parte, puertas_conocidas, path)
+    if cuarentena is not None:
+        cuarentena.unir(rechazos)
+        cuarentena.agregar(rechazos_carga.origen, rechazos_carga.motivo, rechazos_carga.campos)
+    yield from zip(parte.ts.tolist(), parte.iterar_eventos())
+
+
+def leer_csv(
+    path: Union[str, Path],
+    puertas_conocidas: Optional[Iterable[int]] = None,
+    cuarentena: Optional[Cuarentena] = None,
+) -> Iterator[Dict]:
+    """
+    Eventos válidos de un CSV horario, de a uno y en el orden del archivo.
+    Pasa por la misma validación que la carga de SistemaDistribucion
+    (validar_filas y validar_columnar, con `puertas_conocidas` si se da);
+    los rechazos se suman a `cuarentena`. El archivo se lee completo al
+    pedir el primer evento (una hora de eventos en columnas).
+    """
+    for _, evento in _leer_pares(path, puertas_conocidas, cuarentena):
+        yield evento
+
+
+def vigilar_orden(pares: Iterable[Par], contador: ContadorOrden) -> Iterator[Par]:
+    """Deja pasar los pares (epoch, evento) contando en `contador` los que retroceden en el tiempo"""
+    anterior = None
+    desordenadas = 0
+    for par in pares:
+        contador.filas += 1
+        if anterior is not None and par[0] < anterior:
+            desordenadas += 1
+        else:
+            anterior = par[0]
+        yield par
+    contador.desordenadas += desordenadas
+    contador.fuentes_desordenadas += desordenadas > 0
+
+
+def _mezclar(fuentes: Iterable[Iterator[Par]], contador: Optional[ContadorOrden] = None) -> Iterator[Par]:
+    if contador is not None:
+        fuentes = [vigilar_orden(f, contador) for f in fuentes]
+    return heapq.merge(*fuentes, key=itemgetter(0))
+
+
+def fusionar(fuentes: Iterable[Iterator[Dict]], contador: Optional[ContadorOrden] = None) -> Iterator[Dict]:
+    """
+    Mezcla k-way (heapq.merge) de flujos ya ordenados por tiempo. La clave
+    es el timestamp en segundos epoch (columnar.a_epoch), no el texto, así
+    'T' o espacio como separador no alteran el orden. Con `contador` se
+    cuentan las filas que llegan fuera de orden en cada fuente
+    (heapq.merge no las reordena).
+    """
+    return map(itemgetter(1), _mezclar((_con_clave(f) for f in fuentes), contador))
+
+
+def flujo_rango(
+    base: Union[str, Path],
+    inicio: Union[str, date, datetime],
+    fin: Union[str, date, datetime],
+    contador: Optional[ContadorOrden] = None,
+    puertas_conocidas: Optional[Iterable[int]] = None,
+    cuarentena: Optional[Cuarentena] = None,
+) -> Iterator[Dict]:
+    """
+    Eventos entre inicio y fin en orden de tiempo, sin materializarlos:
+    cada día es una mezcla k-way de sus archivos horarios (solo los que
+    se solapan con el rango) y los días se recorren en orden, así solo hay
+    abiertos los archivos de un día. Orden y rango se comparan en
+    segundos epoch, tomados de la columna ya parseada de cada archivo.
+
+    Los archivos se validan como en SistemaDistribucion.desde_rango (ver
+    leer_csv): al terminar cada día se actualiza su cuarentena.tsv y los
+    rechazos se suman a `cuarentena`, si se da.
+    """
+    inicio, fin = a_datetime(inicio), a_datetime(fin, fin_de_dia=True)
+    desde, hasta = a_epoch([inicio, fin]).tolist()
+    if puertas_conocidas is not None:
+        puertas_conocidas = list(puertas_conocidas)
+    for _, archivos in particiones_en_rango(Path(base), inicio, fin):
+        del_dia = Cuarentena()
+        fuentes = (_leer_pares(a, puertas_conocidas, del_dia) for a in archivos)
+        for segundos, evento in _mezclar(fuentes, contador):
+            if desde <= segundos <= hasta:
+                yield evento
+        try:
+            del_dia.escribir(archivos, archivos)
+        except OSError as e:
+            logger.warning("No se pudo escribir la cuarentena: %s", e)
+        if cuarentena is not None:
+            cuarentena.unir(del_dia)
+
+
+class AgregadorOcupacion:
+    """
+    Ocupación por zona a medida que llegan los eventos (misma regla que
+    calcular_distribucion_observada: el último entrada/salida de cada
+    tarjeta decide si está dentro) y el máximo alcanzado por zona.
+    Memoria proporcional a las tarjetas, no a los eventos.
+    """
+
+    def __init__(self, matriz: MatrizAsignacion):
+        self.zonas = matriz.zonas
+        self.zonas_de: Dict[str, List[int]] = {}
+        for fila, columna in zip(matriz.filas.tolist(), matriz.columnas.tolist()):
+            self.zonas_de.setdefault(matriz.tarjetas[fila], []).append(columna)
+        self.dentro = set()
+        self.ocupacion = [0] * len(self.zonas)
+        self.pico = [0] * len(self.zonas)
+        self.instante_pico: List[Optional[str]] = [None] * len(self.zonas)
+
+    def consumir(self, evento: Dict) -> None:
+        tarjeta = evento["id_tarjeta"]
+        tipo = evento["tipo"]
+        if tipo == "entrada" and tarjeta not in self.dentro:
+            self.dentro.add(tarjeta)
+            for z in self.zonas_de.get(tarjeta, ()):
+                self.ocupacion[z] += 1
+                if self.ocupacion[z] > self.pico[z]:
+                    self.pico[z] = self.ocupacion[z]
+                    self.instante_pico[z] = evento["timestamp"]
+        elif tipo == "salida" and tarjeta in self.dentro:
+            self.dentro.discard(tarjeta)
+            for z in self.zonas_de.get(tarjeta, ()):
+                self.ocupacion[z] -= 1
+
+    def resultado(self) -> Dict:
+        return {
+            "ocupacion": dict(zip(self.zonas, self.ocupacion)),
+            "pico": {z: (p, t) for z, p, t in zip(self.zonas, self.pico, self.instante_pico)},
+        }
+
+
+class AgregadorSerie:
+    """Entradas/salidas por intervalo de `ancho_minutos`, acumuladas en un dict por intervalo"""
+
+    def __init__(self, ancho_minutos: int = 60):
+        if ancho_minutos <= 0:
+            raise ValueError(f"ancho_minutos debe ser positivo: {ancho_minutos}")
+        self.ancho = ancho_minutos * 60
+        self.conteos: Dict[int, List[int]] = {}
+
+    def consumir(self, evento: Dict) -> None:
+        tipo = evento["tipo"]
+        if tipo not in ("entrada", "salida"):
+            return
+        clave = _clave(evento) // self.ancho * self.ancho
+        conteo = self.conteos.setdefault(clave, [0, 0])
+        conteo[0 if tipo == "entrada" else 1] += 1
+
+    def resultado(self) -> SerieTemporal:
+        """Serie solo con los intervalos que tuvieron movimiento"""
+        inicios = np.array(sorted(self.conteos), dtype=np.int64)
+        conteos = np.array([self.conteos[k] for k in inicios.tolist()], dtype=np.int64).reshape(-1, 2)
+        return SerieTemporal(inicios, ["total"], conteos[:, 0][None, :], conteos[:, 1][None, :], self.ancho // 60)
+
+
+def reproducir(eventos: Iterable[Dict], agregadores: Iterable) -> int:
+    """Pasa cada evento por todos los agregadores; retorna cuántos eventos se consumieron"""
+    agregadores = list(agregadores)
+    total = 0
+    for evento in eventos:
+        for agregador in agregadores:
+            agregador.consumir(evento)
+        total += 1
+    return total
+
+
+def reproducir_rango(
+    inicio: Union[str, date, datetime],
+    fin: Union[str, date, datetime],
+    path_base: str = "data",
+    path_config: str = "config/configuracion.yaml",
+    ancho_minutos: int = 60,
+) -> Dict:
+    """
+    Revisión de capacidad sobre un rango (p.ej. 30-90 días) en modo
+    streaming: ocupación final, pico por zona y serie por intervalo, con
+    memoria constante respecto al largo del rango.
+    """
+    compilada = ConfigCompilada.cargar(path_config)
+    ocupacion = AgregadorOcupacion(compilada.matriz)
+    serie = AgregadorSerie(ancho_minutos)
+    contador = ContadorOrden()
+    cuarentena = Cuarentena()
+    puertas = compilada.config.get("mapeo_puertas") or {}
+    total = reproducir(flujo_rango(path_base, inicio, fin, contador, puertas, cuarentena), (ocupacion, serie))
+    logger.info("Reproducidos %d eventos entre %s y %s", total, inicio, fin)
+    if len(cuarentena):
+        logger.warning("%s", cuarentena.resumen())
+    if contador.desordenadas:
+        logger.warning(
+            "%d eventos fuera de orden en %d archivos", contador.desordenadas, contador.fuentes_desordenadas
+        )
+    return {"eventos": total, **ocupacion.resultado(), "serie": serie.resultado()}
@@ -0,0 +1,344 @@
+import csv
+import logging
+import os
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+import numpy as np
+
+from columnar import EventosColumnares, NOMBRES_TIPO, TIPO_OTRO, TIPOS, a_epoch
+from particiones import PATRON_DIA, PATRON_HORA
+
+logger = logging.getLogger(__name__)
+
+CAMPOS_EVENTO = ("timestamp", "id_tarjeta", "puerta", "tipo")
+
+# Motivos de rechazo. Los de fila se detectan al parsear cada archivo; los
+# de carga, sobre los eventos ya unidos (dependen de la config o de otras filas)
+FILA_INCOMPLETA = "fila_incompleta"
+TIMESTAMP_INVALIDO = "timestamp_invalido"
+PUERTA_INVALIDA = "puerta_invalida"
+TIPO_INVALIDO = "tipo_invalido"
+FUERA_DE_PARTICION = "fuera_de_particion"
+PUERTA_DESCONOCIDA = "puerta_desconocida"
+DUPLICADO = "duplicado"
+
+MOTIVOS_FILA = (FILA_INCOMPLETA, TIMESTAMP_INVALIDO, PUERTA_INVALIDA, TIPO_INVALIDO, FUERA_DE_PARTICION)
+MOTIVOS_CARGA = (PUERTA_DESCONOCIDA, DUPLICADO)
+MOTIVOS = MOTIVOS_FILA + MOTIVOS_CARGA
+
+NAT = np.iinfo(np.int64).min
+PUERTA_MAXIMA = np.iinfo(np.int16).max
+
+
+class Cuarentena:
+    """
+    Filas rechazadas por la validación, con los campos tal como venían,
+    el motivo y el archivo de origen.
+
+    Se escribe en <directorio del origen>/cuarentena.tsv (una por día en
+    data/DDMMYYYY) para revisar o reinyectar las filas, y se reporta con
+    una sola línea de resumen en vez de un warning por fila.
+    """
+
+    NOMBRE = "cuarentena.tsv"
+    COLUMNAS = ("archivo", "motivo") + CAMPOS_EVENTO
+
+    def __init__(self):
+        self.origen = np.empty(0, dtype=str)
+        self.motivo = np.empty(0, dtype=str)
+        self.campos = [np.empty(0, dtype=str) for _ in CAMPOS_EVENTO]
+        # Filas revisadas (válidas + rechazadas) para el resumen
+        self.filas = 0
+
+    def __len__(self) -> int:
+        return len(self.motivo)
+
+    def agregar(self, origen, motivo: np.ndarray, campos: List[np.ndarray]) -> None:
+        """Agrega filas rechazadas: `origen` (uno o por fila), motivo y columnas crudas en orden CAMPOS_EVENTO"""
+        if len(motivo) == 0:
+            return
+        origen = np.broadcast_to(np.asarray(origen, dtype=str), motivo.shape)
+        self.origen = np.concatenate([self.origen, origen])
+        self.motivo = np.concatenate([self.motivo, motivo.astype(str)])
+        self.campos = [np.concatenate([a, np.asarray(b, dtype=str)]) for a, b in zip(self.campos, campos)]
+
+    def unir(self, otra: "Cuarentena") -> None:
+        self.agregar(otra.origen, otra.motivo, otra.campos)
+        self.filas += otra.filas
+
+    def conteos(self) -> Dict[str, int]:
+        """{motivo: filas} (solo motivos con rechazos, en el orden de MOTIVOS)"""
+        motivos, cantidades = np.unique(self.motivo, return_counts=True)
+        por_motivo = dict(zip(motivos.tolist(), cantidades.tolist()))
+        return {m: por_motivo[m] for m in MOTIVOS if m in por_motivo}
+
+    def resumen(self) -> str:
+        detalle = ", ".join(f"{m}={c}" for m, c in self.conteos().items())
+        return f"Validacion: {len(self)}/{self.filas} filas en cuarentena ({detalle or 'ninguna'})"
+
+    def escribir(
+        self,
+        releidos: Iterable[Union[str, Path]] = (),
+        cargados: Iterable[Union[str, Path]] = (),
+    ) -> List[Path]:
+        """
+        Actualiza el cuarentena.tsv de cada directorio involucrado: se
+        reemplazan los rechazos de fila de los archivos `releidos` y los de
+        carga de los archivos `cargados`; el resto de lo ya escrito (p.ej.
+        archivos que vinieron del cache) se conserva. Sin argumentos solo
+        agrega. Retorna los archivos de cuarentena escritos.
+        """
+        reemplazos: Dict[Path, List[Tuple[set, set]]] = {}
+        for archivos, motivos in ((releidos, MOTIVOS_FILA), (cargados, MOTIVOS_CARGA)):
+            for archivo in archivos:
+                archivo = Path(archivo)
+                reemplazos.setdefault(archivo.parent, []).append(({archivo.name}, set(motivos)))
+        # Filas sin archivo de origen no se escriben (solo cuentan en el resumen)
+        con_origen = self.origen != ""
+        directorios = {Path(o).parent for o in set(self.origen[con_origen].tolist())} | set(reemplazos)
+
+        escritos = []
+        for directorio in sorted(directorios):
+            ruta = directorio / self.NOMBRE
+            filas = []
+            if ruta.exists():
+                with open(ruta, "r", encoding="utf-8", newline="") as f:
+                    lector = csv.reader(f, delimiter="\t")
+                    next(lector, None)
+                    filas = [
+                        fila for fila in lector
+                        if len(fila) == len(self.COLUMNAS) and not any(
+                            fila[0] in archivos and fila[1] in motivos
+                            for archivos, motivos in reemplazos.get(directorio, [])
+                        )
+                    ]
+            propias = con_origen & np.array([Path(o).parent == directorio for o in self.origen.tolist()], dtype=bool)
+            nombres = [Path(o).name for o in self.origen[propias].tolist()]
+            filas += [list(f) for f in zip(nombres, self.motivo[propias].tolist(), *(c[propias].tolist() for c in self.campos))]
+
+            if not filas:
+                if ruta.exists():
+                    ruta.unlink()
+                continue
+            tmp = ruta.with_name(ruta.name + ".tmp")
+            with open(tmp, "w", encoding="utf-8", newline="") as f:
+                escritor = csv.writer(f, delimiter="\t")
+                escritor.writerow(self.COLUMNAS)
+                escritor.writerows(filas)
+            os.replace(tmp, ruta)
+            escritos.append(ruta)
+        return escritos
+
+
+def _a_epoch_validos(valores) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    (epoch int64, válidos) de timestamps ISO en texto. Se convierten en
+    bloque con numpy; si un bloque falla se parte en mitades, así cada
+    timestamp inválido cuesta O(log n) conversiones vectorizadas.
+    """
+    try:
+        ts = a_epoch(valores)
+    except ValueError:
+        valores = np.asarray(valores)
+        if len(valores) == 1:
+            return np.zeros(1, dtype=np.int64), np.zeros(1, dtype=bool)
+        mitad = len(valores) // 2
+        ts_a, validos_a = _a_epoch_validos(valores[:mitad])
+        ts_b, validos_b = _a_epoch_validos(valores[mitad:])
+        return np.concatenate([ts_a, ts_b]), np.concatenate([validos_a, validos_b])
+    # Vacíos y "NaT" se convierten sin error a NaT
+    return ts, ts != NAT
+
+
+def rango_particion(origen: Optional[Union[str, Path]]) -> Optional[Tuple[int, int]]:
+    """[inicio, fin) epoch de la hora de un data/DDMMYYYY/HH00.HH00.csv; None si el origen no es una partición"""
+    if origen is None:
+        return None
+    origen = Path(origen)
+    match = PATRON_HORA.match(origen.name)
+    if not match or not PATRON_DIA.match(origen.parent.name):
+        return None
+    try:
+        dia = datetime.strptime(origen.parent.name, "%d%m%Y")
+    except ValueError:
+        return None
+    inicio = int(a_epoch(dia.isoformat())) + int(match.group("h_ini")) * 3600
+    return inicio, inicio + 3600
+
+
+def archivo_de_particion(base: Union[str, Path], ts: np.ndarray) -> np.ndarray:
+    """
+    Ruta del archivo horario al que pertenece cada timestamp: base/HH00.HH00.csv
+    si base es un directorio diario, base/DDMMYYYY/HH00.HH00.csv si no.
+    """
+    base = Path(base)
+    instantes = ts.astype("datetime64[s]").astype(object)
+    nombres = [f"{t.hour:02d}00.{(t.hour + 1) % 24:02d}00.csv" for t in instantes]
+    if PATRON_DIA.match(base.name):
+        return np.array([str(base / n) for n in nombres], dtype=str)
+    return np.array([str(base / t.strftime("%d%m%Y") / n) for t, n in zip(instantes, nombres)], dtype=str)
+
+
+def validar_filas(
+    encabezado: List[str],
+    filas: List[List[str]],
+    origen: Optional[Union[str, Path]] = None,
+) -> Tuple[EventosColumnares, Cuarentena]:
+    """
+    Valida en bloque las filas de csv.reader (sin el encabezado) y retorna
+    (eventos válidos, cuarentena). Cada fila queda con el primer motivo que
+    aplique: fila incompleta, timestamp que no se puede leer, puerta no
+    numérica, tipo fuera de TIPOS y, si `origen` es un archivo horario
+    data/DDMMYYYY/HH00.HH00.csv, timestamp fuera de esa hora.
+    """
+    cuarentena = Cuarentena()
+    cuarentena.filas = len(filas)
+    if not filas:
+        return EventosColumnares.vacio(), cuarentena
+    indices = [encabezado.index(c) for c in CAMPOS_EVENTO]
+    n = len(filas)
+
+    incompleta = np.zeros(n, dtype=bool)
+    if min(map(len, filas)) < len(encabezado):
+        incompleta = np.fromiter(map(len, filas), dtype=np.int64, count=n) < len(encabezado)
+        relleno = [""] * len(encabezado)
+        filas = [fila if len(fila) >= len(encabezado) else (fila + relleno)[:len(encabezado)] for fila in filas]
+    columnas = list(zip(*filas))
+    ts_txt, ids, puerta_txt, tipo_txt = (columnas[i] for i in indices)
+
+    # Código de motivo por fila: 0 válida, k = MOTIVOS_FILA[k - 1]
+    motivo = np.zeros(n, dtype=np.uint8)
+
+    def marcar(nombre: str, malas: np.ndarray) -> None:
+        motivo[malas & (motivo == 0)] = MOTIVOS_FILA.index(nombre) + 1
+
+    marcar(FILA_INCOMPLETA, incompleta)
+
+    ts, ts_ok = _a_epoch_validos(ts_txt)
+    marcar(TIMESTAMP_INVALIDO, ~ts_ok)
+
+    try:
+        puerta = np.asarray(puerta_txt).astype(np.int64)
+        puerta_ok = np.ones(n, dtype=bool)
+    except ValueError:
+        limpia = np.char.strip(np.asarray(puerta_txt, dtype=str))
+        puerta_ok = np.char.isdigit(limpia) & (np.char.str_len(limpia) <= 5)
+        puerta = np.zeros(n, dtype=np.int64)
+        puerta[puerta_ok] = limpia[puerta_ok].astype(np.int64)
+    puerta_ok &= (puerta >= 0) & (puerta <= PUERTA_MAXIMA)
+    marcar(PUERTA_INVALIDA, ~puerta_ok)
+
+    tipos = np.asarray(tipo_txt, dtype=str)
+    tipo = np.full(n, TIPO_OTRO, dtype=np.uint8)
+    for nombre, codigo in TIPOS.items():
+        tipo[tipos == nombre] = codigo
+    marcar(TIPO_INVALIDO, tipo == TIPO_OTRO)
+
+    particion = rango_particion(origen)
+    if particion is not None:
+        marcar(FUERA_DE_PARTICION, ts_ok & ((ts < particion[0]) | (ts >= particion[1])))
+
+    if motivo.any():
+        malas = np.flatnonzero(motivo)
+        cuarentena.agregar(
+            str(origen or ""),
+            np.array(MOTIVOS_FILA)[motivo[malas] - 1],
+            [[columna[i] for i in malas.tolist()] for columna in (ts_txt, ids, puerta_txt, tipo_txt)],
+        )
+        validas = motivo == 0
+        ts, puerta, tipos = ts[validas], puerta[validas], tipos[validas]
+        ids = [ids[i] for i in np.flatnonzero(validas).tolist()]
+    return EventosColumnares.desde_columnas(ts, ids, puerta.astype(np.int16), tipos), cuarentena
+
+
+def leer_csv_validado(path: Union[str, Path]) -> Tuple[EventosColumnares, Cuarentena]:
+    """
+    Lector liviano de un CSV horario: csv.reader + listas por columna, sin
+    crear un dict por fila, validado en bloque (ver validar_filas).
+    Retorna (eventos válidos, filas rechazadas). Es función de módulo para
+    poder usarse en un ProcessPoolExecutor.
+    """
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        reader = csv.reader(f)
+        encabezado = next(reader, None)
+        if not encabezado:
+            return EventosColumnares.vacio(), Cuarentena()
+        if not all(c in encabezado for c in CAMPOS_EVENTO):
+            logger.warning("Encabezado CSV invalido en %s: %s", path, encabezado)
+            return EventosColumnares.vacio(), Cuarentena()
+        filas = [fila for fila in reader if fila]
+    return validar_filas(encabezado, filas, path)
+
+
+def leer_csv_columnar(path: Union[str, Path]) -> EventosColumnares:
+    """Eventos válidos de un CSV horario (ver leer_csv_validado)"""
+    return leer_csv_validado(path)[0]
+
+
+def validar_columnar(
+    columnar: EventosColumnares,
+    puertas_conocidas: Optional[Iterable[int]] = None,
+    origen: Optional[Union[str, Path]] = None,
+) -> Tuple[EventosColumnares, Cuarentena]:
+    """
+    Validación de carga sobre eventos ya unidos: puertas que no están en
+    `puertas_conocidas` (mapeo_puertas) y filas duplicadas (mismo
+    timestamp, tarjeta, puerta y tipo; se conserva la primera).
+
+    `origen` es el CSV cargado o el directorio (diario o base) del que se
+    derivan los archivos horarios de las filas rechazadas.
+    """
+    cuarentena = Cuarentena()
+    cuarentena.filas = len(columnar)
+    n = len(columnar)
+    if n == 0:
+        return columnar, cuarentena
+    # Código de motivo por fila: 0 válida, k = MOTIVOS_CARGA[k - 1]
+    motivo = np.zeros(n, dtype=np.uint8)
+
+    if puertas_conocidas is not None:
+        conocidas = np.array(sorted(int(p) for p in puertas_conocidas), dtype=np.int16)
+        motivo[~np.isin(columnar.puerta, conocidas)] = MOTIVOS_CARGA.index(PUERTA_DESCONOCIDA) + 1
+
+    # Solo las filas que comparten timestamp con otra pueden ser duplicadas
+    ts = columnar.ts
+    if np.all(ts[1:] >= ts[:-1]):
+        igual = ts[1:] == ts[:-1]
+        candidatas = np.flatnonzero(np.concatenate([igual, [False]]) | np.concatenate([[False], igual]))
+    else:
+        candidatas = np.arange(n)
+    if len(candidatas) > 1:
+        # tarjeta, puerta y tipo en una sola clave; las filas iguales son
+        # idénticas, así que da lo mismo cuál de ellas se conserva
+        clave = (
+            (columnar.tarjeta[candidatas].astype(np.int64) << 24)
+            | ((columnar.puerta[candidatas].astype(np.int64) & 0xFFFF) << 8)
+            | columnar.tipo[candidatas]
+        )
+        orden = np.lexsort((clave, ts[candidatas]))
+        clave, ts_orden = clave[orden], ts[candidatas][orden]
+        repetida = (clave[1:] == clave[:-1]) & (ts_orden[1:] == ts_orden[:-1])
+        duplicadas = candidatas[orden[1:][repetida]]
+        duplicadas = duplicadas[motivo[duplicadas] == 0]
+        motivo[duplicadas] = MOTIVOS_CARGA.index(DUPLICADO) + 1
+
+    rechazadas = motivo != 0
+    if not rechazadas.any():
+        return columnar, cuarentena
+    malas = columnar.filtrar(rechazadas)
+    if origen is not None and Path(origen).suffix.lower() != ".csv":
+        origenes = archivo_de_particion(origen, malas.ts)
+    else:
+        origenes = str(origen or "")
+    cuarentena.agregar(
+        origenes, np.array(MOTIVOS_CARGA)[motivo[rechazadas] - 1],
+        [
+            malas.ts.astype("datetime64[s]").astype(str),
+            np.asarray(malas.tarjetas, dtype=str)[malas.tarjeta] if malas.tarjetas else np.empty(0, dtype=str),
+            malas.puerta.astype(str),
+            np.array([NOMBRES_TIPO[k] for k in sorted(NOMBRES_TIPO)], dtype=str)[malas.tipo],
+        ],
+    )
+    return columnar.filtrar(~rechazadas), cuarentena
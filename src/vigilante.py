@@ -0,0 +1,199 @@
+import csv
+import io
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from loader import SistemaDistribucion
+from particiones import PATRON_HORA
+from validacion import CAMPOS_EVENTO, validar_columnar, validar_filas
+
+logger = logging.getLogger(__name__)
+
+
+class VigilanteDia:
+    """
+    Vigila data/<fecha>/ e incorpora al SistemaDistribucion en vivo solo
+    los archivos HH00.HH00.csv que se van cerrando.
+
+    Un archivo horario se considera cerrado cuando su hora terminó hace más
+    de `gracia` segundos y no se modificó en ese lapso. El directorio se
+    revisa por polling con os.scandir cada `intervalo` segundos (una
+    llamada al sistema por revisión, sin releer archivos ya incorporados).
+    Si un archivo ya incorporado crece (evento tardío), solo se leen los
+    bytes nuevos.
+
+    al_actualizar(sistema, archivos) se llama tras cada incorporación.
+    `reloj` da la hora actual en segundos epoch (time.time por defecto;
+    ProgramadorHorario le pasa el suyo).
+    """
+
+    def __init__(
+        self,
+        path_base: str = "data",
+        path_config: str = "config/configuracion.yaml",
+        fecha: str = None,
+        intervalo: float = 1.0,
+        gracia: float = 2.0,
+        al_actualizar: Callable[[SistemaDistribucion, List[Path]], None] = None,
+        reloj: Callable[[], float] = time.time,
+        **kwargs,
+    ):
+        self.fecha = fecha or datetime.now().strftime("%d%m%Y")
+        self.dia = datetime.strptime(self.fecha, "%d%m%Y")
+        self.directorio = Path(path_base) / self.fecha
+        self.intervalo = intervalo
+        self.gracia = gracia
+        self.al_actualizar = al_actualizar
+        self.reloj = reloj
+
+        # Bytes ya incorporados de cada archivo horario
+        self._offsets: Dict[str, int] = {}
+        self._detener = threading.Event()
+        self._hilo: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+        # Carga inicial: el rango cubre solo las horas cerradas anteriores a
+        # la primera hora aún abierta (o en gracia), así todo archivo que lee
+        # el rango queda registrado en _offsets; las cerradas posteriores se
+        # incorporan en la primera revisión
+        cerrados = self._cerrados(self.reloj())
+        horas_cerradas = {self._hora(a.name) for a in cerrados}
+        abiertas = [
+            hora for hora in map(self._hora, self._nombres_horarios())
+            if hora is not None and hora not in horas_cerradas
+        ]
+        corte = min(abiertas, default=24)
+        cargados = [a for a in cerrados if self._hora(a.name) < corte]
+        horas = [self._hora(a.name) for a in cargados]
+        fin = self.dia + timedelta(hours=max(horas) + 1 if horas else 0, seconds=-1)
+        # Con fin < inicio no se abre ninguna partición (sistema vacío)
+        self.sistema = SistemaDistribucion(path_base, path_config, rango=(self.dia, fin), **kwargs)
+        for archivo in cargados:
+            self._offsets[archivo.name] = archivo.stat().st_size
+        logger.info("Vigilando %s: %d horas cerradas cargadas", self.directorio, len(cargados))
+
+    @staticmethod
+    def _hora(nombre: str) -> Optional[int]:
+        match = PATRON_HORA.match(nombre)
+        return int(match.group("h_ini")) if match else None
+
+    def _nombres_horarios(self) -> List[str]:
+        if not self.directorio.is_dir():
+            return []
+        with os.scandir(self.directorio) as entradas:
+            return [e.name for e in entradas if PATRON_HORA.match(e.name)]
+
+    def _fin_hora(self, nombre: str) -> Optional[float]:
+        hora = self._hora(nombre)
+        if hora is None:
+            return None
+        return (self.dia + timedelta(hours=hora + 1)).timestamp()
+
+    def _cerrados(self, ahora: float) -> List[Path]:
+        """Archivos horarios cerrados que aún no se incorporaron (en orden de hora)"""
+        if not self.directorio.is_dir():
+            return []
+        cerrados = []
+        with os.scandir(self.directorio) as entradas:
+            for entrada in entradas:
+                if entrada.name in self._offsets:
+                    continue
+                fin = self._fin_hora(entrada.name)
+                if fin is None or ahora < fin + self.gracia:
+                    continue
+                if entrada.stat().st_mtime > ahora - self.gracia:
+                    continue
+                cerrados.append(Path(entrada.path))
+        return sorted(cerrados)
+
+    def _leer_desde(self, archivo: Path, offset: int):
+        """
+        Filas completas de `archivo` desde `offset` (bytes), validadas (los
+        rechazos se agregan a la cuarentena); retorna (parte, nuevo_offset)
+        """
+        with open(archivo, "rb") as f:
+            encabezado = next(csv.reader([f.readline().decode("utf-8")]), [])
+            f.seek(offset)
+            datos = f.read()
+        # Solo hasta la última línea completa: el resto se lee en la próxima revisión
+        completo = datos.rfind(b"\n") + 1
+        texto = datos[:completo].decode("utf-8")
+        filas = [fila for fila in csv.reader(io.StringIO(texto)) if fila]
+        if offset == 0 and filas:
+            filas = filas[1:]
+        if not all(c in encabezado for c in CAMPOS_EVENTO):
+            logger.warning("Encabezado CSV invalido en %s: %s", archivo, encabezado)
+            return None, offset + completo
+        parte, cuarentena = validar_filas(encabezado, filas, archivo)
+        parte, rechazos = validar_columnar(parte, self.sistema.mapeo_puertas, archivo)
+        cuarentena.agregar(rechazos.origen, rechazos.motivo, rechazos.campos)
+        if len(cuarentena):
+            # Solo se agrega: las filas ya incorporadas de este archivo no se vuelven a leer
+            try:
+                cuarentena.escribir()
+            except OSError as e:
+                logger.warning("No se pudo escribir la cuarentena de %s: %s", archivo, e)
+            logger.warning("%s: %s", archivo.name, cuarentena.resumen())
+        return parte, offset + completo
+
+    def revisar(self, ahora: float = None) -> List[Path]:
+        """
+        Una revisión: incorpora los archivos recién cerrados y la cola de
+        los que crecieron. Retorna los archivos que aportaron eventos.
+        """
+        ahora = self.reloj() if ahora is None else ahora
+        with self._lock:
+            pendientes = [(a, 0) for a in self._cerrados(ahora)]
+            for nombre, offset in self._offsets.items():
+                archivo = self.directorio / nombre
+                try:
+                    if archivo.stat().st_size > offset:
+                        pendientes.append((archivo, offset))
+                except FileNotFoundError:
+                    continue
+
+            actualizados = []
+            for archivo, offset in pendientes:
+                inicio = time.perf_counter()
+                parte, nuevo_offset = self._leer_desde(archivo, offset)
+                self._offsets[archivo.name] = nuevo_offset
+                if parte is None or len(parte) == 0:
+                    continue
+                agregados = self.sistema.incorporar(parte)
+                actualizados.append(archivo)
+                logger.info(
+                    "%s %s: %d eventos en %.1f ms",
+                    "Evento tardio en" if offset else "Incorporado",
+                    archivo.name, agregados, (time.perf_counter() - inicio) * 1e3,
+                )
+
+        if actualizados and self.al_actualizar is not None:
+            self.al_actualizar(self.sistema, actualizados)
+        return actualizados
+
+    def ejecutar(self) -> None:
+        """Bucle bloqueante hasta detener()"""
+        while not self._detener.is_set():
+            try:
+                self.revisar()
+            except Exception as e:
+                logger.error("Error revisando %s: %s", self.directorio, e)
+            self._detener.wait(self.intervalo)
+
+    def iniciar(self) -> "VigilanteDia":
+        """Ejecuta el bucle en un hilo de fondo"""
+        self._detener.clear()
+        self._hilo = threading.Thread(target=self.ejecutar, name="vigilante-dia", daemon=True)
+        self._hilo.start()
+        return self
+
+    def detener(self) -> None:
+        self._detener.set()
+        if self._hilo is not None:
+            self._hilo.join()
+            self._hilo = None